@@ -0,0 +1,21 @@
+import uuid
+
+from django.db import DatabaseError
+
+
+# Funcion que inserta los objetos con bulk_create y se asegura de que todos queden con su id
+# MySQL no retorna los ids de bulk_create: cada objeto recibe una llave unica en key_field
+# y los ids que falten se recuperan con una consulta por esa llave (no depende del orden ni de otros campos)
+# Lanza DatabaseError si algun id no se pudo recuperar
+def bulk_create_with_pks(model, objects, key_field, batch_size=None):
+    for obj in objects:
+        setattr(obj, key_field, uuid.uuid4())
+    model.objects.bulk_create(objects, batch_size=batch_size)
+
+    missing = {getattr(obj, key_field): obj for obj in objects if obj.pk is None}
+    if missing:
+        for key, pk in model.objects.filter(**{f'{key_field}__in': list(missing)}).values_list(key_field, 'pk'):
+            missing.pop(key).pk = pk
+    if missing:
+        raise DatabaseError(f'No se pudieron recuperar los ids de {len(missing)} registros de {model.__name__}.')
+    return objects
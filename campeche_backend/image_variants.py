@@ -0,0 +1,171 @@
+import io
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+# Tamaños (ancho maximo en pixeles) de las versiones que se generan de cada imagen
+VARIANTS = getattr(settings, 'IMAGE_VARIANTS', {'thumb': 160, 'card': 480, 'full': 1280})
+# Formatos de cada version (formato de Pillow -> extension del archivo)
+FORMATS = {'webp': 'WEBP', 'jpeg': 'JPEG'}
+QUALITY = getattr(settings, 'IMAGE_VARIANTS_QUALITY', 82)
+# Numero de procesos que redimensionan las imagenes
+WORKERS = getattr(settings, 'IMAGE_VARIANTS_WORKERS', 2)
+# Si es verdadero las versiones se generan en el mismo proceso al confirmar la transaccion (pruebas y desarrollo)
+EAGER = getattr(settings, 'IMAGE_VARIANTS_EAGER', False)
+
+
+# Funcion que genera las versiones de una imagen, retorna {(version, formato): (ancho, bytes)}
+# Se ejecuta en el pool de procesos, por eso solo recibe y retorna datos simples
+def render_variants(data, variants=None, quality=QUALITY):
+    from PIL import Image, ImageOps
+
+    variants = variants or VARIANTS
+    with Image.open(io.BytesIO(data)) as original:
+        # Respetamos la orientacion de las fotos tomadas con el celular
+        image = ImageOps.exif_transpose(original).convert('RGB')
+
+    results = {}
+    for name, width in variants.items():
+        resized = image.copy()
+        # thumbnail conserva la proporcion y nunca agranda la imagen
+        resized.thumbnail((width, width * 4), Image.LANCZOS)
+        for extension, image_format in FORMATS.items():
+            buffer = io.BytesIO()
+            resized.save(buffer, image_format, quality=quality, optimize=True)
+            results[(name, extension)] = (resized.width, buffer.getvalue())
+    return results
+
+
+# Funcion que retorna el nombre de una version junto al archivo original (products_pictures/foto_card.webp)
+def variant_name(original_name, variant, extension):
+    root, _ = os.path.splitext(original_name)
+    return f'{root}_{variant}.{extension}'
+
+
+# Pools del proceso, se crean en el primer uso
+_process_pool = None
+_thread_pool = None
+_pool_lock = threading.Lock()
+
+
+# Funcion que retorna el pool de procesos que ejecuta Pillow
+def get_process_pool():
+    global _process_pool
+    with _pool_lock:
+        if _process_pool is None:
+            # spawn evita copiar los hilos y conexiones del servidor en los procesos hijos
+            _process_pool = ProcessPoolExecutor(max_workers=WORKERS, mp_context=multiprocessing.get_context('spawn'))
+        return _process_pool
+
+
+# Funcion que retorna el hilo que lee y guarda los archivos (la peticion no espera el procesamiento)
+def get_thread_pool():
+    global _thread_pool
+    with _pool_lock:
+        if _thread_pool is None:
+            _thread_pool = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix='image-variants')
+        return _thread_pool
+
+
+# Funcion que genera y guarda las versiones de la imagen de un registro
+# model, pk: registro a procesar, field_name: campo de la imagen, variants_field: campo JSON donde se guardan las versiones
+def generate_variants(model, pk, field_name, variants_field, use_pool=True):
+    instance = model._default_manager.filter(pk=pk).first()
+    if instance is None:
+        return None
+    field_file = getattr(instance, field_name)
+    if not field_file or getattr(instance, variants_field).get('source') == field_file.name:
+        return None
+
+    storage = field_file.storage
+    source = field_file.name
+    with storage.open(source, 'rb') as original:
+        data = original.read()
+
+    # El trabajo de Pillow se hace en otro proceso para no bloquear el servidor
+    if use_pool:
+        rendered = get_process_pool().submit(render_variants, data).result()
+    else:
+        rendered = render_variants(data)
+
+    variants = {'source': source}
+    for (name, extension), (width, content) in rendered.items():
+        saved = storage.save(variant_name(source, name, extension), ContentFile(content))
+        variants.setdefault(name, {'width': width})[extension] = saved
+
+    # Guardamos solo si la imagen no cambio mientras se procesaba
+    instance.refresh_from_db(fields=[field_name])
+    if getattr(instance, field_name).name != source:
+        return None
+    setattr(instance, variants_field, variants)
+    # save (y no update) para que las señales del modelo invaliden las respuestas guardadas
+    instance.save(update_fields=[variants_field])
+    return variants
+
+
+# Funcion que ejecuta la generacion en el hilo de fondo y registra los errores
+def run_job(model, pk, field_name, variants_field):
+    try:
+        generate_variants(model, pk, field_name, variants_field)
+    except Exception:
+        logger.exception('No se pudieron generar las versiones de %s %s', model.__name__, pk)
+    finally:
+        close_old_connections()
+
+
+# Funcion que programa la generacion de las versiones cuando la imagen cambia
+# Se llama desde post_save, el trabajo empieza al confirmar la transaccion y la peticion no lo espera
+def schedule_variants(instance, field_name='image', variants_field='variants'):
+    field_file = getattr(instance, field_name)
+    if not field_file or field_file.name == instance._meta.get_field(field_name).default:
+        return
+    if getattr(instance, variants_field).get('source') == field_file.name:
+        return
+
+    model, pk = type(instance), instance.pk
+    if EAGER:
+        transaction.on_commit(lambda: generate_variants(model, pk, field_name, variants_field, use_pool=False))
+    else:
+        transaction.on_commit(lambda: get_thread_pool().submit(run_job, model, pk, field_name, variants_field))
+
+
+# Campo de solo lectura que retorna las urls de las versiones de una imagen
+# {'thumb': {'width': 160, 'webp': url, 'jpeg': url}, ..., 'srcset': {'webp': 'url 160w, ...', 'jpeg': ...}}
+# Retorna None mientras las versiones se estan generando (el cliente usa la imagen original)
+class ImageVariantsField(serializers.Field):
+    def __init__(self, image_field='image', variants_field='variants', **kwargs):
+        self.image_field = image_field
+        self.variants_field = variants_field
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, instance):
+        field_file = getattr(instance, self.image_field)
+        variants = getattr(instance, self.variants_field) or {}
+        if not field_file or variants.get('source') != field_file.name:
+            return None
+
+        storage = field_file.storage
+        data = {}
+        srcset = {extension: [] for extension in FORMATS}
+        for name in VARIANTS:
+            if name not in variants:
+                continue
+            width = variants[name]['width']
+            data[name] = {'width': width}
+            for extension in FORMATS:
+                url = storage.url(variants[name][extension])
+                data[name][extension] = url
+                srcset[extension].append(f'{url} {width}w')
+        data['srcset'] = {extension: ', '.join(items) for extension, items in srcset.items()}
+        return data
@@ -0,0 +1,123 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+# Paginacion por cursor (keyset): en lugar de OFFSET filtramos por la posicion del ultimo
+# elemento de la pagina anterior, asi el costo de cada pagina no crece con el numero de filas
+class KeysetPagination(BasePagination):
+    # Campos de ordenamiento, el ultimo debe ser unico (normalmente el id)
+    ordering = ('-id',)
+    # Tamaño de pagina por defecto y maximo permitido
+    page_size = 36
+    max_page_size = 100
+    # Indica si por defecto se incluye el total de registros (un COUNT adicional)
+    include_count = True
+    # Parametros de la url
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    count_query_param = 'count'
+    invalid_cursor_message = 'Cursor inválido'
+
+    # Funcion que pagina el queryset y retorna la lista de objetos de la pagina
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.include_count = self.get_include_count(request)
+        self.cursor = self.decode_cursor(request)
+
+        # El total se calcula sobre el queryset completo (sin la posicion del cursor)
+        self.count = queryset.count() if self.include_count else None
+
+        queryset = queryset.order_by(*self.ordering)
+        if self.cursor is not None:
+            queryset = queryset.filter(self.get_position_filter(self.cursor))
+
+        # Pedimos un elemento de mas para saber si existe una pagina siguiente
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        self.next_position = self.get_position(self.page[-1]) if self.has_next else None
+        return self.page
+
+    # Funcion que retorna la respuesta paginada
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    # Funcion que construye el diccionario de la respuesta paginada
+    def get_paginated_data(self, data):
+        response = OrderedDict()
+        if self.count is not None:
+            response['count'] = self.count
+        response['next'] = self.get_next_link()
+        response['results'] = data
+        return response
+
+    # Funcion que retorna la url de la siguiente pagina
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    # Funcion que obtiene el tamaño de pagina solicitado sin superar el maximo
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    # Funcion que indica si se debe calcular el total (?count=false lo desactiva)
+    def get_include_count(self, request):
+        value = request.query_params.get(self.count_query_param)
+        if value is None:
+            return self.include_count
+        return value.lower() not in ('false', '0', 'no')
+
+    # Funcion que obtiene los valores de los campos de ordenamiento de un objeto
+    def get_position(self, obj):
+        position = []
+        for field in self.ordering:
+            value = getattr(obj, field.lstrip('-'))
+            # Las fechas se guardan en formato ISO para poder serializarlas
+            position.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        return position
+
+    # Funcion que construye el filtro (a < x) OR (a = x AND b < y) ... a partir de la posicion
+    def get_position_filter(self, position):
+        position_filter = Q()
+        for index, field in enumerate(self.ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition = Q(**{f'{name}__{lookup}': position[index]})
+            for previous, value in zip(self.ordering[:index], position[:index]):
+                condition &= Q(**{previous.lstrip('-'): value})
+            position_filter |= condition
+        return position_filter
+
+    # Funcion que convierte la posicion en un cursor opaco
+    def encode_cursor(self, position):
+        data = json.dumps(position, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(data).decode('ascii')
+
+    # Funcion que obtiene la posicion a partir del cursor enviado en la url
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position
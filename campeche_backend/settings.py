@@ -229,4 +229,54 @@ CHANNEL_LAYERS = {
         "BACKEND": "channels_redis.core.RedisChannelLayer",
         "CONFIG": {"hosts": [("127.0.0.1", 6379)]},
     }
-}
\ No newline at end of file
+}
+
+# Paginacion por cursor del catalogo de productos
+CATALOG_PAGE_SIZE = int(os.getenv('CATALOG_PAGE_SIZE', 36))
+CATALOG_MAX_PAGE_SIZE = int(os.getenv('CATALOG_MAX_PAGE_SIZE', 100))
+# Permite desactivar el total de productos (COUNT) en las respuestas paginadas
+CATALOG_INCLUDE_COUNT = os.getenv('CATALOG_INCLUDE_COUNT', 'True').lower() in ('true', '1', 't')
+
+# Cache de las respuestas del catalogo (versionada e invalidada con señales)
+# En produccion se debe usar Redis (REDIS_URL) para que todos los procesos compartan las versiones,
+# sin REDIS_URL se usa la memoria local del proceso (desarrollo y pruebas)
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+# Tiempo maximo (segundos) que se guarda una respuesta del catalogo
+CATALOG_CACHE_TIMEOUT = int(os.getenv('CATALOG_CACHE_TIMEOUT', 300))
+
+# Versiones redimensionadas de las imagenes (thumb, card, full en WebP y JPEG)
+# Se generan en segundo plano con un pool de IMAGE_VARIANTS_WORKERS procesos,
+# con IMAGE_VARIANTS_EAGER se generan al confirmar la transaccion en el mismo proceso (pruebas)
+IMAGE_VARIANTS = {'thumb': 160, 'card': 480, 'full': 1280}
+IMAGE_VARIANTS_WORKERS = int(os.getenv('IMAGE_VARIANTS_WORKERS', 2))
+IMAGE_VARIANTS_EAGER = os.getenv('IMAGE_VARIANTS_EAGER', 'False').lower() in ('true', '1', 't')
+
+# Reservas temporales de stock de los carritos (desactivadas por defecto)
+# Al agregar un producto al carrito se reserva la cantidad por CART_RESERVATION_TTL segundos
+CART_RESERVATIONS_ENABLED = os.getenv('CART_RESERVATIONS_ENABLED', 'False').lower() in ('true', '1', 't')
+CART_RESERVATION_TTL = int(os.getenv('CART_RESERVATION_TTL', 900))
+
+# Bandeja de salida de notificaciones (WebSocket y correos)
+# Los mensajes se guardan con la transaccion y se envian al confirmarla en un hilo de fondo,
+# con NOTIFICATIONS_OUTBOX_AUTO_DISPATCH=False solo los envia el comando dispatch_outbox
+NOTIFICATIONS_OUTBOX_AUTO_DISPATCH = os.getenv('NOTIFICATIONS_OUTBOX_AUTO_DISPATCH', 'True').lower() in ('true', '1', 't')
+NOTIFICATIONS_OUTBOX_EAGER = os.getenv('NOTIFICATIONS_OUTBOX_EAGER', 'False').lower() in ('true', '1', 't')
+NOTIFICATIONS_OUTBOX_BATCH_SIZE = int(os.getenv('NOTIFICATIONS_OUTBOX_BATCH_SIZE', 100))
+NOTIFICATIONS_OUTBOX_MAX_ATTEMPTS = int(os.getenv('NOTIFICATIONS_OUTBOX_MAX_ATTEMPTS', 5))
+NOTIFICATIONS_OUTBOX_RETRY_DELAY = int(os.getenv('NOTIFICATIONS_OUTBOX_RETRY_DELAY', 5))
+
+# Tiempo (segundos) que se guardan las respuestas de las llaves Idempotency-Key de la creacion de facturas
+INVOICE_IDEMPOTENCY_TTL = int(os.getenv('INVOICE_IDEMPOTENCY_TTL', 60 * 60 * 24))
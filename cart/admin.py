@@ -1,8 +1,9 @@
 from django.contrib import admin
 
-from .models import FavoriteProducts, ShoppingCart, CartProducts
+from .models import FavoriteProducts, ShoppingCart, CartProducts, StockReservation
 # Register your models here.
 
 admin.site.register(ShoppingCart)
 admin.site.register(FavoriteProducts)
-admin.site.register(CartProducts)
\ No newline at end of file
+admin.site.register(CartProducts)
+admin.site.register(StockReservation)
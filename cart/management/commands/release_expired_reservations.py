@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from cart.reservations import release_expired
+
+
+# Comando que elimina las reservas de stock vencidas (se puede programar con cron o ejecutar con --interval)
+class Command(BaseCommand):
+    help = 'Libera las reservas de stock de los carritos que ya expiraron'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--interval', type=int, default=0, help='Segundos entre ejecuciones (0 = una sola vez)')
+
+    def handle(self, *args, **options):
+        while True:
+            released = release_expired(options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Se liberaron {released} reservas vencidas.'))
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
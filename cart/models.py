@@ -64,4 +64,29 @@ class FavoritesCategories(models.Model):
     
     # Mensaje que se mostrara en el admina
     def __str__(self):
-        return f"Favoritos de {self.user.username}"
\ No newline at end of file
+        return f"Favoritos de {self.user.username}"
+
+# Modelo de las reservas temporales de stock de los carritos
+# Mientras la reserva no expira, la cantidad no esta disponible para los demas compradores
+class StockReservation(models.Model):
+    # Carrito que reserva el producto
+    cart = models.ForeignKey(ShoppingCart, on_delete=models.CASCADE, related_name='reservations')
+    # Producto reservado
+    product = models.ForeignKey('products.Products', on_delete=models.CASCADE, related_name='reservations')
+    # Cantidad reservada (la cantidad del producto en el carrito)
+    quantity = models.PositiveIntegerField()
+    # Fecha en la que la reserva deja de ser valida
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('cart', 'product')
+        indexes = [
+            # Suma de las reservas activas de un producto sin recorrer todos los carritos
+            models.Index(fields=['product', 'expires_at'], name='reservation_product_exp_idx'),
+            # Limpieza de las reservas vencidas
+            models.Index(fields=['expires_at'], name='reservation_expires_idx'),
+        ]
+
+    # Representación en el panel de administración de Django
+    def __str__(self):
+        return f"Reserva de {self.quantity} x {self.product_id} hasta {self.expires_at}"
@@ -0,0 +1,113 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from products.models import Products
+from .models import StockReservation
+
+# Tiempo (segundos) que dura una reserva desde la ultima vez que el usuario modifico su carrito
+RESERVATION_TTL = getattr(settings, 'CART_RESERVATION_TTL', 900)
+
+
+# Funcion que indica si las reservas de stock estan activas
+def reservations_enabled():
+    return getattr(settings, 'CART_RESERVATIONS_ENABLED', False)
+
+
+# Error cuando no hay stock disponible para reservar, errors es {id_producto: (solicitado, disponible)}
+class ReservationError(Exception):
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__('Stock insuficiente para reservar')
+
+
+# Funcion que retorna {id_producto: cantidad reservada} de las reservas activas de los productos
+# Usa el indice (product, expires_at), solo lee las reservas vigentes de esos productos
+def get_reserved(product_ids, exclude_cart=None, now=None):
+    now = now or timezone.now()
+    reservations = StockReservation.objects.filter(product_id__in=product_ids, expires_at__gt=now)
+    if exclude_cart is not None:
+        reservations = reservations.exclude(cart=exclude_cart)
+    return dict(
+        reservations
+        .values('product_id')
+        .annotate(reserved=Sum('quantity'))
+        .order_by()
+        .values_list('product_id', 'reserved')
+    )
+
+
+# Funcion que reserva las cantidades del carrito, quantities es {id_producto: cantidad en el carrito}
+# Una cantidad de 0 libera la reserva. Si algun producto no tiene stock lanza ReservationError y no reserva nada
+@transaction.atomic
+def reserve(cart, quantities):
+    now = timezone.now()
+    product_ids = sorted(quantities)
+    # Bloqueamos los productos (en orden para evitar bloqueos cruzados) para que dos carritos
+    # no reserven al mismo tiempo la misma unidad
+    stock = dict(
+        Products.objects.select_for_update().filter(id__in=product_ids).order_by('id').values_list('id', 'stock')
+    )
+    reserved = get_reserved(product_ids, exclude_cart=cart, now=now)
+
+    errors = {}
+    for product_id, quantity in quantities.items():
+        available = max(stock.get(product_id, 0) - reserved.get(product_id, 0), 0)
+        if quantity > available:
+            errors[product_id] = (quantity, available)
+    if errors:
+        raise ReservationError(errors)
+
+    # Liberamos las reservas de los productos que salen del carrito
+    released = [product_id for product_id, quantity in quantities.items() if quantity == 0]
+    if released:
+        StockReservation.objects.filter(cart=cart, product_id__in=released).delete()
+
+    # Actualizamos o creamos las demas reservas
+    kept = {product_id: quantity for product_id, quantity in quantities.items() if quantity > 0}
+    expires_at = now + timedelta(seconds=RESERVATION_TTL)
+    existing = {
+        reservation.product_id: reservation
+        for reservation in StockReservation.objects.filter(cart=cart, product_id__in=kept)
+    }
+    to_update = []
+    for product_id, reservation in existing.items():
+        reservation.quantity = kept[product_id]
+        to_update.append(reservation)
+    if to_update:
+        StockReservation.objects.bulk_update(to_update, ['quantity'])
+    StockReservation.objects.bulk_create([
+        StockReservation(cart=cart, product_id=product_id, quantity=quantity, expires_at=expires_at)
+        for product_id, quantity in kept.items() if product_id not in existing
+    ])
+    # Mientras el usuario modifica su carrito renovamos todas sus reservas
+    StockReservation.objects.filter(cart=cart).update(expires_at=expires_at)
+
+
+# Funcion que libera las reservas de un carrito (todas o solo las de algunos productos)
+def release(cart, product_ids=None):
+    reservations = StockReservation.objects.filter(cart=cart)
+    if product_ids is not None:
+        reservations = reservations.filter(product_id__in=product_ids)
+    reservations.delete()
+
+
+# Funcion que convierte las reservas del comprador en venta: al facturar el stock ya fue descontado,
+# por eso solo se eliminan las reservas de los productos comprados
+def consume(user, product_ids):
+    StockReservation.objects.filter(cart__user=user, product_id__in=product_ids).delete()
+
+
+# Funcion que elimina las reservas vencidas por bloques (usa el indice de expires_at)
+# Retorna el numero de reservas eliminadas
+def release_expired(batch_size=1000):
+    now = timezone.now()
+    total = 0
+    while True:
+        ids = list(StockReservation.objects.filter(expires_at__lte=now).values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return total
+        total += StockReservation.objects.filter(id__in=ids).delete()[0]
@@ -115,5 +115,26 @@ class FavoritesCategoriesUser(serializers.ModelSerializer):
         fields = ['id', 'category', 'added_at']
         
         read_only_fields = ['id', 'created_at']
-        
-    
\ No newline at end of file
+
+
+# Serializador de una operacion del lote de cambios del carrito
+class CartOperationSerializer(serializers.Serializer):
+    OPERATIONS = ['set', 'increment', 'remove']
+    # set: cantidad final, increment: suma (o resta si es negativa) a la cantidad actual, remove: elimina el producto
+    op = serializers.ChoiceField(choices=OPERATIONS)
+    product_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(required=False)
+
+    # Validamos la cantidad segun la operacion
+    def validate(self, data):
+        if data['op'] == 'set' and data.get('quantity', -1) < 0:
+            raise serializers.ValidationError({'quantity': 'La cantidad debe ser un número entero mayor o igual a 0.'})
+        if data['op'] == 'increment' and not data.get('quantity'):
+            raise serializers.ValidationError({'quantity': 'La cantidad debe ser un número entero distinto de 0.'})
+        return data
+
+
+# Serializador del lote de cambios del carrito
+class CartBatchSerializer(serializers.Serializer):
+    operations = CartOperationSerializer(many=True, allow_empty=False, max_length=200)
+
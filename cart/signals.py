@@ -1,11 +1,13 @@
 # Funcion que nos permite utilizar cuando se guarda un modelo en la base de datos
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
+from django.db import transaction
 # Funcion que escucha cuando se guarda un modelo
 from django.dispatch import receiver
 # Funcion que nos permite acceder a la configuracion del proyecto
 from django.conf import settings
 # Importamos los modelos
-from .models import ShoppingCart
+from .models import ShoppingCart, FavoriteProducts, FavoritesCategories
+from .utils import invalidate_favorite_ids
 
 from users.models import  CustomUser
 
@@ -16,4 +18,16 @@ def create_user_cart(sender, instance, created, **kwargs):
     # Verifica si el usuario fue creado recientemente
     if created:
         # Creacion del carrito del usuario
-        ShoppingCart.objects.create(user=instance)
\ No newline at end of file
+        ShoppingCart.objects.create(user=instance)
+
+
+# Cuando se agrega o elimina un favorito (producto o categoria) invalidamos los ids guardados del usuario
+# Se hace al confirmar la transaccion para no volver a guardar los datos anteriores
+@receiver(post_save, sender=FavoriteProducts)
+@receiver(post_delete, sender=FavoriteProducts)
+@receiver(post_save, sender=FavoritesCategories)
+@receiver(post_delete, sender=FavoritesCategories)
+def invalidate_user_favorites(sender, instance, **kwargs):
+    user_id = instance.user_id
+    transaction.on_commit(lambda: invalidate_favorite_ids(user_id))
+
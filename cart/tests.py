@@ -1,3 +1,107 @@
-from django.test import TestCase
+import threading
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from offers_and_coupons.models import Offers
+from products.models import Products
+from users.models import CustomUser
+from .models import CartProducts, ShoppingCart
+from .utils import add_to_cart, InsufficientStock
+
+
+# Pruebas de agregar al carrito desde varias peticiones al mismo tiempo
+# (TransactionTestCase para que cada hilo use su propia conexion y vea los cambios confirmados)
+# Se necesita una base con bloqueo de filas (MySQL), SQLite bloquea el archivo completo
+@skipUnlessDBFeature('has_select_for_update')
+class AddToCartConcurrencyTests(TransactionTestCase):
+    def setUp(self):
+        seller = CustomUser.objects.create_user(username='vendedor', email='vendedor@test.com', password='x')
+        buyer = CustomUser.objects.create_user(username='comprador', email='comprador@test.com', password='x')
+        self.cart, _ = ShoppingCart.objects.get_or_create(user=buyer)
+        self.product = Products.objects.create(
+            name='Mango', description='d', price=Decimal('10.00'), stock=25, producer=seller
+        )
+
+    # Funcion que agrega la cantidad al carrito desde varios hilos a la vez, retorna (agregados, rechazados)
+    def add_in_parallel(self, threads, quantity, attempts=1):
+        results = {'added': 0, 'rejected': 0}
+        lock = threading.Lock()
+        barrier = threading.Barrier(threads)
+
+        def add():
+            barrier.wait()
+            try:
+                for _ in range(attempts):
+                    try:
+                        add_to_cart(self.cart, self.product.id, quantity)
+                        outcome = 'added'
+                    except InsufficientStock:
+                        outcome = 'rejected'
+                    with lock:
+                        results[outcome] += 1
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=add) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return results['added'], results['rejected']
+
+    # Funcion que retorna la cantidad del producto en el carrito
+    def get_quantity(self):
+        return CartProducts.objects.values_list('quantity', flat=True).get(cart=self.cart, product=self.product)
+
+    # Ninguna suma se pierde: la cantidad final es la suma de todas las peticiones
+    def test_parallel_adds_keep_every_update(self):
+        added, rejected = self.add_in_parallel(threads=8, quantity=1, attempts=3)
+
+        self.assertEqual((added, rejected), (24, 0))
+        self.assertEqual(self.get_quantity(), 24)
+
+    # La cantidad nunca supera el stock: solo se aceptan las peticiones que caben
+    def test_parallel_adds_never_exceed_stock(self):
+        added, rejected = self.add_in_parallel(threads=20, quantity=2)
+
+        self.assertEqual((added, rejected), (12, 8))
+        self.assertEqual(self.get_quantity(), 24)
+        self.assertEqual(CartProducts.objects.filter(cart=self.cart).count(), 1)
+
+
+# Pruebas del resumen con precios del carrito
+class CartSummaryTests(TestCase):
+    def setUp(self):
+        self.seller = CustomUser.objects.create_user(username='vendedor', email='vendedor@test.com', password='x')
+        self.buyer = CustomUser.objects.create_user(username='comprador', email='comprador@test.com', password='x')
+        cart, _ = ShoppingCart.objects.get_or_create(user=self.buyer)
+        now = timezone.now()
+        for name, price, quantity, percentage in (('Mango', '9.99', 3, '15'), ('Papa', '10.00', 1, '33.33')):
+            product = Products.objects.create(
+                name=name, description='d', price=Decimal(price), stock=10, producer=self.seller
+            )
+            CartProducts.objects.create(cart=cart, product=product, quantity=quantity)
+            Offers.objects.create(
+                seller=self.seller, product=product, title='Oferta', percentage=Decimal(percentage),
+                start_date=now - timedelta(days=1), end_date=now + timedelta(days=1),
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+
+    # Los descuentos que no dan centavos exactos se redondean y los montos se retornan como texto
+    def test_amounts_are_rounded_strings(self):
+        data = self.client.get('/api/cart/summary/').data
+
+        self.assertEqual(
+            [(item['subtotal'], item['discount'], item['total']) for item in data['items']],
+            [('29.97', '4.50', '25.47'), ('10.00', '3.33', '6.67')],
+        )
+        self.assertEqual(data['items'][1]['offer_percentage'], '33.33')
+        seller = data['sellers'][0]
+        self.assertEqual((seller['subtotal'], seller['discount'], seller['total']), ('39.97', '7.83', '32.14'))
+        self.assertEqual((data['subtotal'], data['discount'], data['total']), ('39.97', '7.83', '32.14'))
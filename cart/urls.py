@@ -1,12 +1,15 @@
 from django.urls import path
-from .views import FavoritesView, FavoriteDeleteView, CartUserView, DeleteProductCartUserView, FavoritesCategoriesview, DeleteCategoryFavoriteView
+from .views import FavoritesView, FavoriteIdsView, FavoriteDeleteView, CartUserView, CartBatchView, CartSummaryView, DeleteProductCartUserView, FavoritesCategoriesview, DeleteCategoryFavoriteView
 # url de la aplicacion (users)
 urlpatterns = [
     # URLS
     path('favorites/', FavoritesView.as_view(), name='MisFavorites'),
+    path('favorites/ids/', FavoriteIdsView.as_view(), name='favorites-ids'),
     path('delete-favorites/<int:product_id>/', FavoriteDeleteView.as_view(), name='favorites-delete'),
     
     path('my-cart/', CartUserView.as_view(), name='add-to-cart'),
+    path('my-cart/batch/', CartBatchView.as_view(), name='cart-batch'),
+    path('summary/', CartSummaryView.as_view(), name='cart-summary'),
     path('delete-product/<int:product_id>/', DeleteProductCartUserView.as_view(), name='remove-product-cart'),
     
     path('categories/', FavoritesCategoriesview.as_view(), name='Favorites_categories'),
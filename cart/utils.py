@@ -0,0 +1,295 @@
+import hashlib
+from decimal import Decimal
+
+from django.core.cache import cache
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, OuterRef, Prefetch, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Round
+from django.utils import timezone
+
+from offers_and_coupons.models import Offers
+from offers_and_coupons.utils import get_promotions_context
+from products.models import Products
+from .models import CartProducts, ShoppingCart, FavoriteProducts, FavoritesCategories
+from .reservations import reservations_enabled, reserve, ReservationError
+from .serializer import CartUserSerializer
+
+
+# Error cuando la cantidad solicitada supera el stock del producto
+class InsufficientStock(Exception):
+    def __init__(self, requested, stock):
+        self.requested = requested
+        self.stock = stock
+        super().__init__(f"La cantidad total ({requested}) excede el stock disponible ({stock}).")
+
+
+# Funcion que incrementa la cantidad de un producto del carrito solo si el resultado no supera el stock
+# La comparacion y la suma se hacen en un solo UPDATE, retorna el numero de filas actualizadas (0 o 1)
+def increment_cart_product(cart, product_id, quantity):
+    stock = Subquery(Products.objects.filter(pk=product_id).values('stock')[:1])
+    return (
+        CartProducts.objects
+        .filter(cart=cart, product_id=product_id, quantity__lte=stock - quantity)
+        .update(quantity=F('quantity') + quantity)
+    )
+
+
+# Funcion que bloquea los productos ordenados por id y retorna {id_producto: stock}
+# Todas las operaciones que modifican el carrito bloquean primero los productos, igual que la compra
+def lock_products(product_ids):
+    return dict(
+        Products.objects.select_for_update().filter(id__in=product_ids).order_by('id').values_list('id', 'stock')
+    )
+
+
+# Funcion que agrega una cantidad de un producto al carrito sin condiciones de carrera
+# Dos peticiones al mismo tiempo no pierden una actualizacion ni superan el stock
+# Retorna (cantidad resultante, creado) o lanza InsufficientStock
+@transaction.atomic
+def add_to_cart(cart, product_id, quantity):
+    # Bloqueamos primero el producto y despues la fila del carrito: es el mismo orden que la compra desde el carrito
+    # (productos ordenados por id y luego el carrito), asi dos peticiones no se bloquean mutuamente
+    lock_products([product_id])
+    new_quantity, created = update_cart_product(cart, product_id, quantity)
+    # Con las reservas activas tambien descontamos lo reservado por los demas carritos
+    # (si no alcanza, el error deshace el incremento)
+    if reservations_enabled():
+        try:
+            reserve(cart, {product_id: new_quantity})
+        except ReservationError as error:
+            raise InsufficientStock(*error.errors[product_id])
+    return new_quantity, created
+
+
+# Funcion que suma la cantidad en el carrito (ver add_to_cart)
+def update_cart_product(cart, product_id, quantity):
+    # Caso 1: el producto ya esta en el carrito
+    if increment_cart_product(cart, product_id, quantity):
+        return CartProducts.objects.values_list('quantity', flat=True).get(cart=cart, product_id=product_id), False
+
+    # Caso 2: el producto no esta en el carrito, lo creamos si la cantidad no supera el stock
+    if not CartProducts.objects.filter(cart=cart, product_id=product_id).exists():
+        stock = Products.objects.values_list('stock', flat=True).get(pk=product_id)
+        if quantity > stock:
+            raise InsufficientStock(quantity, stock)
+        try:
+            # Savepoint para que un duplicado (otra peticion lo creo primero) no rompa la transaccion
+            with transaction.atomic():
+                CartProducts.objects.create(cart=cart, product_id=product_id, quantity=quantity)
+            return quantity, True
+        except IntegrityError:
+            # Otra peticion creo la fila al mismo tiempo, intentamos de nuevo con el incremento
+            if increment_cart_product(cart, product_id, quantity):
+                return CartProducts.objects.values_list('quantity', flat=True).get(cart=cart, product_id=product_id), False
+
+    # La suma supera el stock
+    current = CartProducts.objects.values_list('quantity', flat=True).get(cart=cart, product_id=product_id)
+    stock = Products.objects.values_list('stock', flat=True).get(pk=product_id)
+    raise InsufficientStock(current + quantity, stock)
+
+
+# Funcion que retorna el carrito del usuario con sus productos precargados y sus ofertas y cupones resueltos
+# Retorna None si el usuario no tiene carrito
+def get_cart_data(user):
+    cart = (
+        ShoppingCart.objects
+        .prefetch_related(Prefetch('products', queryset=CartProducts.objects.select_related('product__rating_stats')))
+        .filter(user=user)
+        .first()
+    )
+    if cart is None:
+        return None
+    context = get_promotions_context([item.product_id for item in cart.products.all()])
+    return CartUserSerializer(cart, context=context).data
+
+
+# Error cuando una o varias operaciones de un lote no son validas, errors es {indice de la operacion: mensaje}
+class CartBatchError(Exception):
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__('Operaciones inválidas')
+
+
+# Funcion que aplica un lote de operaciones (set, increment, remove) al carrito en una sola transaccion
+# Se valida todo contra una sola lectura del stock y se escribe con bulk_create, bulk_update y un solo delete,
+# si alguna operacion no es valida no se aplica ninguna
+@transaction.atomic
+def apply_cart_operations(cart, operations):
+    product_ids = {operation['product_id'] for operation in operations}
+    # Bloqueamos primero los productos (mismo orden que la compra) y despues el carrito
+    # para que dos lotes del mismo usuario no se mezclen
+    stock = lock_products(product_ids)
+    list(ShoppingCart.objects.select_for_update().filter(pk=cart.pk).values_list('pk', flat=True))
+    # Cantidades actuales del carrito
+    current = {
+        item.product_id: item
+        for item in CartProducts.objects.select_for_update().filter(cart=cart, product_id__in=product_ids)
+    }
+
+    # Calculamos en memoria la cantidad final de cada producto
+    quantities = {product_id: item.quantity for product_id, item in current.items()}
+    errors = {}
+    for index, operation in enumerate(operations):
+        product_id = operation['product_id']
+        if product_id not in stock:
+            errors[index] = 'Producto no encontrado.'
+            continue
+        if operation['op'] == 'remove':
+            quantities[product_id] = 0
+        elif operation['op'] == 'set':
+            quantities[product_id] = operation['quantity']
+        else:
+            quantities[product_id] = quantities.get(product_id, 0) + operation['quantity']
+        if quantities[product_id] > stock[product_id]:
+            errors[index] = f"La cantidad total ({quantities[product_id]}) excede el stock disponible ({stock[product_id]})."
+        elif quantities[product_id] < 0:
+            errors[index] = 'La cantidad no puede ser negativa.'
+    if errors:
+        raise CartBatchError(errors)
+
+    # Con las reservas activas validamos contra el stock no reservado por los demas carritos y reservamos
+    if reservations_enabled():
+        try:
+            reserve(cart, quantities)
+        except ReservationError as error:
+            # Reportamos el error en la ultima operacion de cada producto
+            last_index = {operation['product_id']: index for index, operation in enumerate(operations)}
+            raise CartBatchError({
+                last_index[product_id]: f"La cantidad total ({requested}) excede el stock disponible ({available})."
+                for product_id, (requested, available) in error.errors.items()
+            })
+
+    to_create, to_update, to_delete = [], [], []
+    for product_id, quantity in quantities.items():
+        item = current.get(product_id)
+        if quantity == 0:
+            if item is not None:
+                to_delete.append(item.id)
+        elif item is None:
+            to_create.append(CartProducts(cart=cart, product_id=product_id, quantity=quantity))
+        elif item.quantity != quantity:
+            item.quantity = quantity
+            to_update.append(item)
+
+    if to_delete:
+        CartProducts.objects.filter(id__in=to_delete).delete()
+    if to_update:
+        CartProducts.objects.bulk_update(to_update, ['quantity'])
+    if to_create:
+        CartProducts.objects.bulk_create(to_create)
+    return {'created': len(to_create), 'updated': len(to_update), 'removed': len(to_delete)}
+
+
+# Funcion que retorna un valor decimal como texto con dos decimales (como los demas montos de la API)
+def to_money(value):
+    return None if value is None else str(Decimal(value).quantize(Decimal('0.01')))
+
+
+# Funcion que retorna el resumen con precios del carrito del usuario: subtotal, descuento de oferta y total
+# de cada producto, de cada vendedor y del carrito. Los calculos se hacen en la base de datos (3 consultas)
+# El descuento de cada producto se redondea a centavos antes de sumarlo, asi los totales cuadran con las lineas
+# El descuento de cupon no se incluye porque depende del codigo que el usuario envia al pagar
+def get_cart_summary(user):
+    money = DecimalField(max_digits=12, decimal_places=2)
+    now = timezone.now()
+    # Porcentaje de la oferta activa del producto (la primera por id, igual que al facturar)
+    offer_percentage = Subquery(
+        Offers.objects
+        .filter(product_id=OuterRef('product_id'), active=True, start_date__lte=now, end_date__gte=now)
+        .order_by('id')
+        .values('percentage')[:1]
+    )
+    lines = (
+        CartProducts.objects
+        .filter(cart__user=user)
+        .annotate(offer_percentage=offer_percentage)
+        .annotate(
+            subtotal=ExpressionWrapper(F('quantity') * F('product__price'), output_field=money),
+            discount=Round(
+                F('quantity') * F('product__price') * Coalesce(F('offer_percentage'), Value(0)) / Value(100),
+                2, output_field=money,
+            ),
+        )
+        .annotate(total=ExpressionWrapper(F('subtotal') - F('discount'), output_field=money))
+    )
+
+    items = list(
+        lines
+        .values(
+            'product_id', 'quantity', 'offer_percentage', 'subtotal', 'discount', 'total',
+            name=F('product__name'), unit_price=F('product__price'),
+            seller_id=F('product__producer_id'), seller_name=F('product__producer__username'),
+        )
+        .order_by('seller_id', 'product_id')
+    )
+    # Totales por vendedor (una consulta agrupada)
+    sellers = list(
+        lines
+        .values(seller_id=F('product__producer_id'), seller_name=F('product__producer__username'))
+        .annotate(
+            items=Count('id'),
+            subtotal=Sum('subtotal', output_field=money),
+            discount=Sum('discount', output_field=money),
+            total=Sum('total', output_field=money),
+        )
+        .order_by('seller_id')
+    )
+    # Totales del carrito
+    totals = lines.aggregate(
+        cart_subtotal=Sum('subtotal', output_field=money),
+        cart_discount=Sum('discount', output_field=money),
+        cart_total=Sum('total', output_field=money),
+    )
+    # Los montos se retornan como texto con dos decimales
+    for item in items:
+        for field in ('unit_price', 'offer_percentage', 'subtotal', 'discount', 'total'):
+            item[field] = to_money(item[field])
+    for seller in sellers:
+        for field in ('subtotal', 'discount', 'total'):
+            seller[field] = to_money(seller[field])
+    zero = Decimal('0.00')
+    return {
+        'items': items,
+        'sellers': sellers,
+        'items_count': len(items),
+        'subtotal': to_money(totals['cart_subtotal'] or zero),
+        'discount': to_money(totals['cart_discount'] or zero),
+        'total': to_money(totals['cart_total'] or zero),
+    }
+
+
+# Llave de cache con los ids de los productos y categorias favoritos de un usuario
+FAVORITE_IDS_KEY = 'favorites:ids:{}'
+FAVORITE_IDS_TIMEOUT = 60 * 60 * 24
+
+
+# Funcion que retorna {'products': [ids], 'categories': [ids]} con los favoritos del usuario ordenados
+# Se guarda en cache por usuario y se invalida con las señales de FavoriteProducts y FavoritesCategories
+def get_favorite_ids(user_id):
+    key = FAVORITE_IDS_KEY.format(user_id)
+    data = cache.get(key)
+    if data is None:
+        data = {
+            'products': list(
+                FavoriteProducts.objects.filter(user_id=user_id).order_by('product_id').values_list('product_id', flat=True)
+            ),
+            'categories': list(
+                FavoritesCategories.objects.filter(user_id=user_id).order_by('category_id').values_list('category_id', flat=True)
+            ),
+        }
+        cache.set(key, data, FAVORITE_IDS_TIMEOUT)
+    return data
+
+
+# Funcion que elimina de la cache los favoritos de un usuario
+def invalidate_favorite_ids(user_id):
+    cache.delete(FAVORITE_IDS_KEY.format(user_id))
+
+
+# Funcion que retorna el ETag de los favoritos de un usuario
+def favorite_ids_etag(request, *args, **kwargs):
+    data = get_favorite_ids(request.user.id)
+    raw = f"{data['products']}|{data['categories']}"
+    return hashlib.md5(raw.encode('utf-8')).hexdigest()
+
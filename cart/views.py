@@ -1,13 +1,20 @@
 from django.shortcuts import render
+from django.db import IntegrityError
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from rest_framework.views import APIView
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from products.models import Products, Category
+from offers_and_coupons.utils import get_promotions_context
 
 from .models import FavoriteProducts, ShoppingCart, CartProducts, FavoritesCategories
-from .serializer import  FavoriteProductsSerializer,  CartUserSerializer, FavoritesCategoriesUser, NewFavoriteCategorySerializer
+from .reservations import release
+from .utils import get_favorite_ids, favorite_ids_etag
+from .utils import add_to_cart, InsufficientStock, get_cart_data, apply_cart_operations, CartBatchError, get_cart_summary
+from .serializer import  FavoriteProductsSerializer, FavoritesCategoriesUser, NewFavoriteCategorySerializer, CartBatchSerializer
 # Create your views here.
 
 
@@ -21,9 +28,11 @@ class FavoritesView(APIView):
     # Método GET: obtiene los productos favoritos del usuario autenticado
     def get(self, request, *args, **kwargs):
         # Filtramos los productos favoritos por el usuario autenticado
-        favorite = FavoriteProducts.objects.filter(user=request.user)
+        favorite = FavoriteProducts.objects.filter(user=request.user).select_related('product__rating_stats')
+        # Resolvemos las ofertas y cupones activos de los productos en bloque
+        context = get_promotions_context([item.product_id for item in favorite])
         # Serializamos los productos favoritos
-        serializer = FavoriteProductsSerializer(favorite, many=True)
+        serializer = FavoriteProductsSerializer(favorite, many=True, context=context)
         # Retornamos la lista de productos favoritos
         return Response(serializer.data)
     
@@ -48,6 +57,20 @@ class FavoritesView(APIView):
         return Response({"message": f"El producto {favorite.product.name} se agrego correctamente"}, status=status.HTTP_200_OK)
 
     
+# Vista que retorna solo los ids de los productos y categorias favoritos del usuario (ordenados)
+# Responde 304 si el cliente envia If-None-Match con la version actual
+class FavoriteIdsView(APIView):
+    # Indicamos el método de autenticación
+    authentication_classes = [JWTAuthentication]
+    # Solo los usuarios autenticados pueden acceder a esta vista
+    permission_classes = [IsAuthenticated]
+
+    # Método GET: ids de los favoritos (guardados en cache por usuario)
+    @method_decorator(condition(etag_func=favorite_ids_etag))
+    def get(self, request, *args, **kwargs):
+        return Response(get_favorite_ids(request.user.id))
+
+
 # Vista que nos permite eliminar un producto de la lista de favoritos
 class FavoriteDeleteView(APIView):
     # Indicamos el método de autenticación
@@ -87,16 +110,13 @@ class CartUserView(APIView):
 
     # GET: Obtiene todos los productos del carrito del usuario autenticado
     def get(self, request, *args, **kwargs):
-        try:
-            # Obtenemos el carrito del usuario autenticado
-            cart = ShoppingCart.objects.get(user=request.user)
-        except ShoppingCart.DoesNotExist:
+        # Obtenemos el carrito del usuario autenticado junto con sus productos, ofertas y cupones
+        data = get_cart_data(request.user)
+        if data is None:
             # Si el usuario no tiene un carrito, se devuelve un mensaje de error
             return Response({"detail": "El usuario no tiene un carrito."}, status=status.HTTP_404_NOT_FOUND)
-
-        # Serializamos y devolvemos la información del carrito
-        serializer = CartUserSerializer(cart)
-        return Response(serializer.data)
+        # Devolvemos la información del carrito
+        return Response(data)
 
     # POST: Agrega un producto al carrito del usuario autenticado
     def post(self, request, *args, **kwargs):
@@ -108,60 +128,86 @@ class CartUserView(APIView):
         # Validamos que se haya proporcionado el ID del producto
         if not product_id:
             return Response({"detail": "El ID del producto es requerido."}, status=status.HTTP_400_BAD_REQUEST)
-
+        # Validamos que la cantidad sea un numero entero positivo
         try:
-            # Obtenemos el producto correspondiente
-            product = Products.objects.get(id=product_id)
-        except Products.DoesNotExist:
+            quantity = int(quantity)
+        except (TypeError, ValueError):
+            quantity = 0
+        if quantity < 1:
+            return Response({"detail": "La cantidad debe ser un número entero mayor a 0."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Verificamos que el producto exista
+        if not Products.objects.filter(id=product_id).exists():
             # Si el producto no existe, devolvemos un error
             return Response({"detail": "Producto no encontrado."}, status=status.HTTP_404_NOT_FOUND)
 
         # Obtenemos o creamos el carrito del usuario
         cart, created = ShoppingCart.objects.get_or_create(user=request.user)
 
-        # Verificamos si el producto ya está en el carrito
-        cart_product, product_created = CartProducts.objects.get_or_create(
-            cart=cart, 
-            product=product,
-            defaults={'quantity': quantity}
-        )
+        # Agregamos el producto en una sola operacion atomica (suma y validacion de stock en la base de datos)
+        try:
+            new_quantity, product_created = add_to_cart(cart, product_id, quantity)
+        except InsufficientStock as error:
+            return Response({"detail": str(error)}, status=status.HTTP_400_BAD_REQUEST)
 
         if not product_created:
-            # Si el producto ya existe, aumentamos la cantidad
-            new_quantity = cart_product.quantity + quantity
-            
-            # Verificamos que la nueva cantidad no exceda el stock disponible
-            if new_quantity > product.stock:
-                return Response(
-                    {"detail": f"La cantidad total ({new_quantity}) excede el stock disponible ({product.stock})."},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            # Actualizamos la cantidad
-            cart_product.quantity = new_quantity
-            cart_product.save()
-            
+            # Si el producto ya existia, retornamos la cantidad resultante
             return Response({
                 "detail": "Cantidad del producto actualizada en el carrito.",
                 "product_id": product_id,
                 "new_quantity": new_quantity
             }, status=status.HTTP_200_OK)
-        else:
-            # Si es un producto nuevo, verificamos que no exceda el stock
-            if quantity > product.stock:
-                # Si excede el stock, eliminamos el producto recién creado
-                cart_product.delete()
-                return Response(
-                    {"detail": "La cantidad solicitada es mayor a la disponible."},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            # Devolvemos una respuesta de éxito para producto nuevo
-            return Response({
-                "detail": "Producto agregado al carrito.",
-                "product_id": product_id,
-                "quantity": quantity
-            }, status=status.HTTP_201_CREATED)
+
+        # Devolvemos una respuesta de éxito para producto nuevo
+        return Response({
+            "detail": "Producto agregado al carrito.",
+            "product_id": product_id,
+            "quantity": new_quantity
+        }, status=status.HTTP_201_CREATED)
+
+
+# Vista que aplica varios cambios al carrito en una sola peticion
+# Recibe {"operations": [{"op": "set|increment|remove", "product_id": 1, "quantity": 2}, ...]}
+class CartBatchView(APIView):
+    # Indicamos el método de autenticación
+    authentication_classes = [JWTAuthentication]
+    # Solo los usuarios autenticados pueden acceder a esta vista
+    permission_classes = [IsAuthenticated]
+
+    # POST: aplica todas las operaciones o ninguna y retorna el carrito actualizado
+    def post(self, request, *args, **kwargs):
+        serializer = CartBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        # Obtenemos o creamos el carrito del usuario
+        cart, created = ShoppingCart.objects.get_or_create(user=request.user)
+        try:
+            result = apply_cart_operations(cart, serializer.validated_data['operations'])
+        except CartBatchError as error:
+            # Retornamos el error de cada operacion (por su posicion en la lista)
+            return Response({"operations": error.errors}, status=status.HTTP_400_BAD_REQUEST)
+        except IntegrityError:
+            # Otra peticion agrego uno de los productos al mismo tiempo
+            return Response({"detail": "El carrito cambió mientras se actualizaba, intenta de nuevo."}, status=status.HTTP_409_CONFLICT)
+
+        return Response({
+            "detail": "Carrito actualizado.",
+            **result,
+            "cart": get_cart_data(request.user),
+        }, status=status.HTTP_200_OK)
+
+
+# Vista que retorna el resumen con precios del carrito (subtotales, descuento de ofertas, total y totales por vendedor)
+# Se calcula en la base de datos con un numero fijo de consultas, pensada para consultarse en cada pantalla del carrito
+class CartSummaryView(APIView):
+    # Indicamos el método de autenticación
+    authentication_classes = [JWTAuthentication]
+    # Solo los usuarios autenticados pueden acceder a esta vista
+    permission_classes = [IsAuthenticated]
+
+    # GET: resumen del carrito del usuario autenticado
+    def get(self, request, *args, **kwargs):
+        return Response(get_cart_summary(request.user), status=status.HTTP_200_OK)
 
 
 # Viste que nos permite eliminar un producto del carrito 
@@ -187,8 +233,9 @@ class DeleteProductCartUserView(APIView):
             # Si el producto no está en el carrito, devolvemos un mensaje de error
             return Response({"detail": "Producto no encontrado en el carrito."}, status=status.HTTP_404_NOT_FOUND)
 
-        # Eliminamos el producto del carrito
+        # Eliminamos el producto del carrito y liberamos su reserva de stock
         cart_product.delete()
+        release(cart, [product_id])
 
         # Devolvemos una respuesta exitosa sin contenido
         return Response({"detail": "Producto eliminado del carrito."}, status=status.HTTP_200_OK)
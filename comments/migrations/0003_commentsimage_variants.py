@@ -0,0 +1,24 @@
+# Generated by Django 5.1.5 on 2026-10-18 10:44
+
+import campeche_backend.storages
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comments', '0002_alter_comments_options_alter_commentsimage_options'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='commentsimage',
+            name='variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='commentsimage',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=campeche_backend.storages.PublicMediaStorage(), upload_to='comments_pictures/'),
+        ),
+    ]
@@ -31,6 +31,8 @@ class CommentsImage(models.Model):
     comment = models.ForeignKey(Comments, on_delete=models.CASCADE, related_name="images")
     # Campo en donde se alamcenara la imagen
     image = models.ImageField(upload_to="comments_pictures/", null=True, blank=True, storage=PublicMediaStorage())
+    # Versiones redimensionadas de la imagen (se generan en segundo plano)
+    variants = models.JSONField(default=dict, blank=True, editable=False)
     
     class Meta:
         verbose_name = "Image Comment"
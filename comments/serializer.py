@@ -2,14 +2,17 @@ from rest_framework import serializers
 from .models import Comments, CommentsImage
 from products.models import Products
 from users.models import CustomUser
+from campeche_backend.image_variants import ImageVariantsField
 # Serializador que nos permite obtener las imagenes de los comentarios
 class CommentsImgesSerializer(serializers.ModelSerializer):
+    # Urls de las versiones redimensionadas (None mientras se generan)
+    variants = ImageVariantsField()
     
     class Meta:
         # Definimos el modelo a utilizar
         model = CommentsImage
         # Definimo slos campos que utilizaremos
-        fields = ["id", "image"]      
+        fields = ["id", "image", "variants"]      
         
 
 # Serializador que nos permite crear un nuevo comnetario
@@ -122,9 +125,12 @@ class EditCommentSerializer(serializers.ModelSerializer):
 
 # Serializador para obtenetr la informacion del usuario creador de un comentario  
 class CommentUserSerializer(serializers.ModelSerializer):
+    # Urls de las versiones redimensionadas de la imagen de perfil
+    profile_image_variants = ImageVariantsField('profile_image', 'profile_image_variants')
+
     class Meta:
         model = CustomUser
-        fields = ['id', 'email', 'username', 'profile_image']
+        fields = ['id', 'email', 'username', 'profile_image', 'profile_image_variants']
 
         
 # Serializer que nos permite imprimir la informacion de os comentarios con sus imagenes
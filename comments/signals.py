@@ -0,0 +1,11 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from campeche_backend.image_variants import schedule_variants
+from .models import CommentsImage
+
+
+# Cuando se sube una imagen de un comentario generamos sus versiones redimensionadas en segundo plano
+@receiver(post_save, sender=CommentsImage)
+def generate_image_variants(sender, instance, **kwargs):
+    schedule_variants(instance, 'image', 'variants')
@@ -1,6 +1,10 @@
 from django.contrib import admin
-from .models import Invoice, DetailInvoice
+from .models import Invoice, DetailInvoice, IdempotencyKey, SellerDailySales, BuyerDailySpend, BestSeller
 # Register your models here.
 
 admin.site.register(Invoice)
-admin.site.register(DetailInvoice)
\ No newline at end of file
+admin.site.register(DetailInvoice)
+admin.site.register(IdempotencyKey)
+admin.site.register(SellerDailySales)
+admin.site.register(BuyerDailySpend)
+admin.site.register(BestSeller)
@@ -0,0 +1,106 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, DateField, F, Sum
+from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .exports import parse_day
+from .models import DetailInvoice, SellerDailySales
+
+# Periodos de agrupacion: los resumenes ya son diarios, la semana empieza el lunes
+PERIODS = {
+    'day': F('day'),
+    'week': TruncWeek('day'),
+    'month': TruncMonth('day'),
+}
+# Los mismos periodos sobre la fecha de la factura (en la zona horaria local, igual que el dia de los resumenes)
+ORDER_PERIODS = {
+    'day': TruncDate('invoice__date_created'),
+    'week': TruncWeek('invoice__date_created', output_field=DateField()),
+    'month': TruncMonth('invoice__date_created', output_field=DateField()),
+}
+# Desgloses: campo del id y del nombre del grupo (None = solo totales por periodo)
+GROUPS = {
+    'product': ('product_id', 'product__name'),
+    'category': ('product__category', 'product__category__name'),
+    'none': None,
+}
+# Dias que se consultan si no se envia el rango y rango maximo permitido
+DEFAULT_DAYS = 30
+MAX_DAYS = getattr(settings, 'SALES_ANALYTICS_MAX_DAYS', 366 * 3)
+
+
+# Funcion que valida los parametros (?period=, ?group_by=, ?from=, ?to=)
+# Retorna (period, group_by, desde, hasta) o lanza ValueError con el mensaje de error
+def parse_params(params):
+    period = params.get('period', 'day')
+    if period not in PERIODS:
+        raise ValueError(f'Periodo inválido. Opciones válidas: {list(PERIODS)}')
+    group_by = params.get('group_by', 'product')
+    if group_by not in GROUPS:
+        raise ValueError(f'Desglose inválido. Opciones válidas: {list(GROUPS)}')
+
+    end = parse_day(params, 'to') or timezone.localdate()
+    start = parse_day(params, 'from') or end - timedelta(days=DEFAULT_DAYS - 1)
+    if start > end:
+        raise ValueError('La fecha "from" no puede ser mayor que "to".')
+    if (end - start).days >= MAX_DAYS:
+        raise ValueError(f'El rango no puede superar {MAX_DAYS} días.')
+    return period, group_by, start, end
+
+
+# Funcion que retorna las ventas de un vendedor por periodo (y por producto o categoria) en columnas paralelas:
+# {'bucket': [...], 'id': [...], 'name': [...], 'revenue': [...], 'quantity': [...], 'orders': [...]}
+# Se agrupa en la base de datos sobre los resumenes diarios con una sola consulta
+# (dos con category o none, ver get_order_counts)
+def get_sales_analytics(seller, period, group_by, start, end):
+    group = GROUPS[group_by]
+    fields = ['bucket'] + (['group_id', 'group_name'] if group else [])
+    rows = (
+        SellerDailySales.objects
+        .filter(seller=seller, day__gte=start, day__lte=end)
+        .annotate(bucket=PERIODS[period])
+    )
+    if group:
+        rows = rows.annotate(group_id=F(group[0]), group_name=F(group[1]))
+    rows = (
+        rows
+        .values(*fields)
+        .annotate(total_revenue=Sum('revenue'), total_quantity=Sum('quantity'), total_orders=Sum('orders'))
+        .order_by(*fields[:2])
+        .values_list(*fields, 'total_revenue', 'total_quantity', 'total_orders')
+    )
+
+    # Los resumenes cuentan una factura por producto: sumarlos solo es correcto al agrupar por producto
+    if group_by != 'product':
+        orders = get_order_counts(seller, period, group, start, end)
+        key_size = 2 if group else 1
+        rows = [row[:-1] + (orders.get(row[:key_size], 0),) for row in rows]
+
+    names = ['bucket'] + (['id', 'name'] if group else []) + ['revenue', 'quantity', 'orders']
+    # zip(*rows) convierte las filas en columnas sin recorrerlas una por una en Python
+    columns = list(zip(*rows)) or [()] * len(names)
+    return {name: list(column) for name, column in zip(names, columns)}
+
+
+# Funcion que cuenta las facturas distintas del vendedor por periodo (y por categoria) desde los detalles
+# Una factura con varios productos del vendedor cuenta una sola vez en el periodo y en cada categoria
+# Retorna {(periodo, id de la categoria) o (periodo,): facturas}
+def get_order_counts(seller, period, group, start, end):
+    fields = ['bucket'] + (['group_id'] if group else [])
+    details = (
+        DetailInvoice.objects
+        .filter(seller=seller, invoice__date_created__date__gte=start, invoice__date_created__date__lte=end)
+        .annotate(bucket=ORDER_PERIODS[period])
+    )
+    if group:
+        details = details.annotate(group_id=F(group[0]))
+    counts = (
+        details
+        .values(*fields)
+        .annotate(orders=Count('invoice', distinct=True))
+        .order_by()
+        .values_list(*fields, 'orders')
+    )
+    return {tuple(row[:-1]): row[-1] for row in counts}
@@ -4,6 +4,3 @@ from django.apps import AppConfig
 class InvoicesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'invoices'
-    
-    def ready(self):
-        import invoices.signals
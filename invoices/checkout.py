@@ -0,0 +1,292 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+from rest_framework import serializers
+
+from cart.models import ShoppingCart
+from cart.reservations import reservations_enabled, get_reserved, consume as consume_reservations
+from notifications.utils import send_notifications
+from offers_and_coupons.models import Coupon, UserCoupon
+from offers_and_coupons.utils import get_active_offers
+from products.cache import bump_versions
+from products.models import Products, ProductImage
+from .models import Invoice, DetailInvoice
+from .rollups import record_invoice
+from .leaderboard import record_sales
+from .coupons import award_coupons
+
+
+# Funcion que suma las cantidades solicitadas por producto (un producto puede venir en varias lineas)
+def get_quantities(items):
+    quantities = {}
+    for item in items:
+        quantities[item['product_id']] = quantities.get(item['product_id'], 0) + item['quantity']
+    return quantities
+
+
+# Funcion que retorna {id_producto: stock disponible} de los productos ya consultados
+# Con las reservas activas se descuenta lo reservado por los demas carritos
+def get_available(user, products):
+    available = {product.id: product.stock for product in products.values()}
+    if reservations_enabled() and products:
+        cart = ShoppingCart.objects.filter(user=user).first()
+        reserved = get_reserved(list(products), exclude_cart=cart)
+        available = {
+            product_id: max(stock - reserved.get(product_id, 0), 0) for product_id, stock in available.items()
+        }
+    return available
+
+
+# Funcion que valida la existencia y el stock de todas las lineas con los productos ya consultados
+# Retorna una lista con el error de cada linea (None si la linea es valida)
+def get_item_errors(items, products, available):
+    quantities = get_quantities(items)
+    errors = []
+    for item in items:
+        product = products.get(item['product_id'])
+        if product is None:
+            errors.append('El producto no fue encontrado.')
+        elif available[product.id] < quantities[product.id]:
+            errors.append(
+                f'La cantidad solicitada ({quantities[product.id]}) es mayor al stock disponible '
+                f'del producto "{product.name}". Cantidad disponible: {available[product.id]}.'
+            )
+        else:
+            errors.append(None)
+    return errors
+
+
+# Funcion que lanza el error de validacion con el mismo formato que los errores por linea del serializador
+def raise_item_errors(errors):
+    if any(errors):
+        raise serializers.ValidationError({
+            'items': [{'non_field_errors': [error]} if error else {} for error in errors]
+        })
+
+
+# Funcion que valida todas las lineas de una factura con una sola consulta de productos
+# Agrega la instancia del producto a cada linea (item['product'])
+def validate_items(user, items):
+    products = Products.objects.in_bulk({item['product_id'] for item in items})
+    raise_item_errors(get_item_errors(items, products, get_available(user, products)))
+    for item in items:
+        item['product'] = products[item['product_id']]
+    return items
+
+
+# Funcion que bloquea todos los productos de la factura en una sola consulta
+# El orden por id evita bloqueos cruzados entre dos compras con los mismos productos
+def lock_products(product_ids):
+    return {
+        product.id: product
+        for product in Products.objects.select_for_update().filter(id__in=product_ids).order_by('id')
+    }
+
+
+# Error interno que deshace el descuento de stock cuando algun producto no alcanza
+class InsufficientStock(Exception):
+    pass
+
+
+# Funcion que descuenta el stock de todos los productos en un solo UPDATE
+# UPDATE ... SET stock = stock - q WHERE stock >= q: cada producto solo se actualiza si su stock alcanza
+# Se ejecuta en un punto de guardado: si no se actualizaron todos los productos se deshace el UPDATE completo
+# (no se descuenta ninguno) y retorna False. Los productos que llegan a cero quedan agotados
+def decrement_stock(quantities):
+    try:
+        with transaction.atomic():
+            if update_stock(quantities) != len(quantities):
+                raise InsufficientStock
+    except InsufficientStock:
+        return False
+    return True
+
+
+# Funcion que ejecuta el UPDATE condicional del stock, retorna el numero de productos actualizados
+def update_stock(quantities):
+    condition = Q()
+    for product_id, quantity in quantities.items():
+        condition |= Q(id=product_id, stock__gte=quantity)
+    # El estado se asigna antes que el stock: MySQL evalua las asignaciones de izquierda a derecha
+    # (las demas bases usan los valores anteriores), asi en todas se compara con el estado y el stock anteriores
+    sold_out = [
+        Q(id=product_id, stock=quantity, state='disponible') for product_id, quantity in quantities.items()
+    ]
+    return Products.objects.filter(condition).update(
+        auto_sold_out=Case(*[When(when, then=Value(True)) for when in sold_out], default=F('auto_sold_out')),
+        state=Case(*[When(when, then=Value('agotado')) for when in sold_out], default=F('state')),
+        stock=Case(
+            *[When(id=product_id, then=F('stock') - quantity) for product_id, quantity in quantities.items()],
+            default=F('stock'),
+        ),
+    )
+
+
+# Funcion que obtiene los cupones enviados en las lineas y los cupones sin usar del comprador (dos consultas)
+# Retorna ({(codigo, id_producto): cupon}, {id_cupon: [cupones del usuario]})
+def get_coupons(user, items, now):
+    codes = {item['coupon']['code'] for item in items if item.get('coupon') and item['coupon'].get('code')}
+    if not codes:
+        return {}, {}
+    coupons = {
+        (coupon.code, coupon.product_id): coupon
+        for coupon in Coupon.objects.filter(
+            code__in=codes, active=True, start_date__lte=now, end_date__gte=now
+        )
+    }
+    user_coupons = {}
+    for user_coupon in UserCoupon.objects.filter(user=user, coupon__in=coupons.values(), used=False).order_by('id'):
+        user_coupons.setdefault(user_coupon.coupon_id, []).append(user_coupon)
+    return coupons, user_coupons
+
+
+# Funcion que crea una factura con todas sus lineas con un numero de consultas que no depende de las lineas:
+# bloquea los productos, resuelve ofertas y cupones en bloque, inserta los detalles con bulk_create
+# y descuenta el stock con un solo UPDATE condicional
+@transaction.atomic
+def create_invoice(user, method, items):
+    now = timezone.now()
+    quantities = get_quantities(items)
+
+    # Bloqueamos los productos y volvemos a validar el stock (otra compra pudo terminar despues de la validacion)
+    products = lock_products(quantities)
+    raise_item_errors(get_item_errors(items, products, get_available(user, products)))
+
+    # Ofertas activas y cupones de todas las lineas
+    offers = get_active_offers(list(products), now)
+    coupons, user_coupons = get_coupons(user, items, now)
+
+    details = []
+    used_coupons = []
+    total = Decimal('0.00')
+    for item in items:
+        product = products[item['product_id']]
+        quantity = item['quantity']
+        unit_price = product.price
+        # Inicializamos el subtotal con el precio base
+        subtotal = unit_price * quantity
+
+        # Aplicamos la oferta activa del producto
+        offer = offers.get(product.id)
+        if offer:
+            subtotal *= (1 - offer.percentage / 100)
+
+        # Aplicamos el cupon si el usuario lo tiene asignado y no lo ha usado
+        coupon = None
+        coupon_payload = item.get('coupon')
+        if coupon_payload and coupon_payload.get('code'):
+            code = coupon_payload['code']
+            coupon = coupons.get((code, product.id))
+            if coupon is None:
+                raise serializers.ValidationError({"coupon": f"El cupón {code} no es válido para este producto o está inactivo/expirado."})
+            # Cada cupon del usuario solo se puede usar una vez (aunque el codigo se repita en la factura)
+            if not user_coupons.get(coupon.id):
+                raise serializers.ValidationError({"coupon": f"El cupón {code} no está asignado a tu usuario o ya fue utilizado."})
+            used_coupons.append(user_coupons[coupon.id].pop(0).id)
+            subtotal *= (1 - coupon.percentage / 100)
+
+        # Asegurarse de que el subtotal no sea negativo
+        if subtotal < 0:
+            subtotal = Decimal('0.00')
+
+        details.append(DetailInvoice(
+            seller_id=product.producer_id,
+            product=product,
+            quantity=quantity,
+            unit_price=unit_price,
+            subtotal=subtotal,
+            offer=offer,
+            coupon=coupon,
+        ))
+        total += subtotal
+
+    # Creamos la factura con el total ya calculado y sus detalles en un solo INSERT
+    invoice = Invoice.objects.create(user=user, method=method, total=total)
+    for detail in details:
+        detail.invoice = invoice
+    DetailInvoice.objects.bulk_create(details)
+    # Sumamos la factura a los resumenes diarios de ventas y gastos y al ranking de mas vendidos
+    record_invoice(invoice, details)
+    record_sales(details)
+
+    # Marcamos los cupones usados en una sola consulta
+    if used_coupons:
+        UserCoupon.objects.filter(id__in=used_coupons).update(used=True)
+
+    # Descontamos el stock, si algun producto no alcanza se deshace toda la factura
+    if not decrement_stock(quantities):
+        raise serializers.ValidationError({"items": "El stock de uno o más productos cambió, intenta de nuevo."})
+
+    # Las reservas de los productos comprados se convierten en venta (el stock ya fue descontado)
+    consume_reservations(user, list(quantities))
+
+    # Asignamos los cupones ganados con la factura (una sola vez por factura)
+    award_coupons(invoice, details)
+
+    notify_invoice(user, invoice, details)
+
+    # update() no envia post_save, invalidamos la cache del catalogo y del detalle de los productos
+    scopes = ['products'] + [f'product:{product_id}' for product_id in quantities]
+    transaction.on_commit(lambda: bump_versions(*scopes))
+    return invoice
+
+
+# Funcion que envia una notificacion de venta a cada vendedor (con todas sus lineas) y la de compra al comprador
+# Usa una consulta de imagenes y un INSERT de notificaciones y otro de la bandeja de salida
+def notify_invoice(user, invoice, details):
+    product_ids = {detail.product_id for detail in details}
+    # Primera imagen de cada producto
+    images = {}
+    for image in ProductImage.objects.filter(product_id__in=product_ids).order_by('product_id', 'id'):
+        images.setdefault(image.product_id, image.image.url)
+
+    # Lineas de cada vendedor (en el orden de la factura)
+    seller_details = {}
+    for detail in details:
+        seller_details.setdefault(detail.seller_id, []).append(detail)
+
+    notifications = []
+    for seller_id, lines in seller_details.items():
+        first = lines[0]
+        if len(lines) == 1:
+            message = (
+                f"{user.username} compró {first.quantity} {first.product.get_unit_of_measure_display()} "
+                f"de {first.product.name}."
+            )
+            data = {
+                "buyer": user.username,
+                "product": first.product.name,
+                "quantity": first.quantity
+            }
+        else:
+            message = f"{user.username} compró {len(lines)} de tus productos: {', '.join(line.product.name for line in lines)}."
+            data = {
+                "buyer": user.username,
+                "products": [{"product": line.product.name, "quantity": line.quantity} for line in lines]
+            }
+        notifications.append({
+            'user_id': seller_id,
+            'type': 'purchase',
+            'title': '¡Nueva venta!',
+            'message': message,
+            'image': images.get(first.product_id),
+            'data': data,
+        })
+
+    # Notificacion para el comprador (con la imagen y el producto de la ultima linea)
+    last = details[-1]
+    notifications.append({
+        'user_id': user.id,
+        'type': 'purchase',
+        'title': '¡Nueva Compra!',
+        'message': f"Haz realizado un nueva compra de valor total de {invoice.total}",
+        'image': images.get(last.product_id),
+        'data': {
+            "buyer": user.username,
+            "product": last.product.name,
+            "quantity": last.quantity
+        },
+    })
+    send_notifications(notifications)
@@ -0,0 +1,65 @@
+from django.utils import timezone
+
+from notifications.utils import send_notification
+from offers_and_coupons.models import Coupon, UserCoupon
+from products.models import ProductImage
+
+
+# Funcion que asigna al comprador los cupones que gano con una factura
+# Un cupon se gana si esta activo y el subtotal de alguna linea de su producto alcanza el monto minimo,
+# y no se asigna si el comprador ya tiene ese cupon sin usar y vigente
+# Usa una consulta de cupones, una de cupones del usuario, un bulk_create y una sola notificacion
+# Retorna la lista de cupones asignados
+def award_coupons(invoice, details):
+    now = timezone.now()
+    user = invoice.user
+
+    # Mayor subtotal comprado de cada producto
+    subtotals = {}
+    for detail in details:
+        subtotals[detail.product_id] = max(subtotals.get(detail.product_id, detail.subtotal), detail.subtotal)
+
+    # Cupones activos de los productos comprados (ordenados para que la notificacion sea estable)
+    coupons = [
+        coupon
+        for coupon in Coupon.objects.select_related('product').filter(
+            product_id__in=subtotals, active=True, start_date__lte=now, end_date__gte=now
+        ).order_by('id')
+        if subtotals[coupon.product_id] >= coupon.min_purchase_amount
+    ]
+    if not coupons:
+        return []
+
+    # Cupones que el usuario ya tiene sin usar y vigentes (mismo criterio que UserCoupon.has_valid_coupon)
+    owned = set(
+        UserCoupon.objects
+        .filter(user=user, coupon__in=coupons, used=False, coupon__end_date__gte=now)
+        .values_list('coupon_id', flat=True)
+    )
+    awarded = [coupon for coupon in coupons if coupon.id not in owned]
+    if not awarded:
+        return []
+    UserCoupon.objects.bulk_create([UserCoupon(user=user, coupon=coupon) for coupon in awarded])
+
+    # Una sola notificacion con todos los cupones ganados (imagen del primer producto)
+    first_image = ProductImage.objects.filter(product_id=awarded[0].product_id).order_by('id').first()
+    product_names = list(dict.fromkeys(coupon.product.name for coupon in awarded))
+    if len(awarded) == 1:
+        title = '¡Obtubiste un Nuevo Cupon!'
+        message = f"Haz Otenido un cupon para el producto {product_names[0]}"
+    else:
+        title = f'¡Obtuviste {len(awarded)} Nuevos Cupones!'
+        message = f"Haz obtenido {len(awarded)} cupones para los productos {', '.join(product_names)}"
+    send_notification(
+        user=user,
+        type='custom',
+        title=title,
+        message=message,
+        image=first_image.image.url if first_image else None,
+        data={
+            "coupons": [
+                {"product": coupon.product.name, "percentage": str(coupon.percentage)} for coupon in awarded
+            ]
+        }
+    )
+    return awarded
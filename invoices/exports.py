@@ -0,0 +1,161 @@
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import DetailInvoice
+
+# Numero de filas que se leen de la base de datos en cada consulta
+EXPORT_CHUNK_SIZE = getattr(settings, 'INVOICE_EXPORT_CHUNK_SIZE', 2000)
+# Formatos de exportacion (parametro ?output=) y su tipo de contenido
+OUTPUTS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+
+# Columnas de la exportacion de compras (nombre de la columna, campo de DetailInvoice)
+PURCHASE_COLUMNS = [
+    ('detail_id', 'id'),
+    ('invoice_id', 'invoice_id'),
+    ('date_created', 'invoice__date_created'),
+    ('method', 'invoice__method'),
+    ('invoice_total', 'invoice__total'),
+    ('product_id', 'product_id'),
+    ('product', 'product__name'),
+    ('seller', 'seller__username'),
+    ('quantity', 'quantity'),
+    ('unit_price', 'unit_price'),
+    ('subtotal', 'subtotal'),
+    ('offer_percentage', 'offer__percentage'),
+    ('coupon_code', 'coupon__code'),
+]
+
+# Columnas de la exportacion de ventas de un vendedor
+SALES_COLUMNS = [
+    ('detail_id', 'id'),
+    ('invoice_id', 'invoice_id'),
+    ('date_created', 'invoice__date_created'),
+    ('buyer', 'invoice__user__username'),
+    ('product_id', 'product_id'),
+    ('product', 'product__name'),
+    ('quantity', 'quantity'),
+    ('unit_price', 'unit_price'),
+    ('subtotal', 'subtotal'),
+    ('offer_percentage', 'offer__percentage'),
+    ('coupon_code', 'coupon__code'),
+]
+
+
+# Objeto con la interfaz de un archivo que retorna lo que se escribe (csv.writer escribe en el y no guarda nada)
+class Echo:
+    def write(self, value):
+        return value
+
+
+# Funcion que obtiene una fecha de los parametros (AAAA-MM-DD), retorna None si no se envio
+# Lanza ValueError con el mensaje de error si el formato no es valido
+def parse_day(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        day = parse_date(value)
+    except ValueError:
+        day = None
+    if day is None:
+        raise ValueError(f'La fecha "{name}" debe tener el formato AAAA-MM-DD.')
+    return day
+
+
+# Funcion que obtiene el rango de fechas (?from=AAAA-MM-DD&to=AAAA-MM-DD, ambos incluidos)
+# Retorna los filtros sobre la fecha de la factura o lanza ValueError con el mensaje de error
+def get_date_filters(params):
+    filters = {}
+    for name, lookup, offset in (('from', 'gte', 0), ('to', 'lt', 1)):
+        day = parse_day(params, name)
+        if day is not None:
+            filters[f'invoice__date_created__{lookup}'] = timezone.make_aware(
+                datetime.combine(day + timedelta(days=offset), time.min)
+            )
+    return filters
+
+
+# Funcion que recorre las filas del queryset por bloques ordenados por id (paginacion por llave)
+# Cada bloque es una consulta independiente: la memoria no crece con el numero de filas, aun en MySQL
+# donde iterator() recibe todo el resultado en el cliente
+def iter_chunks(queryset, fields, chunk_size=EXPORT_CHUNK_SIZE):
+    last_id = 0
+    while True:
+        rows = list(queryset.filter(id__gt=last_id).order_by('id').values_list(*fields)[:chunk_size])
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1][0]
+
+
+# Funcion que convierte un valor en texto para el CSV
+def format_value(value):
+    if value is None:
+        return ''
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+# Funcion que genera el CSV por bloques (con BOM para que Excel reconozca los acentos)
+def render_csv(columns, chunks):
+    writer = csv.writer(Echo())
+    yield '\ufeff' + writer.writerow([name for name, _ in columns])
+    for rows in chunks:
+        yield ''.join(writer.writerow([format_value(value) for value in row]) for row in rows)
+
+
+# Funcion que genera el NDJSON (un objeto JSON por linea) por bloques
+def render_ndjson(columns, chunks):
+    names = [name for name, _ in columns]
+    for rows in chunks:
+        yield ''.join(
+            json.dumps(dict(zip(names, row)), cls=DjangoJSONEncoder, ensure_ascii=False) + '\n' for row in rows
+        )
+
+
+# Funcion que recorre un generador sincrono desde el servidor ASGI sin cargarlo completo en memoria
+# Cada bloque se obtiene en el hilo de Django (las consultas usan la misma conexion)
+async def iterate_async(content):
+    content = iter(content)
+    while True:
+        part = await sync_to_async(next, thread_sensitive=True)(content, None)
+        if part is None:
+            return
+        yield part
+
+
+# Funcion que construye la respuesta de la exportacion
+# queryset son los detalles a exportar, columns la lista de columnas y output el formato (csv o ndjson)
+def export_response(request, queryset, columns, output, filename):
+    chunks = iter_chunks(queryset, [field for _, field in columns])
+    content = render_csv(columns, chunks) if output == 'csv' else render_ndjson(columns, chunks)
+    # Con ASGI un generador sincrono se consumiria completo antes de enviarse
+    # (request puede ser la peticion de DRF, que guarda la de Django en _request)
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        content = iterate_async(content)
+    response = StreamingHttpResponse(content, content_type=OUTPUTS[output])
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{output}"'
+    return response
+
+
+# Funcion que retorna los detalles de las compras de un usuario
+def get_purchases(user):
+    return DetailInvoice.objects.filter(invoice__user=user)
+
+
+# Funcion que retorna los detalles de las ventas de un vendedor
+def get_sales(user):
+    return DetailInvoice.objects.filter(seller=user)
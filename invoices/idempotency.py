@@ -0,0 +1,86 @@
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+# Tiempo (segundos) que se guarda la respuesta de una llave
+IDEMPOTENCY_TTL = getattr(settings, 'INVOICE_IDEMPOTENCY_TTL', 60 * 60 * 24)
+MAX_KEY_LENGTH = 255
+
+
+# Funcion que retorna la huella de una peticion (ruta y cuerpo con las llaves ordenadas)
+def get_fingerprint(request):
+    raw = json.dumps({'path': request.path, 'data': request.data}, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+# Funcion que obtiene (o crea) el registro de una llave en su propia transaccion
+# Una llave vencida se reemplaza como si no existiera
+def claim_key(user, key, fingerprint):
+    now = timezone.now()
+    IdempotencyKey.objects.filter(user=user, key=key, expires_at__lte=now).delete()
+    try:
+        with transaction.atomic():
+            record, _ = IdempotencyKey.objects.get_or_create(
+                user=user, key=key,
+                defaults={'fingerprint': fingerprint, 'expires_at': now + timedelta(seconds=IDEMPOTENCY_TTL)},
+            )
+    except IntegrityError:
+        # Otra peticion con la misma llave creo el registro al mismo tiempo
+        record = IdempotencyKey.objects.get(user=user, key=key)
+    return record
+
+
+# Decorador para el metodo post de una vista que crea facturas
+# Si la peticion trae el encabezado Idempotency-Key la respuesta se guarda junto con la factura (misma transaccion)
+# y los reintentos con la misma llave retornan esa respuesta sin tocar productos ni stock
+def idempotent(method):
+    @wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if not key:
+            return method(self, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response({'detail': f'El encabezado Idempotency-Key no puede superar {MAX_KEY_LENGTH} caracteres.'}, status=400)
+
+        fingerprint = get_fingerprint(request)
+        claim_key(request.user, key, fingerprint)
+        with transaction.atomic():
+            # Bloqueamos la llave: un reintento simultaneo espera a que la peticion original termine
+            record = IdempotencyKey.objects.select_for_update().get(user=request.user, key=key)
+            if record.fingerprint != fingerprint:
+                return Response(
+                    {'detail': 'La llave Idempotency-Key ya se utilizó con una petición diferente.'},
+                    status=422,
+                )
+            if record.status_code is not None:
+                return Response(record.response, status=record.status_code, headers={'Idempotent-Replayed': 'true'})
+
+            response = method(self, request, *args, **kwargs)
+            # Los errores del servidor no se guardan, el cliente puede reintentar con la misma llave
+            if response.status_code < 500:
+                record.status_code = response.status_code
+                record.response = response.data
+                if response.status_code == 201 and isinstance(response.data, dict):
+                    record.invoice_id = response.data.get('id')
+                record.save(update_fields=['status_code', 'response', 'invoice'])
+            return response
+    return wrapper
+
+
+# Funcion que elimina las llaves vencidas por bloques, retorna el numero eliminado
+def purge_expired(batch_size=1000):
+    now = timezone.now()
+    total = 0
+    while True:
+        ids = list(IdempotencyKey.objects.filter(expires_at__lte=now).values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return total
+        total += IdempotencyKey.objects.filter(id__in=ids).delete()[0]
@@ -0,0 +1,75 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from products.cache import bump_versions
+from .models import BestSeller, SellerDailySales
+from .rollups import apply_increments
+
+# Ventanas del ranking: nombre -> numero de dias (None = todo el tiempo)
+WINDOWS = {'all': None, '30d': 30, '7d': 7}
+DEFAULT_WINDOW = 'all'
+
+
+# Funcion que suma las unidades de una factura nueva a todas las ventanas del ranking
+# Se llama dentro de la transaccion que crea la factura
+def record_sales(details):
+    quantities = {}
+    for detail in details:
+        quantities[detail.product_id] = quantities.get(detail.product_id, 0) + detail.quantity
+    apply_increments(
+        BestSeller, ('window', 'product_id'),
+        {(window, product_id): {'quantity': quantity} for window in WINDOWS for product_id, quantity in quantities.items()},
+    )
+
+
+# Funcion que retorna los ids de los productos mas vendidos de una ventana (opcionalmente de una categoria)
+# Es una sola consulta sobre el indice (window, -quantity, product)
+def get_top_product_ids(window=DEFAULT_WINDOW, category_id=None, limit=5):
+    ranking = BestSeller.objects.filter(window=window, quantity__gt=0)
+    if category_id is not None:
+        ranking = ranking.filter(product__category=category_id)
+    return list(ranking.order_by('-quantity', 'product_id').values_list('product_id', flat=True)[:limit])
+
+
+# Funcion que recalcula una ventana desde los resumenes diarios de ventas, retorna el numero de productos
+# Las ventanas de dias se deben recalcular periodicamente para que las ventas antiguas salgan del ranking
+# No se borra la ventana: se bloquean sus filas (en orden de id, igual que record_sales) y despues se leen los totales,
+# asi una compra confirmada antes del bloqueo queda en los totales y una que espera el bloqueo suma despues.
+# Luego se actualizan las filas que cambiaron, se crean las que faltan y se eliminan las que quedaron sin ventas
+@transaction.atomic
+def refresh_window(window, batch_size=1000):
+    current = {
+        row.product_id: row
+        for row in BestSeller.objects.select_for_update().filter(window=window).order_by('id').only('id', 'product_id', 'quantity')
+    }
+
+    sales = SellerDailySales.objects.all()
+    days = WINDOWS[window]
+    if days is not None:
+        sales = sales.filter(day__gt=timezone.localdate() - timedelta(days=days))
+    totals = sales.values('product_id').annotate(total_quantity=Sum('quantity')).order_by()
+
+    to_update = []
+    to_create = []
+    products = 0
+    for row in totals.iterator(chunk_size=batch_size):
+        products += 1
+        best_seller = current.pop(row['product_id'], None)
+        if best_seller is None:
+            to_create.append(BestSeller(window=window, product_id=row['product_id'], quantity=row['total_quantity']))
+        elif best_seller.quantity != row['total_quantity']:
+            best_seller.quantity = row['total_quantity']
+            to_update.append(best_seller)
+
+    BestSeller.objects.bulk_update(to_update, ['quantity'], batch_size=batch_size)
+    BestSeller.objects.bulk_create(to_create, batch_size=batch_size, ignore_conflicts=True)
+    # Los productos que quedaron en la ventana sin ventas salen del ranking
+    stale = [row.id for row in current.values()]
+    for start in range(0, len(stale), batch_size):
+        BestSeller.objects.filter(id__in=stale[start:start + batch_size]).delete()
+    # El ranking se guarda en la cache de respuestas del catalogo
+    transaction.on_commit(lambda: bump_versions('products'))
+    return products
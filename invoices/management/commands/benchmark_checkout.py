@@ -0,0 +1,108 @@
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from notifications.utils import send_notification
+from offers_and_coupons.models import Offers
+from products.models import Products
+from users.models import CustomUser
+from invoices.checkout import create_invoice
+from invoices.models import Invoice, DetailInvoice
+
+
+# Facturacion linea por linea (como se hacia antes del checkout por bloques), solo como referencia
+def create_invoice_per_line(user, method, items):
+    now = timezone.now()
+    invoice = Invoice.objects.create(user=user, method=method, total=Decimal('0.00'))
+    total = Decimal('0.00')
+    for item in items:
+        product = Products.objects.select_for_update().get(id=item['product_id'])
+        subtotal = product.price * item['quantity']
+        offer = Offers.objects.filter(
+            product=product, active=True, start_date__lte=now, end_date__gte=now
+        ).first()
+        if offer:
+            subtotal *= (1 - offer.percentage / 100)
+        DetailInvoice.objects.create(
+            seller=product.producer, invoice=invoice, product=product, quantity=item['quantity'],
+            unit_price=product.price, subtotal=subtotal, offer=offer,
+        )
+        first_image = product.images.first()
+        send_notification(
+            user=product.producer, type='purchase', title='¡Nueva venta!',
+            message=f"{user.username} compró {item['quantity']} de {product.name}.",
+            image=first_image.image.url if first_image else None,
+        )
+        product.stock -= item['quantity']
+        product.save()
+        total += subtotal
+    invoice.total = total
+    invoice.save()
+    send_notification(user=user, type='purchase', title='¡Nueva Compra!', message=f"Compra de {total}")
+    return invoice
+
+
+# Comando que mide las consultas y el tiempo de crear facturas de 1, 10 y 50 lineas
+# con el checkout por bloques y con la facturacion linea por linea
+# Todo se ejecuta dentro de una transaccion que se deshace al final (no deja datos)
+class Command(BaseCommand):
+    help = 'Compara el numero de consultas y el tiempo de facturacion por bloques contra linea por linea'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', nargs='+', type=int, default=[1, 10, 50])
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            buyer, products = self.create_data(max(options['lines']), options['repeat'] * 2 * len(options['lines']))
+            self.stdout.write(
+                f"{'lineas':>7} {'bloques (consultas)':>20} {'bloques (ms)':>13} "
+                f"{'por linea (consultas)':>22} {'por linea (ms)':>15}"
+            )
+            for lines in options['lines']:
+                items = [{'product_id': product.id, 'quantity': 1} for product in products[:lines]]
+                engine = self.measure(create_invoice, buyer, items, options['repeat'])
+                per_line = self.measure(create_invoice_per_line, buyer, items, options['repeat'])
+                self.stdout.write(
+                    f'{lines:>7} {engine[0]:>20} {engine[1]:>13.1f} {per_line[0]:>22} {per_line[1]:>15.1f}'
+                )
+            transaction.set_rollback(True)
+
+    # Funcion que crea un comprador, un productor y sus productos con stock para todas las mediciones (la mitad con oferta)
+    def create_data(self, size, stock):
+        suffix = uuid.uuid4().hex[:8]
+        seller = CustomUser.objects.create_user(
+            username=f'bench-seller-{suffix}', email=f'seller-{suffix}@bench.local', user_type='group'
+        )
+        buyer = CustomUser.objects.create_user(username=f'bench-buyer-{suffix}', email=f'buyer-{suffix}@bench.local')
+        now = timezone.now()
+        products = []
+        for number in range(size):
+            product = Products.objects.create(
+                name=f'Producto {number}', description='Producto de prueba', price=Decimal('1000.00') + number,
+                stock=stock, producer=seller,
+            )
+            if number % 2 == 0:
+                Offers.objects.create(
+                    seller=seller, product=product, title='Oferta', percentage=Decimal('10'),
+                    start_date=now - timedelta(days=1), end_date=now + timedelta(days=1),
+                )
+            products.append(product)
+        return buyer, products
+
+    # Funcion que retorna (consultas por factura, milisegundos promedio por factura)
+    def measure(self, function, buyer, items, repeat):
+        elapsed = 0
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(repeat):
+                start = time.perf_counter()
+                with transaction.atomic():
+                    function(buyer, 'efectivo', items)
+                elapsed += time.perf_counter() - start
+        return len(queries) // repeat, elapsed * 1000 / repeat
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from invoices.idempotency import purge_expired
+
+
+# Comando que elimina las llaves Idempotency-Key vencidas (se puede programar con cron o ejecutar con --interval)
+class Command(BaseCommand):
+    help = 'Elimina por bloques las llaves de idempotencia de facturas que ya expiraron'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--interval', type=int, default=0, help='Segundos entre ejecuciones (0 = una sola vez)')
+
+    def handle(self, *args, **options):
+        while True:
+            purged = purge_expired(options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Se eliminaron {purged} llaves vencidas.'))
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
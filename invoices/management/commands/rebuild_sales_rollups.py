@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from invoices.rollups import rebuild_rollups
+
+
+# Comando que reconstruye los resumenes diarios de ventas y gastos desde todas las facturas
+# La migracion 0014_backfill_sales_rollups los llena al instalarlos, el comando sirve para reconstruirlos si se desajustan
+class Command(BaseCommand):
+    help = 'Reconstruye las tablas SellerDailySales y BuyerDailySpend desde las facturas existentes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        seller_rows, buyer_rows = rebuild_rollups(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Se crearon {seller_rows} filas de ventas por vendedor y {buyer_rows} filas de gasto por comprador.'
+        ))
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from invoices.leaderboard import refresh_window, WINDOWS
+
+
+# Comando que recalcula las ventanas del ranking de mas vendidos desde los resumenes diarios de ventas
+# Por defecto recalcula las ventanas de dias (30d, 7d), con --all tambien la de todo el tiempo
+# Se puede programar con cron o ejecutar con --interval
+class Command(BaseCommand):
+    help = 'Recalcula el ranking de productos mas vendidos (ventanas de 30 y 7 dias)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Recalcula tambien la ventana de todo el tiempo')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--interval', type=int, default=0, help='Segundos entre ejecuciones (0 = una sola vez)')
+
+    def handle(self, *args, **options):
+        windows = [window for window, days in WINDOWS.items() if days is not None or options['all']]
+        while True:
+            for window in windows:
+                created = refresh_window(window, options['batch_size'])
+                self.stdout.write(self.style.SUCCESS(f'Ventana {window}: {created} productos.'))
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,116 @@
+import random
+import threading
+import time
+import uuid
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection
+from django.db.models import Sum
+from rest_framework.exceptions import ValidationError
+
+from products.models import Products
+from users.models import CustomUser
+from invoices.checkout import create_invoice
+from invoices.models import Invoice, DetailInvoice
+
+
+# Comando que compra al mismo tiempo desde varios hilos los mismos productos hasta agotarlos
+# y verifica que no se venda mas del stock: unidades vendidas = stock inicial - stock final, stock final >= 0
+# y los productos sin stock quedan agotados
+# Usa la base de datos configurada (ejecutar contra una base local), al final elimina los datos creados
+class Command(BaseCommand):
+    help = 'Prueba de carga del descuento de stock con compras concurrentes (no debe haber sobreventa)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--buyers', type=int, default=20, help='Numero de hilos (un comprador por hilo)')
+        parser.add_argument('--products', type=int, default=3)
+        parser.add_argument('--stock', type=int, default=50, help='Stock inicial de cada producto')
+        parser.add_argument('--max-quantity', type=int, default=3, help='Cantidad maxima por linea')
+        parser.add_argument('--attempts', type=int, default=20, help='Compras que intenta cada comprador')
+        parser.add_argument('--seed', type=int, default=7)
+        parser.add_argument('--keep', action='store_true', help='No elimina los datos creados')
+
+    def handle(self, *args, **options):
+        suffix = uuid.uuid4().hex[:8]
+        seller = CustomUser.objects.create_user(
+            username=f'stress-seller-{suffix}', email=f'seller-{suffix}@stress.local', user_type='group'
+        )
+        buyers = [
+            CustomUser.objects.create_user(username=f'stress-buyer-{suffix}-{number}', email=f'buyer-{suffix}-{number}@stress.local')
+            for number in range(options['buyers'])
+        ]
+        products = [
+            Products.objects.create(
+                name=f'Producto {number}', description='Prueba de carga', price=Decimal('1000.00'),
+                stock=options['stock'], producer=seller,
+            )
+            for number in range(options['products'])
+        ]
+        product_ids = [product.id for product in products]
+
+        results = {'invoices': 0, 'rejected': 0, 'errors': 0}
+        lock = threading.Lock()
+        start_barrier = threading.Barrier(len(buyers))
+
+        # Cada comprador intenta comprar varias lineas de productos al azar (en distinto orden)
+        def buy(buyer, seed):
+            rng = random.Random(seed)
+            start_barrier.wait()
+            try:
+                for _ in range(options['attempts']):
+                    chosen = rng.sample(product_ids, rng.randint(1, len(product_ids)))
+                    items = [{'product_id': product_id, 'quantity': rng.randint(1, options['max_quantity'])} for product_id in chosen]
+                    try:
+                        create_invoice(buyer, 'efectivo', items)
+                        outcome = 'invoices'
+                    except ValidationError:
+                        outcome = 'rejected'
+                    except DatabaseError as error:
+                        # Bloqueos mutuos o tiempos de espera de la base de datos (la compra se deshace)
+                        self.stderr.write(f'{buyer.username}: {error}')
+                        outcome = 'errors'
+                    with lock:
+                        results[outcome] += 1
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=buy, args=(buyer, options['seed'] + number))
+            for number, buyer in enumerate(buyers)
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        try:
+            self.check_results(products, options['stock'])
+            self.stdout.write(self.style.SUCCESS(
+                f"Sin sobreventa: {results['invoices']} facturas, {results['rejected']} rechazadas por stock, "
+                f"{results['errors']} errores de base de datos en {elapsed:.1f} s."
+            ))
+        finally:
+            if not options['keep']:
+                Invoice.objects.filter(user__in=buyers).delete()
+                Products.objects.filter(id__in=product_ids).delete()
+                CustomUser.objects.filter(id__in=[seller.id] + [buyer.id for buyer in buyers]).delete()
+
+    # Funcion que compara el stock final de cada producto con las unidades facturadas
+    def check_results(self, products, initial_stock):
+        sold = dict(
+            DetailInvoice.objects
+            .filter(product__in=products)
+            .values('product_id')
+            .annotate(total=Sum('quantity'))
+            .values_list('product_id', 'total')
+        )
+        for product in Products.objects.filter(id__in=[product.id for product in products]).order_by('id'):
+            units = sold.get(product.id, 0)
+            self.stdout.write(f'{product.name}: vendidas {units}, stock final {product.stock}, estado {product.state}')
+            if product.stock < 0 or units + product.stock != initial_stock:
+                raise CommandError(f'Sobreventa en {product.name}: vendidas {units}, stock final {product.stock}')
+            if product.stock == 0 and product.state != 'agotado':
+                raise CommandError(f'{product.name} no tiene stock y no quedo agotado')
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.5 on 2026-10-18 11:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invoices', '0011_sales_rollups'),
+        ('products', '0015_productimage_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BestSeller',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('window', models.CharField(choices=[('all', 'Todo el tiempo'), ('30d', 'Ultimos 30 dias'), ('7d', 'Ultimos 7 dias')], max_length=5)),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='best_seller_ranks', to='products.products')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['window', '-quantity', 'product'], name='best_seller_rank_idx')],
+                'unique_together': {('window', 'product')},
+            },
+        ),
+    ]
@@ -0,0 +1,59 @@
+from django.db import migrations
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+# Llenamos los resumenes diarios con las facturas que ya existen (igual que invoices.rollups.rebuild_rollups)
+# Sin esto las estadisticas de los usuarios quedarian en cero hasta ejecutar rebuild_sales_rollups
+def backfill_rollups(apps, schema_editor):
+    Invoice = apps.get_model('invoices', 'Invoice')
+    DetailInvoice = apps.get_model('invoices', 'DetailInvoice')
+    SellerDailySales = apps.get_model('invoices', 'SellerDailySales')
+    BuyerDailySpend = apps.get_model('invoices', 'BuyerDailySpend')
+
+    SellerDailySales.objects.all().delete()
+    BuyerDailySpend.objects.all().delete()
+
+    sales = (
+        DetailInvoice.objects
+        .values('seller_id', 'product_id', day=TruncDate('invoice__date_created'))
+        .annotate(total_quantity=Sum('quantity'), total_revenue=Sum('subtotal'), total_orders=Count('invoice_id', distinct=True))
+        .order_by()
+    )
+    batch = []
+    for row in sales.iterator(chunk_size=1000):
+        batch.append(SellerDailySales(
+            seller_id=row['seller_id'], product_id=row['product_id'], day=row['day'],
+            quantity=row['total_quantity'], revenue=row['total_revenue'], orders=row['total_orders'],
+        ))
+        if len(batch) >= 1000:
+            SellerDailySales.objects.bulk_create(batch)
+            batch = []
+    SellerDailySales.objects.bulk_create(batch)
+
+    spend = (
+        Invoice.objects
+        .values('user_id', day=TruncDate('date_created'))
+        .annotate(total_spent=Sum('total'), total_orders=Count('id'))
+        .order_by()
+    )
+    batch = []
+    for row in spend.iterator(chunk_size=1000):
+        batch.append(BuyerDailySpend(
+            user_id=row['user_id'], day=row['day'], total=row['total_spent'], orders=row['total_orders'],
+        ))
+        if len(batch) >= 1000:
+            BuyerDailySpend.objects.bulk_create(batch)
+            batch = []
+    BuyerDailySpend.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invoices', '0013_invoice_user_date_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
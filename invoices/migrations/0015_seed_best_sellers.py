@@ -0,0 +1,41 @@
+from datetime import timedelta
+
+from django.db import migrations
+from django.db.models import Sum
+from django.utils import timezone
+
+# Ventanas del ranking (igual que invoices.leaderboard.WINDOWS)
+WINDOWS = {'all': None, '30d': 30, '7d': 7}
+
+
+# Llenamos las ventanas del ranking con las ventas que ya existen en las facturas
+# (sin esto la ventana de todo el tiempo quedaria vacia hasta ejecutar refresh_best_sellers --all)
+def seed_best_sellers(apps, schema_editor):
+    BestSeller = apps.get_model('invoices', 'BestSeller')
+    DetailInvoice = apps.get_model('invoices', 'DetailInvoice')
+
+    for window, days in WINDOWS.items():
+        details = DetailInvoice.objects.all()
+        if days is not None:
+            details = details.filter(invoice__date_created__date__gt=timezone.localdate() - timedelta(days=days))
+        totals = details.values('product_id').annotate(total_quantity=Sum('quantity')).order_by()
+
+        BestSeller.objects.filter(window=window).delete()
+        batch = []
+        for row in totals.iterator(chunk_size=1000):
+            batch.append(BestSeller(window=window, product_id=row['product_id'], quantity=row['total_quantity']))
+            if len(batch) >= 1000:
+                BestSeller.objects.bulk_create(batch)
+                batch = []
+        BestSeller.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invoices', '0014_backfill_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_best_sellers, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,4 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from offers_and_coupons.models import Offers, Coupon
 # Create your models here.
@@ -18,6 +19,12 @@ class Invoice(models.Model):
     # Total de factura
     total = models.DecimalField(max_digits=10, decimal_places=2)
 
+    class Meta:
+        indexes = [
+            # Indice para la paginacion por cursor del historial de facturas de un usuario
+            models.Index(fields=['user', 'date_created'], name='invoice_user_date_idx'),
+        ]
+
     # Mensaje que se vera en el admin
     def __str__(self):
         return f'Invoice #{self.id} - {self.user.username}'
@@ -43,4 +50,92 @@ class DetailInvoice(models.Model):
     def __str__(self):
         return f'{self.quantity} x {getattr(self.product, "name", "Producto")} en factura #{self.invoice_id}'
 
-    
\ No newline at end of file
+
+# Modelo que guarda las llaves de idempotencia (encabezado Idempotency-Key) de la creacion de facturas
+# Un reintento con la misma llave retorna la respuesta guardada sin volver a crear la factura
+class IdempotencyKey(models.Model):
+    # Usuario que envio la peticion (las llaves son por usuario)
+    user = models.ForeignKey('users.CustomUser', on_delete=models.CASCADE, related_name='idempotency_keys')
+    # Valor del encabezado Idempotency-Key
+    key = models.CharField(max_length=255)
+    # Huella de la peticion (ruta y cuerpo), una llave no se puede usar con otra peticion
+    fingerprint = models.CharField(max_length=64)
+    # Respuesta guardada, vacia mientras la peticion original no termina
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    # Factura creada con la llave
+    invoice = models.ForeignKey(Invoice, on_delete=models.SET_NULL, null=True, blank=True, related_name='idempotency_keys')
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Fecha en la que la llave deja de ser valida y se puede eliminar
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('user', 'key')
+        indexes = [
+            # Indice para eliminar las llaves vencidas por bloques
+            models.Index(fields=['expires_at'], name='idempotency_expires_idx'),
+        ]
+
+    # Mensaje que se vera en el admin
+    def __str__(self):
+        return f'{self.key} - {self.user_id}'
+
+
+
+# Modelo con las ventas diarias de cada producto de un vendedor (se actualiza al crear cada factura)
+# Las estadisticas leen estas filas (una por producto y dia) en lugar de recorrer todos los detalles
+class SellerDailySales(models.Model):
+    seller = models.ForeignKey('users.CustomUser', on_delete=models.CASCADE, related_name='daily_sales')
+    product = models.ForeignKey('products.Products', on_delete=models.CASCADE, related_name='daily_sales')
+    day = models.DateField()
+    # Unidades vendidas, total vendido (suma de subtotales) y numero de facturas del dia
+    quantity = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    orders = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('seller', 'product', 'day')
+        indexes = [
+            models.Index(fields=['seller', 'day'], name='seller_sales_day_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.seller_id} - {self.product_id} ({self.day})'
+
+
+# Modelo con el gasto diario de cada comprador (se actualiza al crear cada factura)
+class BuyerDailySpend(models.Model):
+    user = models.ForeignKey('users.CustomUser', on_delete=models.CASCADE, related_name='daily_spend')
+    day = models.DateField()
+    # Total gastado y numero de facturas del dia
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    orders = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('user', 'day')
+
+    def __str__(self):
+        return f'{self.user_id} ({self.day})'
+
+
+# Modelo con las unidades vendidas de cada producto por ventana de tiempo (ranking de mas vendidos)
+# Se incrementa al crear cada factura, las ventanas de 30 y 7 dias se recalculan periodicamente
+class BestSeller(models.Model):
+    WINDOW_CHOICES = [
+        ('all', 'Todo el tiempo'),
+        ('30d', 'Ultimos 30 dias'),
+        ('7d', 'Ultimos 7 dias'),
+    ]
+    window = models.CharField(max_length=5, choices=WINDOW_CHOICES)
+    product = models.ForeignKey('products.Products', on_delete=models.CASCADE, related_name='best_seller_ranks')
+    quantity = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('window', 'product')
+        indexes = [
+            # Indice para leer el top de una ventana ya ordenado
+            models.Index(fields=['window', '-quantity', 'product'], name='best_seller_rank_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.product_id} ({self.window}): {self.quantity}'
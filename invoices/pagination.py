@@ -0,0 +1,11 @@
+from django.conf import settings
+
+from campeche_backend.pagination import KeysetPagination
+
+
+# Paginacion del historial de facturas de un usuario, de la mas reciente a la mas antigua
+class InvoiceCursorPagination(KeysetPagination):
+    # Ordenamos por fecha de creacion y por id para desempatar (indice invoice_user_date_idx)
+    ordering = ('-date_created', '-id')
+    page_size = getattr(settings, 'INVOICE_PAGE_SIZE', 20)
+    max_page_size = getattr(settings, 'INVOICE_MAX_PAGE_SIZE', 100)
@@ -0,0 +1,107 @@
+from decimal import Decimal, ROUND_HALF_EVEN
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Invoice, DetailInvoice, SellerDailySales, BuyerDailySpend
+
+CENT = Decimal('0.01')
+
+
+# Funcion que redondea un valor a centavos igual que al guardarlo en un DecimalField
+def to_cents(value):
+    return Decimal(value).quantize(CENT, rounding=ROUND_HALF_EVEN)
+
+
+# Funcion que suma los incrementos a las filas de un resumen diario con un numero fijo de consultas:
+# crea las filas que faltan en cero, las bloquea en orden y las actualiza con bulk_update (F + incremento)
+# increments es {(valores de unique_fields): {campo: incremento}}
+def apply_increments(model, unique_fields, increments):
+    if not increments:
+        return
+    model.objects.bulk_create(
+        [model(**dict(zip(unique_fields, key))) for key in increments],
+        ignore_conflicts=True,
+    )
+    # Filtramos por cada campo del conjunto de llaves y descartamos en memoria las combinaciones que no se pidieron
+    lookup = {f'{field}__in': {key[index] for key in increments} for index, field in enumerate(unique_fields)}
+    rows = []
+    for row in model.objects.select_for_update().filter(**lookup).order_by('id'):
+        values = increments.get(tuple(getattr(row, field) for field in unique_fields))
+        if values is None:
+            continue
+        for field, value in values.items():
+            setattr(row, field, F(field) + value)
+        rows.append(row)
+    model.objects.bulk_update(rows, list(next(iter(increments.values()))))
+
+
+# Funcion que suma una factura nueva a los resumenes diarios del comprador y de los vendedores
+# Se llama dentro de la transaccion que crea la factura
+def record_invoice(invoice, details):
+    day = timezone.localdate(invoice.date_created)
+
+    sales = {}
+    for detail in details:
+        values = sales.setdefault(
+            (detail.seller_id, detail.product_id, day), {'quantity': 0, 'revenue': Decimal('0.00'), 'orders': 1}
+        )
+        values['quantity'] += detail.quantity
+        values['revenue'] += to_cents(detail.subtotal)
+    apply_increments(SellerDailySales, ('seller_id', 'product_id', 'day'), sales)
+
+    apply_increments(
+        BuyerDailySpend, ('user_id', 'day'),
+        {(invoice.user_id, day): {'total': to_cents(invoice.total), 'orders': 1}},
+    )
+
+
+# Funcion que reconstruye los resumenes diarios desde las facturas, retorna (filas de vendedores, filas de compradores)
+@transaction.atomic
+def rebuild_rollups(batch_size=1000):
+    SellerDailySales.objects.all().delete()
+    BuyerDailySpend.objects.all().delete()
+
+    sales = (
+        DetailInvoice.objects
+        .values('seller_id', 'product_id', day=TruncDate('invoice__date_created'))
+        .annotate(total_quantity=Sum('quantity'), total_revenue=Sum('subtotal'), total_orders=Count('invoice_id', distinct=True))
+        .order_by()
+    )
+    seller_rows = bulk_insert(SellerDailySales, (
+        SellerDailySales(
+            seller_id=row['seller_id'], product_id=row['product_id'], day=row['day'],
+            quantity=row['total_quantity'], revenue=row['total_revenue'], orders=row['total_orders'],
+        )
+        for row in sales.iterator(chunk_size=batch_size)
+    ), batch_size)
+
+    spend = (
+        Invoice.objects
+        .values('user_id', day=TruncDate('date_created'))
+        .annotate(total_spent=Sum('total'), total_orders=Count('id'))
+        .order_by()
+    )
+    buyer_rows = bulk_insert(BuyerDailySpend, (
+        BuyerDailySpend(user_id=row['user_id'], day=row['day'], total=row['total_spent'], orders=row['total_orders'])
+        for row in spend.iterator(chunk_size=batch_size)
+    ), batch_size)
+    return seller_rows, buyer_rows
+
+
+# Funcion que inserta los objetos de un generador por bloques, retorna el numero insertado
+def bulk_insert(model, objects, batch_size):
+    total = 0
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) >= batch_size:
+            model.objects.bulk_create(batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        model.objects.bulk_create(batch)
+        total += len(batch)
+    return total
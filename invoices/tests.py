@@ -1,3 +1,305 @@
-from django.test import TestCase
+import threading
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connection
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+
+from offers_and_coupons.models import Offers, Coupon
+from products.models import Products, Category
+from notifications.models import Notification
+from users.models import CustomUser
+from .checkout import create_invoice, decrement_stock
+from .leaderboard import refresh_window
+from .models import Invoice, DetailInvoice, BestSeller, SellerDailySales
+
+
+# Pruebas del historial de facturas paginado
+class InvoiceListViewTests(TestCase):
+    def setUp(self):
+        self.buyer = CustomUser.objects.create_user(username='comprador', email='comprador@test.com', password='x')
+        now = timezone.now()
+        # Cada factura tiene lineas de vendedores, productos, ofertas y cupones distintos
+        for number in range(6):
+            seller = CustomUser.objects.create_user(
+                username=f'vendedor{number}', email=f'vendedor{number}@test.com', password='x'
+            )
+            invoice = Invoice.objects.create(user=self.buyer, method='efectivo', total=Decimal('30.00'))
+            for line in range(3):
+                product = Products.objects.create(
+                    name=f'Producto {number}-{line}', description='d', price=Decimal('10.00'), stock=10, producer=seller
+                )
+                offer = Offers.objects.create(
+                    seller=seller, product=product, title='Oferta', percentage=Decimal('10'),
+                    start_date=now - timedelta(days=1), end_date=now + timedelta(days=1),
+                )
+                coupon = Coupon.objects.create(
+                    seller=seller, product=product, percentage=Decimal('5'), min_purchase_amount=Decimal('1'),
+                    start_date=now - timedelta(days=1), end_date=now + timedelta(days=1),
+                )
+                DetailInvoice.objects.create(
+                    invoice=invoice, product=product, seller=seller, quantity=1,
+                    unit_price=Decimal('10.00'), subtotal=Decimal('10.00'), offer=offer, coupon=coupon,
+                )
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+
+    # El numero de consultas no depende del numero de facturas ni de lineas de la pagina:
+    # COUNT, facturas con su usuario y detalles con producto, vendedor, oferta y cupon
+    def test_list_query_count(self):
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/invoices/list-invoice/', {'page_size': 6})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 6)
+        self.assertEqual(len(response.data['results'][0]['details']), 3)
+
+        with self.assertNumQueries(3):
+            self.client.get('/api/invoices/list-invoice/', {'page_size': 2})
+
+    # Las paginas siguen el orden (date_created, id) de la mas reciente a la mas antigua sin repetir facturas
+    def test_list_cursor_pages(self):
+        ids = []
+        url = '/api/invoices/list-invoice/?page_size=4'
+        while url:
+            response = self.client.get(url)
+            ids.extend(invoice['id'] for invoice in response.data['results'])
+            url = response.data['next']
+        expected = list(
+            Invoice.objects.filter(user=self.buyer).order_by('-date_created', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(ids, expected)
+
+
+# Pruebas de la creacion de facturas
+class InvoiceCreateViewTests(TestCase):
+    def setUp(self):
+        self.buyer = CustomUser.objects.create_user(username='comprador', email='comprador@test.com', password='x')
+        now = timezone.now()
+        self.products = []
+        for number in range(6):
+            # Dos productos por vendedor, la mitad con oferta
+            if number % 2 == 0:
+                seller = CustomUser.objects.create_user(
+                    username=f'vendedor{number}', email=f'vendedor{number}@test.com', password='x'
+                )
+            product = Products.objects.create(
+                name=f'Producto {number}', description='d', price=Decimal('10.00'), stock=50, producer=seller
+            )
+            if number % 2 == 0:
+                Offers.objects.create(
+                    seller=seller, product=product, title='Oferta', percentage=Decimal('10'),
+                    start_date=now - timedelta(days=1), end_date=now + timedelta(days=1),
+                )
+            self.products.append(product)
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+
+    # Funcion que crea una factura con una linea por producto y retorna (respuesta, numero de consultas)
+    def create_invoice(self, products):
+        items = [{'product_id': product.id, 'quantity': 2} for product in products]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/invoices/create/', {'method': 'efectivo', 'items': items}, format='json')
+        return response, len(queries)
+
+    # El numero de consultas de la compra y de la respuesta no depende del numero de lineas ni de vendedores
+    def test_create_query_count_is_constant(self):
+        response, single = self.create_invoice(self.products[:1])
+        self.assertEqual(response.status_code, 201)
+        response, many = self.create_invoice(self.products)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['details']), 6)
+        self.assertEqual(many, single)
+
+    # Cada vendedor recibe una sola notificacion con todas sus lineas
+    def test_one_notification_per_seller(self):
+        self.create_invoice(self.products)
+
+        sales = Notification.objects.filter(title='¡Nueva venta!').order_by('id')
+        self.assertEqual(sales.count(), 3)
+        self.assertEqual(
+            sales[0].data['products'], [{'product': 'Producto 0', 'quantity': 2}, {'product': 'Producto 1', 'quantity': 2}]
+        )
+        self.assertEqual(Notification.objects.filter(user=self.buyer).count(), 1)
+
+
+# Pruebas del descuento de stock de la compra
+class DecrementStockTests(TestCase):
+    def setUp(self):
+        seller = CustomUser.objects.create_user(username='vendedor', email='vendedor@test.com', password='x')
+        self.first = Products.objects.create(name='A', description='d', price=Decimal('10.00'), stock=3, producer=seller)
+        self.second = Products.objects.create(name='B', description='d', price=Decimal('10.00'), stock=5, producer=seller)
+
+    # Si un producto no tiene stock suficiente no se descuenta ninguno
+    def test_decrement_requires_stock(self):
+        self.assertFalse(decrement_stock({self.first.id: 4, self.second.id: 1}))
+
+        self.first.refresh_from_db()
+        self.second.refresh_from_db()
+        self.assertEqual(self.first.stock, 3)
+        self.assertEqual(self.second.stock, 5)
+
+    # El producto que llega a cero queda agotado y vuelve a estar disponible al reponer el stock
+    def test_decrement_marks_sold_out(self):
+        self.assertTrue(decrement_stock({self.first.id: 3, self.second.id: 2}))
+
+        self.first.refresh_from_db()
+        self.second.refresh_from_db()
+        self.assertEqual((self.first.stock, self.first.state), (0, 'agotado'))
+        self.assertEqual((self.second.stock, self.second.state), (3, 'disponible'))
+
+        self.first.stock = 2
+        self.first.save(update_fields=['stock'])
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.state, 'disponible')
+
+    # Un producto que el productor marco como agotado no vuelve a estar disponible al cambiar el stock
+    def test_manual_sold_out_is_kept(self):
+        self.second.state = 'agotado'
+        self.second.save()
+        self.second.stock = 8
+        self.second.save(update_fields=['stock'])
+
+        self.second.refresh_from_db()
+        self.assertEqual((self.second.state, self.second.auto_sold_out), ('agotado', False))
+
+
+
+# Pruebas de compras al mismo tiempo sobre los mismos productos (la misma verificacion que stress_checkout)
+# Cada hilo usa su propia conexion, se necesita una base con bloqueo de filas (MySQL), SQLite bloquea el archivo completo
+@skipUnlessDBFeature('has_select_for_update')
+class CheckoutConcurrencyTests(TransactionTestCase):
+    def setUp(self):
+        seller = CustomUser.objects.create_user(username='vendedor', email='vendedor@test.com', password='x')
+        self.buyers = [
+            CustomUser.objects.create_user(username=f'comprador{number}', email=f'comprador{number}@test.com', password='x')
+            for number in range(8)
+        ]
+        self.products = [
+            Products.objects.create(name=name, description='d', price=Decimal('10.00'), stock=10, producer=seller)
+            for name in ('A', 'B')
+        ]
+
+    # Nunca se vende mas del stock: unidades vendidas + stock final = stock inicial y sin stock queda agotado
+    def test_parallel_checkouts_never_oversell(self):
+        results = {'invoices': 0, 'rejected': 0}
+        lock = threading.Lock()
+        barrier = threading.Barrier(len(self.buyers))
+
+        def buy(number, buyer):
+            # La mitad de los compradores pide los productos en orden inverso
+            products = self.products if number % 2 else self.products[::-1]
+            items = [{'product_id': product.id, 'quantity': 2} for product in products]
+            barrier.wait()
+            try:
+                for _ in range(3):
+                    try:
+                        create_invoice(buyer, 'efectivo', items)
+                        outcome = 'invoices'
+                    except ValidationError:
+                        outcome = 'rejected'
+                    with lock:
+                        results[outcome] += 1
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=buy, args=(number, buyer)) for number, buyer in enumerate(self.buyers)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        # 10 unidades de cada producto alcanzan para 5 compras de 2 unidades
+        self.assertEqual((results['invoices'], results['rejected']), (5, 19))
+        sold = dict(
+            DetailInvoice.objects.values('product_id').annotate(total=Sum('quantity')).values_list('product_id', 'total')
+        )
+        for product in Products.objects.filter(id__in=[product.id for product in self.products]):
+            self.assertEqual((sold[product.id], product.stock, product.state), (10, 0, 'agotado'))
+
+
+# Pruebas del recalculo del ranking de mas vendidos
+class RefreshWindowTests(TestCase):
+    def setUp(self):
+        self.seller = CustomUser.objects.create_user(username='vendedor', email='vendedor@test.com', password='x')
+        self.products = [
+            Products.objects.create(
+                name=f'Producto {number}', description='d', price=Decimal('10.00'), stock=10, producer=self.seller
+            )
+            for number in range(3)
+        ]
+
+    # Funcion que guarda las unidades vendidas de un producto hace days dias
+    def add_sales(self, product, days, quantity):
+        SellerDailySales.objects.create(
+            seller=self.seller, product=product, day=timezone.localdate() - timedelta(days=days), quantity=quantity
+        )
+
+    # La ventana se actualiza sin borrarla: las filas existentes se conservan, se crean las que faltan
+    # y salen los productos sin ventas en la ventana
+    def test_refresh_updates_rows_in_place(self):
+        first, second, third = self.products
+        self.add_sales(first, 1, 4)
+        self.add_sales(first, 10, 6)
+        self.add_sales(second, 2, 3)
+        self.add_sales(third, 20, 5)
+        kept = BestSeller.objects.create(window='7d', product=first, quantity=1)
+        BestSeller.objects.create(window='7d', product=third, quantity=5)
+
+        self.assertEqual(refresh_window('7d'), 2)
+
+        self.assertEqual(
+            list(BestSeller.objects.filter(window='7d').order_by('product_id').values_list('product_id', 'quantity')),
+            [(first.id, 4), (second.id, 3)],
+        )
+        self.assertEqual(BestSeller.objects.get(window='7d', product=first).id, kept.id)
+
+        refresh_window('all')
+        self.assertEqual(
+            dict(BestSeller.objects.filter(window='all').values_list('product_id', 'quantity')),
+            {first.id: 10, second.id: 3, third.id: 5},
+        )
+
+
+# Pruebas de las estadisticas de ventas del vendedor
+class SalesAnalyticsViewTests(TestCase):
+    def setUp(self):
+        self.seller = CustomUser.objects.create_user(username='vendedor', email='vendedor@test.com', password='x')
+        buyer = CustomUser.objects.create_user(username='comprador', email='comprador@test.com', password='x')
+        fruits = Category.objects.create(name='Frutas', description='d')
+        self.organic = Category.objects.create(name='Organicos', description='d')
+        products = []
+        for number in range(3):
+            product = Products.objects.create(
+                name=f'Producto {number}', description='d', price=Decimal('10.00'), stock=10, producer=self.seller
+            )
+            product.category.add(fruits)
+            products.append(product)
+        products[0].category.add(self.organic)
+        # Dos facturas: la primera con los tres productos y la segunda con uno
+        create_invoice(buyer, 'efectivo', [{'product_id': product.id, 'quantity': 1} for product in products])
+        create_invoice(buyer, 'efectivo', [{'product_id': products[1].id, 'quantity': 2}])
+        self.client = APIClient()
+        self.client.force_authenticate(self.seller)
+
+    # Funcion que retorna las columnas de la respuesta
+    def get_columns(self, **params):
+        response = self.client.get('/api/invoices/sales/analytics/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.data['columns']
+
+    # Una factura con varios productos cuenta una sola vez en los totales y en cada categoria
+    def test_orders_count_distinct_invoices(self):
+        columns = self.get_columns(group_by='none', period='month')
+        self.assertEqual((columns['quantity'], columns['orders']), ([5], [2]))
+
+        columns = self.get_columns(group_by='category')
+        self.assertEqual(dict(zip(columns['name'], columns['orders'])), {'Frutas': 2, 'Organicos': 1})
+
+        columns = self.get_columns(group_by='product', period='week')
+        self.assertEqual(columns['orders'], [1, 2, 1])
 
-# Create your tests here.
@@ -1,5 +1,8 @@
 from django.urls import path
-from .views import InvoicesView, InvoiceListView, InvoiceDetailView, InvoiceFromCartView, UserStatsView, BestSellingProducts
+from .views import (
+    InvoicesView, InvoiceListView, InvoiceDetailView, InvoiceFromCartView, UserStatsView, BestSellingProducts,
+    InvoiceExportView, SalesExportView, SalesAnalyticsView,
+)
 
 urlpatterns = [
     path('create/', InvoicesView.as_view(), name='create-invoice'),
@@ -8,4 +11,7 @@ urlpatterns = [
     path('from-cart/', InvoiceFromCartView.as_view(), name='invoice-from-cart'),
     path('stats/', UserStatsView.as_view(), name='invoice-stats'),
     path('top-selling/', BestSellingProducts.as_view(), name='top_vendidos'),
+    path('export/', InvoiceExportView.as_view(), name='invoice-export'),
+    path('sales/export/', SalesExportView.as_view(), name='sales-export'),
+    path('sales/analytics/', SalesAnalyticsView.as_view(), name='sales-analytics'),
 ]
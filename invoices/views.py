@@ -5,16 +5,40 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from .serializer import InvoiceCreateSerializer, InvoiceSerializer, DetailInvoice
 from django.db import transaction
-from django.db.models import Sum
+from django.utils import timezone
+from django.db.models import Prefetch, Sum
 
 from cart.models import ShoppingCart
+from cart.reservations import release as release_reservations
 from products.models import Products, ProductImage
-from products.serializer import SerializerProducts
+from products.serializer import SerializerProducts, prefetch_products
+from products.cache import cache_response
 
-from .models import Invoice
+from .models import Invoice, SellerDailySales, BuyerDailySpend
+from .idempotency import idempotent
+from .pagination import InvoiceCursorPagination
+from .leaderboard import get_top_product_ids, WINDOWS, DEFAULT_WINDOW
+from . import exports
+from . import analytics
 # Create your views here.
 
 
+# Funcion que retorna las facturas de un usuario con todo lo que muestra InvoiceSerializer precargado:
+# el usuario y los detalles con su producto, vendedor, oferta y cupon (el numero de consultas no depende de las facturas)
+def get_invoices_queryset(user):
+    return (
+        Invoice.objects
+        .filter(user=user)
+        .select_related('user')
+        .prefetch_related(
+            Prefetch(
+                'details',
+                queryset=DetailInvoice.objects.select_related('product', 'seller', 'offer', 'coupon').order_by('id'),
+            )
+        )
+    )
+
+
 # Creamos la vista para crear una nueva factura desde el carrito del usuario
 class InvoiceFromCartView(APIView):
     # Indicamos la clase de untentificacion necesaria
@@ -22,7 +46,8 @@ class InvoiceFromCartView(APIView):
     # indicamos que la vista solo se puede acceder si esta autenticado
     permission_classes = [IsAuthenticated]
 
-    # Metodo post
+    # Metodo post (acepta el encabezado Idempotency-Key para que los reintentos no dupliquen la factura)
+    @idempotent
     def post(self, request):
         try:
             # Obtenemos el carrito del usuario con el usuario autenticado
@@ -68,9 +93,12 @@ class InvoiceFromCartView(APIView):
             with transaction.atomic():
                 # Creamos una factura con los datos
                 invoice = serializer.save()
-                # Limpiar el carrito después de generar la factura
+                # Limpiar el carrito (y sus reservas de stock) después de generar la factura
                 cart.products.all().delete()
+                release_reservations(cart)
                 # Convierte la factura en un serialzador para enviarlo al cliente
+                # (se vuelve a leer con sus detalles precargados para no consultar cada linea)
+                invoice = get_invoices_queryset(request.user).get(pk=invoice.pk)
                 output_serializer = InvoiceSerializer(invoice, context={'request': request})
                 # Enviamo la inforamcion al cliente
                 return Response(output_serializer.data, status=201)
@@ -85,7 +113,8 @@ class InvoicesView(APIView):
     # Solo los usuarios autenticados pueden acceder a esta vista
     permission_classes = [IsAuthenticated]
     
-    # Metodo post
+    # Metodo post (acepta el encabezado Idempotency-Key para que los reintentos no dupliquen la factura)
+    @idempotent
     def post(self, request):
         # Verificamos que el metodo de pago sea enviado
         if 'method' not in request.data:
@@ -107,6 +136,8 @@ class InvoicesView(APIView):
                 # Creamos una factura con los datos
                 invoice = serializer.save()
                 # Convierte la factura en un serialzador para enviarlo al cliente
+                # (se vuelve a leer con sus detalles precargados para no consultar cada linea)
+                invoice = get_invoices_queryset(request.user).get(pk=invoice.pk)
                 output_serializer = InvoiceSerializer(invoice, context={'request': request})
                 # Enviamo la inforamcion al cliente
                 return Response(output_serializer.data, status=201)
@@ -115,6 +146,7 @@ class InvoicesView(APIView):
 
 
 # Serializador que nos permite obtener la facturas de un usuario
+# Paginado por cursor (?cursor=, ?page_size=), de la factura mas reciente a la mas antigua
 class InvoiceListView(ListAPIView):
     # Metodo de autenticacion
     authentication_classes = [JWTAuthentication]
@@ -122,10 +154,12 @@ class InvoiceListView(ListAPIView):
     permission_classes = [IsAuthenticated]
     # Obtenemos el serializador
     serializer_class = InvoiceSerializer
+    # Paginacion por (date_created, id)
+    pagination_class = InvoiceCursorPagination
 
-    # Obtenemos la factura por el id del usuario autenticado
+    # Obtenemos la factura por el id del usuario autenticado con sus detalles precargados
     def get_queryset(self):
-        return Invoice.objects.filter(user=self.request.user)
+        return get_invoices_queryset(self.request.user)
 
     # Obtenemos el contexto del usuario
     def get_serializer_context(self):
@@ -140,7 +174,7 @@ class InvoiceDetailView(RetrieveAPIView):
     permission_classes = [IsAuthenticated]
     # Inidcamos el modelo de busqueda
     def get_queryset(self):
-        return Invoice.objects.filter(user=self.request.user)
+        return get_invoices_queryset(self.request.user)
     
     # Indicamos el serializador
     serializer_class = InvoiceSerializer
@@ -163,29 +197,26 @@ class UserStatsView(APIView):
         # Obtenemos el usuario logeado
         user = request.user
 
+        # Los totales se leen de los resumenes diarios (una fila por dia, o por producto y dia)
         # Total gastado por el usuario como comprador
-        total_spent = Invoice.objects.filter(user=user).aggregate(total=Sum('total'))['total'] or 0
+        total_spent = BuyerDailySpend.objects.filter(user=user).aggregate(total=Sum('total'))['total'] or 0
 
         # Total ganado por el usuario como vendedor
-        total_earned = DetailInvoice.objects.filter(seller=user).aggregate(total=Sum('subtotal'))['total'] or 0
+        sales = SellerDailySales.objects.filter(seller=user)
+        total_earned = sales.aggregate(total=Sum('revenue'))['total'] or 0
 
-        # Producto más vendido (por cantidad total en todas las facturas)
-        most_sold = (
-            DetailInvoice.objects
-            .values('product__name')
+        # Ventas de cada producto del vendedor
+        products_sold = (
+            sales
+            .values('product_id', 'product__name')
             .annotate(total_quantity=Sum('quantity'))
-            .order_by('-total_quantity')
-            .first()
         )
 
-        # Producto menos vendido (por cantidad total en todas las facturas)
-        least_sold = (
-            DetailInvoice.objects
-            .values('product__name')
-            .annotate(total_quantity=Sum('quantity'))
-            .order_by('total_quantity')
-            .first()
-        )
+        # Producto más vendido del vendedor (por cantidad total en todas las facturas)
+        most_sold = products_sold.order_by('-total_quantity', 'product_id').first()
+
+        # Producto menos vendido del vendedor (por cantidad total en todas las facturas)
+        least_sold = products_sold.order_by('total_quantity', 'product_id').first()
 
         return Response({
             'total_spent': total_spent,
@@ -201,35 +232,93 @@ class UserStatsView(APIView):
         })
         
    
-# Vista que nos permite saber los 5 productos mas vendidos     
+# Vista que nos permite saber los productos mas vendidos
+# Parametros opcionales: window (all, 30d, 7d), category (id) y limit (por defecto 5, maximo 50)
 class BestSellingProducts(APIView):
     # Indicamos que cualquier persona puede acceder a la api
     permission_classes = [AllowAny]
-    
-    # Metodo GET
+
+    # Metodo GET (la respuesta se guarda en cache hasta que cambien los productos o se cree una factura)
+    @cache_response('products')
     def get(self, request, *args, **kwargs):
-        top_products = (
-            # Indicamos el modelo a autilizar
-            DetailInvoice.objects
-            # Obtenemos el id del producto
-            .values('product')
-            # Sumas las catidad de veces que fue vendido el producto
-            .annotate(total_quantity=Sum('quantity'))
-            # Ordenamos de los mas vendidos a los menos vendidos y delimitamos la respuesta a 5 resultados
-            .order_by('-total_quantity')[:5]
-        )
-        
-        # Lista de los ids de los productos mas vendidos
-        product_ids = [product['product'] for product in top_products]
-        
-        # Obtenemos el producto filktrado por el id
-        products = Products.objects.filter(id__in = product_ids)
-        # Organizamos la lista de los productos por su index en la lista de ids de los productos
-        products = sorted(products, key=lambda p: product_ids.index(p.id))
-        
+        # Validamos los parametros
+        window = request.query_params.get('window', DEFAULT_WINDOW)
+        if window not in WINDOWS:
+            return Response({'detail': f'Ventana inválida. Opciones válidas: {list(WINDOWS)}'}, status=400)
+        try:
+            category_id = request.query_params.get('category')
+            category_id = int(category_id) if category_id else None
+            limit = min(max(int(request.query_params.get('limit', 5)), 1), 50)
+        except ValueError:
+            return Response({'detail': 'Los parámetros category y limit deben ser números.'}, status=400)
+
+        # Lista de los ids de los productos mas vendidos (una consulta al ranking)
+        product_ids = get_top_product_ids(window, category_id, limit)
+
+        # Obtenemos los productos con sus imagenes, ofertas y cupones precargados
+        products = prefetch_products(Products.objects.filter(id__in=product_ids))
+        # Organizamos los productos en el orden del ranking
+        position = {product_id: index for index, product_id in enumerate(product_ids)}
+        products = sorted(products, key=lambda p: position[p.id])
+
         # Serializamos la informacion de los productos
         serializer = SerializerProducts(products, many=True)
-        
+
         # Retornamos la informacion
         return Response(serializer.data)
-        
\ No newline at end of file
+
+
+# Funcion que valida el formato (?output=csv|ndjson) y el rango de fechas (?from=, ?to=) de una exportacion
+# y envia los detalles por bloques sin cargar todas las filas en memoria
+def export_details(request, details, columns, filename):
+    output = request.query_params.get('output', 'csv')
+    if output not in exports.OUTPUTS:
+        return Response({'detail': f'Formato inválido. Opciones válidas: {list(exports.OUTPUTS)}'}, status=400)
+    try:
+        filters = exports.get_date_filters(request.query_params)
+    except ValueError as error:
+        return Response({'detail': str(error)}, status=400)
+
+    filename = f'{filename}_{timezone.localdate().isoformat()}'
+    return exports.export_response(request, details.filter(**filters), columns, output, filename)
+
+
+# Vista que exporta las compras del usuario (una fila por producto comprado)
+class InvoiceExportView(APIView):
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return export_details(request, exports.get_purchases(request.user), exports.PURCHASE_COLUMNS, 'compras')
+
+
+# Vista que exporta las ventas del usuario como vendedor (una fila por producto vendido)
+class SalesExportView(APIView):
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return export_details(request, exports.get_sales(request.user), exports.SALES_COLUMNS, 'ventas')
+
+
+# Vista con las ventas del usuario como vendedor por dia, semana o mes
+# Parametros opcionales: period (day, week, month), group_by (product, category, none), from y to (AAAA-MM-DD)
+# La respuesta es orientada a columnas: cada campo es una lista y la posicion i de todas forma una fila
+class SalesAnalyticsView(APIView):
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            period, group_by, start, end = analytics.parse_params(request.query_params)
+        except ValueError as error:
+            return Response({'detail': str(error)}, status=400)
+
+        return Response({
+            'period': period,
+            'group_by': group_by,
+            'from': start,
+            'to': end,
+            'columns': analytics.get_sales_analytics(request.user, period, group_by, start, end),
+        })
+
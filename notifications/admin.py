@@ -1,4 +1,11 @@
 from django.contrib import admin
-from .models import Notification
+from .models import Notification, OutboxMessage
 # Register your models here.
-admin.site.register(Notification)
\ No newline at end of file
+admin.site.register(Notification)
+
+
+# Bandeja de salida: permite revisar los mensajes fallidos y sus errores
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'status', 'attempts', 'available_at', 'sent_at')
+    list_filter = ('kind', 'status')
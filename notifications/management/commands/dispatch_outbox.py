@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from notifications.outbox import dispatch_pending, purge_sent, BATCH_SIZE
+
+
+# Comando que envia los mensajes pendientes de la bandeja de salida (notificaciones y correos)
+# Se puede programar con cron o ejecutar como proceso con --interval, varios procesos pueden trabajar a la vez
+class Command(BaseCommand):
+    help = 'Envia los mensajes pendientes de la bandeja de salida de notificaciones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--interval', type=float, default=0, help='Segundos entre ejecuciones (0 = una sola vez)')
+        parser.add_argument('--purge-days', type=int, default=0, help='Elimina los mensajes enviados hace mas de N dias')
+
+    def handle(self, *args, **options):
+        while True:
+            report = dispatch_pending(options['batch_size'])
+            if any(report.values()):
+                self.stdout.write(self.style.SUCCESS(
+                    f"Enviados {report['sent']}, reintentos {report['retried']}, fallidos {report['failed']}."
+                ))
+            if options['purge_days']:
+                purged = purge_sent(options['purge_days'])
+                if purged:
+                    self.stdout.write(f'Se eliminaron {purged} mensajes enviados.')
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
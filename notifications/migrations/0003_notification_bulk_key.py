@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-18 11:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0002_outbox_message'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='bulk_key',
+            field=models.UUIDField(blank=True, editable=False, null=True, unique=True),
+        ),
+    ]
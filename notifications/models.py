@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from users.models import CustomUser
 # Create your models here.
 
@@ -21,6 +22,45 @@ class Notification(models.Model):
     data = models.JSONField(default=dict)
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Llave unica de las notificaciones creadas en bloque (para recuperar sus ids en MySQL)
+    bulk_key = models.UUIDField(null=True, blank=True, unique=True, editable=False)
     # Mensaje que vemos en el admin
     def __str__(self):
-        return f'Notificacion para el {self.user.username}'
\ No newline at end of file
+        return f'Notificacion para el {self.user.username}'
+
+# Modelo de la bandeja de salida: los mensajes (WebSocket y correos) se guardan en la misma transaccion
+# que los genera y se envian despues de confirmarla (notifications/outbox.py)
+class OutboxMessage(models.Model):
+    # Tipos de mensaje
+    KIND_CHOICES = [
+        ('websocket', 'WebSocket'),
+        ('email', 'Correo'),
+    ]
+    # Estados de entrega
+    STATUS_CHOICES = [
+        ('pending', 'Pendiente'),
+        ('sent', 'Enviado'),
+        ('failed', 'Fallido'),
+    ]
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    # Contenido del mensaje: {'group', 'event'} para WebSocket, {'subject', 'message', 'recipients'} para correo
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    # Numero de intentos de envio y error del ultimo intento
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+    # Fecha a partir de la cual se puede (re)intentar el envio
+    available_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Indice para que el despachador lea los mensajes pendientes en orden
+            models.Index(fields=['status', 'available_at', 'id'], name='outbox_pending_idx'),
+            # Indice para eliminar los mensajes enviados antiguos
+            models.Index(fields=['status', 'sent_at'], name='outbox_sent_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} #{self.id} ({self.status})'
@@ -0,0 +1,189 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+# Numero de mensajes que se envian juntos
+BATCH_SIZE = getattr(settings, 'NOTIFICATIONS_OUTBOX_BATCH_SIZE', 100)
+# Intentos antes de marcar un mensaje como fallido
+MAX_ATTEMPTS = getattr(settings, 'NOTIFICATIONS_OUTBOX_MAX_ATTEMPTS', 5)
+# Espera (segundos) antes del primer reintento, se duplica en cada intento
+RETRY_DELAY = getattr(settings, 'NOTIFICATIONS_OUTBOX_RETRY_DELAY', 5)
+MAX_RETRY_DELAY = 60 * 60
+# Si es verdadero la bandeja se vacia en un hilo al confirmar cada transaccion,
+# si es falso solo la vacia el comando dispatch_outbox
+AUTO_DISPATCH = getattr(settings, 'NOTIFICATIONS_OUTBOX_AUTO_DISPATCH', True)
+# Si es verdadero la bandeja se vacia en el mismo hilo al confirmar la transaccion (pruebas y desarrollo)
+EAGER = getattr(settings, 'NOTIFICATIONS_OUTBOX_EAGER', False)
+
+
+# Funcion que guarda un mensaje en la bandeja de salida dentro de la transaccion actual
+# Si la transaccion se deshace el mensaje no se envia
+def enqueue(kind, payload):
+    message = OutboxMessage.objects.create(kind=kind, payload=payload)
+    if AUTO_DISPATCH:
+        transaction.on_commit(request_dispatch)
+    return message
+
+
+# Funcion que guarda varios mensajes del mismo tipo en un solo INSERT dentro de la transaccion actual
+def enqueue_many(kind, payloads):
+    messages = OutboxMessage.objects.bulk_create([OutboxMessage(kind=kind, payload=payload) for payload in payloads])
+    if messages and AUTO_DISPATCH:
+        transaction.on_commit(request_dispatch)
+    return messages
+
+
+# Funcion que guarda un evento de WebSocket para el grupo de un usuario
+def enqueue_websocket(user_id, event):
+    return enqueue('websocket', {'group': f'user_{user_id}', 'event': event})
+
+
+# Funcion que guarda los eventos de WebSocket de varios usuarios en un solo INSERT
+# events es una lista de (id del usuario, evento)
+def enqueue_websockets(events):
+    return enqueue_many('websocket', [{'group': f'user_{user_id}', 'event': event} for user_id, event in events])
+
+
+# Funcion que guarda un correo para enviarlo despues de confirmar la transaccion
+def enqueue_email(subject, message, recipients):
+    return enqueue('email', {'subject': subject, 'message': message, 'recipients': list(recipients)})
+
+
+# Hilo que vacia la bandeja, solo se programa un vaciado a la vez aunque se confirmen muchas transacciones
+_executor = None
+_pending = False
+_lock = threading.Lock()
+
+
+# Funcion que se ejecuta al confirmar la transaccion y programa el vaciado de la bandeja
+def request_dispatch():
+    global _executor, _pending
+    if EAGER:
+        dispatch_pending()
+        return
+    with _lock:
+        if _pending:
+            return
+        _pending = True
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='notifications-outbox')
+    _executor.submit(run_dispatch)
+
+
+# Funcion que vacia la bandeja en el hilo de fondo y registra los errores
+def run_dispatch():
+    global _pending
+    # Los mensajes guardados mientras se vacia la bandeja los toma este mismo vaciado o el siguiente
+    with _lock:
+        _pending = False
+    try:
+        dispatch_pending()
+    except Exception:
+        logger.exception('No se pudo vaciar la bandeja de notificaciones')
+    finally:
+        close_old_connections()
+
+
+# Funcion que retorna la espera antes del siguiente intento
+def get_retry_delay(attempts):
+    return timedelta(seconds=min(RETRY_DELAY * 2 ** (attempts - 1), MAX_RETRY_DELAY))
+
+
+# Funcion que envia un lote de eventos de WebSocket, retorna el error de cada uno (None si se envio)
+async def send_websocket_batch(messages):
+    channel_layer = get_channel_layer()
+    results = await asyncio.gather(
+        *[channel_layer.group_send(message.payload['group'], message.payload['event']) for message in messages],
+        return_exceptions=True,
+    )
+    return [result if isinstance(result, Exception) else None for result in results]
+
+
+# Funcion que envia un correo, retorna el error (None si se envio)
+def send_email(message):
+    try:
+        send_mail(
+            message.payload['subject'],
+            message.payload['message'],
+            settings.DEFAULT_FROM_EMAIL,
+            message.payload['recipients'],
+            fail_silently=False,
+        )
+    except Exception as error:
+        return error
+    return None
+
+
+# Funcion que envia un lote de mensajes y actualiza sus intentos y su estado
+def deliver(messages):
+    now = timezone.now()
+    websocket = [message for message in messages if message.kind == 'websocket']
+    errors = {}
+    if websocket:
+        errors.update(zip([message.id for message in websocket], async_to_sync(send_websocket_batch)(websocket)))
+    for message in messages:
+        if message.kind == 'email':
+            errors[message.id] = send_email(message)
+
+    for message in messages:
+        message.attempts += 1
+        error = errors.get(message.id)
+        if error is None:
+            message.status = 'sent'
+            message.sent_at = now
+            message.last_error = ''
+        else:
+            message.last_error = f'{type(error).__name__}: {error}'
+            if message.attempts >= MAX_ATTEMPTS:
+                message.status = 'failed'
+            else:
+                message.available_at = now + get_retry_delay(message.attempts)
+    OutboxMessage.objects.bulk_update(messages, ['status', 'attempts', 'last_error', 'available_at', 'sent_at'])
+    return sum(message.status == 'sent' for message in messages)
+
+
+# Funcion que envia los mensajes pendientes por lotes, retorna {'sent', 'retried', 'failed'}
+# Cada lote se bloquea con skip_locked, varios despachadores pueden trabajar al mismo tiempo sin repetir mensajes
+def dispatch_pending(batch_size=BATCH_SIZE):
+    report = {'sent': 0, 'retried': 0, 'failed': 0}
+    while True:
+        with transaction.atomic():
+            messages = list(
+                OutboxMessage.objects
+                .select_for_update(skip_locked=True)
+                .filter(status='pending', available_at__lte=timezone.now())
+                .order_by('id')[:batch_size]
+            )
+            if not messages:
+                return report
+            sent = deliver(messages)
+        failed = sum(message.status == 'failed' for message in messages)
+        report['sent'] += sent
+        report['failed'] += failed
+        report['retried'] += len(messages) - sent - failed
+
+
+# Funcion que elimina por bloques los mensajes enviados hace mas de days dias, retorna el numero eliminado
+def purge_sent(days, batch_size=1000):
+    limit = timezone.now() - timedelta(days=days)
+    total = 0
+    while True:
+        ids = list(
+            OutboxMessage.objects.filter(status='sent', sent_at__lt=limit).values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return total
+        total += OutboxMessage.objects.filter(id__in=ids).delete()[0]
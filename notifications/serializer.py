@@ -5,4 +5,4 @@ from rest_framework import serializers
 class NotificationsSerializer(serializers.ModelSerializer):
     class Meta:
         model = Notification
-        fields = '__all__'
\ No newline at end of file
+        exclude = ('bulk_key',)
\ No newline at end of file
@@ -1,3 +1,74 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core import mail
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from users.models import CustomUser
+from users.utils.email_service import EmailService
+from . import outbox
+from .models import OutboxMessage
+from .utils import send_notification
+
+
+# Pruebas de la bandeja de salida de notificaciones
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='comprador', email='comprador@test.com', password='x')
+        # Canal que representa la conexion WebSocket del usuario
+        self.layer = get_channel_layer()
+        self.channel = async_to_sync(self.layer.new_channel)()
+        async_to_sync(self.layer.group_add)(f'user_{self.user.id}', self.channel)
+
+    # La notificacion se guarda en la bandeja y llega al grupo del usuario al vaciarla
+    def test_dispatch_delivers_to_channel_layer(self):
+        send_notification(self.user, 'custom', 'Hola', 'Mensaje')
+
+        report = outbox.dispatch_pending()
+
+        self.assertEqual(report, {'sent': 1, 'retried': 0, 'failed': 0})
+        event = async_to_sync(self.layer.receive)(self.channel)
+        self.assertEqual((event['type'], event['content']['title']), ('send_notification', 'Hola'))
+        self.assertEqual(OutboxMessage.objects.get().status, 'sent')
+
+    # Si el envio falla el mensaje queda pendiente con espera y se envia en el siguiente intento
+    def test_failed_delivery_is_retried(self):
+        send_notification(self.user, 'custom', 'Hola', 'Mensaje')
+
+        async def fail(*args, **kwargs):
+            raise ConnectionError('redis no disponible')
+
+        with mock.patch.object(type(self.layer), 'group_send', fail):
+            report = outbox.dispatch_pending()
+        self.assertEqual(report, {'sent': 0, 'retried': 1, 'failed': 0})
+        message = OutboxMessage.objects.get()
+        self.assertEqual((message.status, message.attempts), ('pending', 1))
+        self.assertIn('redis no disponible', message.last_error)
+        self.assertGreater(message.available_at, timezone.now())
+
+        # Antes de la espera no se reintenta
+        self.assertEqual(outbox.dispatch_pending(), {'sent': 0, 'retried': 0, 'failed': 0})
+
+        OutboxMessage.objects.update(available_at=timezone.now())
+        self.assertEqual(outbox.dispatch_pending()['sent'], 1)
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts, message.last_error), ('sent', 2, ''))
+        self.assertEqual(async_to_sync(self.layer.receive)(self.channel)['content']['title'], 'Hola')
+
+    # Los eventos de varios usuarios se guardan con un solo INSERT
+    def test_enqueue_websockets_single_insert(self):
+        with self.assertNumQueries(1):
+            outbox.enqueue_websockets([(self.user.id, {'type': 'send_notification', 'content': {}})] * 3)
+        self.assertEqual(OutboxMessage.objects.filter(status='pending').count(), 3)
+
+    # Los correos de la aplicacion pasan por la bandeja y se envian al vaciarla
+    def test_email_service_uses_outbox(self):
+        EmailService.send_email('Confirma tu cuenta', 'Tu código es: 123456', [self.user.email])
+        self.assertEqual(len(mail.outbox), 0)
+
+        self.assertEqual(outbox.dispatch_pending()['sent'], 1)
+        self.assertEqual((mail.outbox[0].subject, mail.outbox[0].to), ('Confirma tu cuenta', [self.user.email]))
+        self.assertEqual(OutboxMessage.objects.get().kind, 'email')
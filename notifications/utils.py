@@ -1,7 +1,6 @@
+from campeche_backend.bulk import bulk_create_with_pks
 from .models import Notification
-from channels.layers import get_channel_layer
-# Nos permite utlizar funciona asincronicas
-from asgiref.sync import async_to_sync
+from .outbox import enqueue_websocket, enqueue_websockets
 
 def send_notification(user, type, title, message, image=None, data=None):
     # Guardar en base de datos
@@ -13,9 +12,49 @@ def send_notification(user, type, title, message, image=None, data=None):
         image=image,
         data=data or {}
     )
-    
+
     # Obtenemos la informacion de la notificacion
-    data = {
+    data = get_notification_data(notification)
+
+    # Enviar por WebSocket
+    # El evento se guarda en la bandeja de salida en la misma transaccion y se envia al confirmarla
+    # (una compra que se deshace no envia notificaciones y un Redis lento no detiene la compra)
+    enqueue_websocket(user.id, get_websocket_event(notification, data))
+
+    # Retornamos la informacion para que el front lo consumos
+    return data
+
+
+# Funcion que guarda varias notificaciones y sus eventos de WebSocket con un INSERT cada uno
+# notifications es una lista de diccionarios con user_id, type, title, message, image y data
+# Retorna la informacion de cada notificacion (en el mismo orden)
+def send_notifications(notifications):
+    objects = [
+        Notification(
+            user_id=notification['user_id'],
+            type=notification['type'],
+            title=notification['title'],
+            message=notification['message'],
+            image=notification.get('image'),
+            data=notification.get('data') or {},
+        )
+        for notification in notifications
+    ]
+    if not objects:
+        return []
+    bulk_create_with_pks(Notification, objects, 'bulk_key')
+
+    data = [get_notification_data(notification) for notification in objects]
+    enqueue_websockets([
+        (notification.user_id, get_websocket_event(notification, notification_data))
+        for notification, notification_data in zip(objects, data)
+    ])
+    return data
+
+
+# Funcion que retorna la informacion de la notificacion para el front
+def get_notification_data(notification):
+    return {
         "id": notification.id,
         "type": notification.type,
         "title": notification.title,
@@ -25,27 +64,19 @@ def send_notification(user, type, title, message, image=None, data=None):
         "created_at": notification.created_at.isoformat(),
     }
 
-    # Enviar por WebSocket
-    # Obtenemos la configracion para utilizar la conexion asincronica de redis
-    channel_layer = get_channel_layer()
-    # Llammao a channel_layer
-    async_to_sync(channel_layer.group_send)(
-        f"user_{user.id}",
-        {
-            "type": "send_notification",
-            "content": {
-                "id": notification.id,
-                "title": title,
-                "message": message,
-                "image": image,
-                "type": type,
-                "data": data,
-                "created_at": str(notification.created_at),
-                "read": notification.is_read,
-            }
-        }
-    )
-    
-    # Retornamos la informacion para que el front lo consumos
-    return data
 
+# Funcion que retorna el evento que recibe el consumidor de WebSocket del usuario
+def get_websocket_event(notification, data):
+    return {
+        "type": "send_notification",
+        "content": {
+            "id": notification.id,
+            "title": notification.title,
+            "message": notification.message,
+            "image": notification.image,
+            "type": notification.type,
+            "data": data,
+            "created_at": str(notification.created_at),
+            "read": notification.is_read,
+        }
+    }
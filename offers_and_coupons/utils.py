@@ -0,0 +1,66 @@
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from .models import Offers, Coupon
+
+
+# Funcion que retorna un diccionario {id_producto: objeto} con el primer objeto activo de cada producto
+def get_active_by_product(model, product_ids, now=None):
+    # Si no hay productos no hacemos la consulta
+    if not product_ids:
+        return {}
+    # Obtenemos la hora exacta
+    now = now or timezone.now()
+    # Filtramos en la base de datos los objetos activos dentro de su rango de fechas
+    queryset = (
+        model.objects
+        .filter(
+            product_id__in=product_ids, active=True,
+            start_date__lte=now, end_date__gte=now
+        )
+        .order_by('product_id', 'id')
+    )
+    # Guardamos solo el primero de cada producto (mismo criterio que el serializador)
+    active = {}
+    for obj in queryset:
+        active.setdefault(obj.product_id, obj)
+    return active
+
+
+# Funcion que obtiene las ofertas activas de un conjunto de productos en una sola consulta
+def get_active_offers(product_ids, now=None):
+    return get_active_by_product(Offers, product_ids, now)
+
+
+# Funcion que obtiene los cupones activos de un conjunto de productos en una sola consulta
+def get_active_coupons(product_ids, now=None):
+    return get_active_by_product(Coupon, product_ids, now)
+
+
+# Funcion que construye el contexto que recibe SerializerProducts con las ofertas y cupones ya resueltos
+def get_promotions_context(product_ids, context=None):
+    # Evitamos ids repetidos
+    product_ids = list(set(product_ids))
+    now = timezone.now()
+    context = dict(context or {})
+    context['active_offers'] = get_active_offers(product_ids, now)
+    context['active_coupons'] = get_active_coupons(product_ids, now)
+    return context
+
+
+# Funcion que retorna los Prefetch de las ofertas y cupones activos para un queryset de productos
+# Los objetos quedan en product.active_offer_list y product.active_coupon_list (ordenados por id)
+def get_promotions_prefetch(now=None):
+    now = now or timezone.now()
+    return [
+        Prefetch(
+            'offers',
+            queryset=Offers.objects.filter(active=True, start_date__lte=now, end_date__gte=now).order_by('id'),
+            to_attr='active_offer_list',
+        ),
+        Prefetch(
+            'coupons',
+            queryset=Coupon.objects.filter(active=True, start_date__lte=now, end_date__gte=now).order_by('id'),
+            to_attr='active_coupon_list',
+        ),
+    ]
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Category, Products, ProductImage, Grades
+from .models import Category, Products, ProductImage, Grades, ProductRatingStats
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -21,3 +21,7 @@ class ProductImageAdmin(admin.ModelAdmin):
 @admin.register(Grades)
 class GradesAdmin(admin.ModelAdmin):
     list_display = ("id", "rating")
+
+@admin.register(ProductRatingStats)
+class ProductRatingStatsAdmin(admin.ModelAdmin):
+    list_display = ("product", "count", "average")
@@ -0,0 +1,107 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Min, Q
+from django.utils import timezone
+from rest_framework.response import Response
+
+# Tiempo maximo (segundos) que se guarda una respuesta del catalogo
+CACHE_TIMEOUT = getattr(settings, 'CATALOG_CACHE_TIMEOUT', 300)
+VERSION_KEY = 'catalog:version:{}'
+MODIFIED_KEY = 'catalog:modified:{}'
+RESPONSE_KEY = 'catalog:response:{}'
+
+
+# Valor inicial de una version, se basa en la hora para que una version perdida (por ejemplo
+# si Redis expulsa la llave) nunca vuelva a un numero que ya fue utilizado
+def initial_version():
+    return time.time_ns() // 1000
+
+
+# Funcion que retorna la version actual de cada entidad (por ejemplo 'products' o 'product:5')
+def get_versions(scopes):
+    keys = [VERSION_KEY.format(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    missing = {key: initial_version() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+# Funcion que incrementa la version de las entidades, las respuestas guardadas con la version anterior dejan de usarse
+def bump_versions(*scopes):
+    now = timezone.now()
+    for scope in scopes:
+        key = VERSION_KEY.format(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, initial_version(), timeout=None)
+    # Guardamos la fecha del cambio para el encabezado Last-Modified
+    cache.set_many({MODIFIED_KEY.format(scope): now for scope in scopes}, timeout=None)
+
+
+# Funcion que retorna la fecha del ultimo cambio de las entidades, si no se conoce
+# (por ejemplo si la llave fue expulsada) se toma la fecha actual para no responder 304 por error
+def get_last_modified(scopes):
+    keys = [MODIFIED_KEY.format(scope) for scope in scopes]
+    modified = cache.get_many(keys)
+    missing = {key: timezone.now() for key in keys if key not in modified}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        modified.update(missing)
+    return max(modified.values())
+
+
+# Funcion que calcula cuanto tiempo se puede guardar una respuesta sin que una oferta o cupon
+# empiece o termine mientras esta guardada (asi un precio guardado nunca supera el end_date)
+def get_timeout():
+    from offers_and_coupons.models import Offers, Coupon
+
+    now = timezone.now()
+    timeout = CACHE_TIMEOUT
+    for model in (Offers, Coupon):
+        limits = model.objects.filter(active=True).aggregate(
+            next_start=Min('start_date', filter=Q(start_date__gt=now)),
+            next_end=Min('end_date', filter=Q(end_date__gte=now)),
+        )
+        for limit in limits.values():
+            if limit is not None:
+                timeout = min(timeout, (limit - now).total_seconds())
+    return max(int(timeout), 1)
+
+
+# Funcion que construye la llave de una respuesta a partir de la url y las versiones de sus entidades
+def get_response_key(request, scopes):
+    versions = get_versions(scopes)
+    raw = f"{request.get_full_path()}|{'|'.join(f'{scope}={version}' for scope, version in zip(scopes, versions))}"
+    return RESPONSE_KEY.format(hashlib.md5(raw.encode('utf-8')).hexdigest())
+
+
+# Decorador para el metodo get de una vista: guarda la respuesta de los usuarios anonimos
+# scopes son las entidades de las que depende la respuesta, pueden usar los parametros de la url ('product:{product_id}')
+def cache_response(*scopes):
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            # Los usuarios autenticados siempre obtienen la respuesta sin cache
+            if request.user.is_authenticated:
+                return method(self, request, *args, **kwargs)
+
+            key = get_response_key(request, [scope.format(**kwargs) for scope in scopes])
+            cached = cache.get(key)
+            if cached is not None:
+                status_code, data = cached
+                return Response(data, status=status_code)
+
+            response = method(self, request, *args, **kwargs)
+            # Solo guardamos las respuestas exitosas
+            if response.status_code == 200:
+                cache.set(key, (response.status_code, response.data), get_timeout())
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,107 @@
+import hashlib
+
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from offers_and_coupons.models import Offers, Coupon
+from .models import Products
+from .cache import get_versions, get_last_modified
+
+# Funciones para las peticiones condicionales (ETag / Last-Modified) del catalogo
+# Se usan con el decorador condition de Django, si el cliente ya tiene la version actual
+# se responde 304 sin serializar ni consultar las imagenes, ofertas o cupones del producto
+
+
+# Funcion que convierte una lista de valores en un ETag
+def make_etag(*values):
+    raw = '|'.join(str(value) for value in values)
+    return hashlib.md5(raw.encode('utf-8')).hexdigest()
+
+
+# Funcion que retorna la fecha del ultimo inicio o fin (ya ocurrido) de las ofertas o cupones de un producto
+# Cuando una oferta empieza o termina la respuesta cambia aunque no se haya editado nada
+def promotion_boundary(model, field, now):
+    return Subquery(
+        model.objects
+        .filter(product_id=OuterRef('pk'), active=True, **{f'{field}__lte': now})
+        .order_by(f'-{field}')
+        .values(field)[:1]
+    )
+
+
+# Funcion que obtiene en una sola consulta los datos de los que depende el detalle de un producto
+# El resultado se guarda en la peticion porque el ETag y el Last-Modified se calculan por separado
+def get_product_state(request, product_id):
+    if getattr(request, '_product_state', None) is None:
+        now = timezone.now()
+        state = (
+            Products.objects
+            .filter(id=product_id)
+            .annotate(
+                offer_start=promotion_boundary(Offers, 'start_date', now),
+                offer_end=promotion_boundary(Offers, 'end_date', now),
+                coupon_start=promotion_boundary(Coupon, 'start_date', now),
+                coupon_end=promotion_boundary(Coupon, 'end_date', now),
+            )
+            .values(
+                'date_of_registration', 'rating_stats__count', 'rating_stats__total',
+                'offer_start', 'offer_end', 'coupon_start', 'coupon_end',
+            )
+            .first()
+        )
+        request._product_state = state or {}
+    return request._product_state
+
+
+# ETag del detalle de un producto: fecha de modificacion, version de sus imagenes/ofertas/cupones,
+# ultimo cambio de sus promociones y totales de calificacion
+def product_etag(request, product_id, *args, **kwargs):
+    state = get_product_state(request, product_id)
+    if not state:
+        return None
+    version, = get_versions([f'product:{product_id}'])
+    return make_etag(product_id, version, *state.values())
+
+
+# Last-Modified del detalle de un producto (la fecha mas reciente de todo lo que contiene)
+def product_last_modified(request, product_id, *args, **kwargs):
+    state = get_product_state(request, product_id)
+    if not state:
+        return None
+    dates = [
+        state['date_of_registration'], state['offer_start'], state['offer_end'],
+        state['coupon_start'], state['coupon_end'], get_last_modified([f'product:{product_id}']),
+    ]
+    return max(date for date in dates if date is not None)
+
+
+# ETag del listado de categorias (no consulta la base de datos)
+def categories_etag(request, *args, **kwargs):
+    version, = get_versions(['categories'])
+    return make_etag('categories', version)
+
+
+# Last-Modified del listado de categorias
+def categories_last_modified(request, *args, **kwargs):
+    return get_last_modified(['categories'])
+
+
+# ETag de las estadisticas de calificacion de un producto (una consulta a los totales ya calculados)
+def rating_etag(request, product_id, *args, **kwargs):
+    state = (
+        Products.objects
+        .filter(id=product_id)
+        .values(
+            'rating_stats__count', 'rating_stats__total', 'rating_stats__star_1', 'rating_stats__star_2',
+            'rating_stats__star_3', 'rating_stats__star_4', 'rating_stats__star_5',
+        )
+        .first()
+    )
+    if state is None:
+        return None
+    return make_etag(product_id, *state.values())
+
+
+# Last-Modified de las estadisticas de calificacion de un producto
+def rating_last_modified(request, product_id, *args, **kwargs):
+    return get_last_modified([f'grades:{product_id}'])
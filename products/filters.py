@@ -0,0 +1,143 @@
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db.models import Case, Count, Exists, IntegerField, OuterRef, Value, When
+
+from .models import Products
+
+# Tabla intermedia de la relacion muchos a muchos producto-categoria
+ProductCategory = Products.category.through
+
+# Limites de los rangos de precio para el conteo por precio (0-10000, 10000-25000, ..., 100000+)
+PRICE_BUCKETS = getattr(settings, 'CATALOG_PRICE_BUCKETS', [10000, 25000, 50000, 100000])
+# Estados que el usuario puede filtrar en el catalogo
+PUBLIC_STATES = ('disponible', 'agotado')
+
+
+# Funcion que valida los parametros de la url y retorna (filtros, errores)
+def parse_filters(params):
+    filters = {}
+    errors = {}
+
+    # Categorias separadas por coma (?category=1,2)
+    category = params.get('category')
+    if category:
+        try:
+            filters['category'] = [int(value) for value in category.split(',')]
+        except ValueError:
+            errors['category'] = 'Formato inválido. Se espera una lista de IDs numéricos separados por coma.'
+
+    # Rango de precios
+    for name in ('min_price', 'max_price'):
+        value = params.get(name)
+        if value:
+            try:
+                price = Decimal(value)
+            except InvalidOperation:
+                price = None
+            # NaN e Infinity se leen como Decimal pero no son precios validos
+            if price is None or not price.is_finite():
+                errors[name] = 'El precio debe ser un número.'
+            else:
+                filters[name] = price
+
+    # Unidad de medida
+    unit = params.get('unit_of_measure')
+    if unit:
+        if unit not in dict(Products.UNIT_CHOICES):
+            errors['unit_of_measure'] = f'Unidad inválida. Opciones válidas: {list(dict(Products.UNIT_CHOICES))}'
+        else:
+            filters['unit_of_measure'] = unit
+
+    # Productor
+    producer = params.get('producer')
+    if producer:
+        if not producer.isdigit():
+            errors['producer'] = 'El productor debe ser un id numérico.'
+        else:
+            filters['producer'] = int(producer)
+
+    # Estado (los productos inactivos nunca se muestran)
+    state = params.get('state')
+    if state:
+        if state not in PUBLIC_STATES:
+            errors['state'] = f'Estado inválido. Opciones válidas: {list(PUBLIC_STATES)}'
+        else:
+            filters['state'] = state
+
+    return filters, errors
+
+
+# Funcion que aplica los filtros al queryset, exclude permite omitir un filtro (para los conteos de ese filtro)
+def apply_filters(queryset, filters, exclude=None):
+    if 'category' in filters and exclude != 'category':
+        # Usamos EXISTS sobre la tabla intermedia para no duplicar productos con varias categorias
+        queryset = queryset.filter(Exists(ProductCategory.objects.filter(
+            products_id=OuterRef('pk'), category_id__in=filters['category']
+        )))
+    if 'min_price' in filters and exclude != 'price':
+        queryset = queryset.filter(price__gte=filters['min_price'])
+    if 'max_price' in filters and exclude != 'price':
+        queryset = queryset.filter(price__lte=filters['max_price'])
+    if 'unit_of_measure' in filters and exclude != 'unit_of_measure':
+        queryset = queryset.filter(unit_of_measure=filters['unit_of_measure'])
+    if 'producer' in filters:
+        queryset = queryset.filter(producer_id=filters['producer'])
+    if 'state' in filters:
+        queryset = queryset.filter(state=filters['state'])
+    return queryset
+
+
+# Funcion que retorna los conteos por categoria, unidad de medida y rango de precio
+# Cada conteo es una sola consulta agrupada y no tiene en cuenta su propio filtro,
+# asi el cliente puede ver cuantos productos hay en las otras opciones
+def get_facets(queryset, filters):
+    # Productos por categoria (agrupamos la tabla intermedia)
+    categories = (
+        ProductCategory.objects
+        .filter(products__in=apply_filters(queryset, filters, exclude='category').values('pk'))
+        .values('category_id', 'category__name')
+        .annotate(count=Count('products_id'))
+        .order_by('category__name')
+    )
+
+    # Productos por unidad de medida
+    units = (
+        apply_filters(queryset, filters, exclude='unit_of_measure')
+        .order_by()
+        .values('unit_of_measure')
+        .annotate(count=Count('id'))
+        .order_by('unit_of_measure')
+    )
+    unit_labels = dict(Products.UNIT_CHOICES)
+
+    # Productos por rango de precio, el numero del rango se calcula en la base de datos
+    bucket = Case(
+        *[When(price__lt=limit, then=Value(position)) for position, limit in enumerate(PRICE_BUCKETS)],
+        default=Value(len(PRICE_BUCKETS)),
+        output_field=IntegerField(),
+    )
+    prices = (
+        apply_filters(queryset, filters, exclude='price')
+        .order_by()
+        .annotate(bucket=bucket)
+        .values('bucket')
+        .annotate(count=Count('id'))
+        .order_by('bucket')
+    )
+    limits = [0] + list(PRICE_BUCKETS) + [None]
+
+    return {
+        'category': [
+            {'id': item['category_id'], 'name': item['category__name'], 'count': item['count']}
+            for item in categories
+        ],
+        'unit_of_measure': [
+            {'value': item['unit_of_measure'], 'label': unit_labels.get(item['unit_of_measure']), 'count': item['count']}
+            for item in units
+        ],
+        'price': [
+            {'min': limits[item['bucket']], 'max': limits[item['bucket'] + 1], 'count': item['count']}
+            for item in prices
+        ],
+    }
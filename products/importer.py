@@ -0,0 +1,192 @@
+import csv
+import json
+import re
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework import serializers
+
+from campeche_backend.bulk import bulk_create_with_pks
+from .models import Category, Products
+from .cache import bump_versions
+from . import search
+
+# Tabla intermedia de la relacion muchos a muchos producto-categoria
+ProductCategory = Products.category.through
+
+# Numero de filas que se validan e insertan juntas
+IMPORT_CHUNK_SIZE = getattr(settings, 'PRODUCT_IMPORT_CHUNK_SIZE', 500)
+# Numero maximo de errores que se retornan en el reporte (el total se cuenta siempre)
+IMPORT_MAX_ERRORS = getattr(settings, 'PRODUCT_IMPORT_MAX_ERRORS', 1000)
+# Formatos aceptados
+FORMATS = ('csv', 'ndjson')
+
+
+# Serializador que valida una fila del archivo (las categorias se validan por bloque)
+class ProductImportRowSerializer(serializers.Serializer):
+    name = serializers.CharField(max_length=100)
+    description = serializers.CharField()
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0.01'))
+    stock = serializers.IntegerField(min_value=0)
+    unit_of_measure = serializers.ChoiceField(choices=Products.UNIT_CHOICES, default='unidad')
+    state = serializers.ChoiceField(choices=['disponible', 'agotado'], default='disponible')
+    category = serializers.ListField(child=serializers.IntegerField(), allow_empty=True, default=list)
+
+    # En CSV las categorias llegan como texto ("1|2" o "1,2")
+    def to_internal_value(self, data):
+        category = data.get('category')
+        if isinstance(category, str):
+            data = dict(data)
+            data['category'] = [value for value in re.split(r'[|,;\s]+', category) if value]
+        elif isinstance(category, int):
+            data = dict(data)
+            data['category'] = [category]
+        return super().to_internal_value(data)
+
+
+# Funcion que lee un archivo (o el cuerpo de la peticion) linea por linea sin cargarlo completo en memoria
+def iter_lines(stream):
+    first = True
+    for line in iter(stream.readline, b''):
+        line = line.decode('utf-8')
+        if first:
+            # Quitamos el BOM que agregan algunos editores (Excel)
+            line = line.lstrip('\ufeff')
+            first = False
+        yield line
+
+
+# Funcion que retorna las filas del archivo como (numero de fila, datos, error)
+def iter_rows(stream, file_format):
+    if file_format == 'csv':
+        reader = csv.DictReader(iter_lines(stream))
+        for row in reader:
+            # line_num cuenta el encabezado como fila 1, las columnas vacias se toman como no enviadas (se usa el valor por defecto)
+            yield reader.line_num, {key: value for key, value in row.items() if key and value not in ('', None)}, None
+    else:
+        for number, line in enumerate(iter_lines(stream), start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                yield number, None, {'row': ['JSON inválido.']}
+                continue
+            if not isinstance(row, dict):
+                yield number, None, {'row': ['Cada linea debe ser un objeto JSON.']}
+                continue
+            yield number, row, None
+
+
+# Funcion que detecta el formato a partir del tipo de contenido o del nombre del archivo
+def detect_format(content_type='', filename=''):
+    content_type = (content_type or '').lower()
+    filename = (filename or '').lower()
+    if 'csv' in content_type or filename.endswith('.csv'):
+        return 'csv'
+    if 'ndjson' in content_type or 'jsonl' in content_type or filename.endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    return None
+
+
+# Clase que importa los productos de un productor por bloques: valida las filas, inserta los productos
+# con bulk_create y sus categorias en la tabla intermedia, y construye el reporte de errores por fila
+class ProductImporter:
+    def __init__(self, producer, chunk_size=IMPORT_CHUNK_SIZE, max_errors=IMPORT_MAX_ERRORS):
+        self.producer = producer
+        self.chunk_size = chunk_size
+        self.max_errors = max_errors
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+        # Error de lectura del archivo (codificacion o CSV mal formado), detiene la importacion
+        self.file_error = None
+
+    # Funcion que guarda el error de una fila (solo los primeros max_errors)
+    def add_error(self, row_number, errors):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'row': row_number, 'errors': errors})
+
+    # Funcion que importa todas las filas y retorna el reporte
+    # Si el archivo no se puede leer a mitad de camino los bloques anteriores ya quedaron guardados,
+    # por eso el error va en el reporte junto con lo que si se creo (el cliente no debe reenviar esas filas)
+    def run(self, rows):
+        chunk = []
+        try:
+            for row_number, data, error in rows:
+                if error:
+                    self.add_error(row_number, error)
+                    continue
+                chunk.append((row_number, data))
+                if len(chunk) >= self.chunk_size:
+                    self.import_chunk(chunk)
+                    chunk = []
+        except (UnicodeDecodeError, csv.Error) as error:
+            # Las filas leidas antes del error si se importan
+            self.file_error = f'No se pudo leer el archivo: {error}'
+        if chunk:
+            self.import_chunk(chunk)
+
+        if self.created:
+            # bulk_create no envia post_save: invalidamos el catalogo y el indice de busqueda al confirmar
+            transaction.on_commit(search.reset_index)
+            transaction.on_commit(lambda: bump_versions('products', 'categories'))
+        return self.get_report()
+
+    # Funcion que retorna el reporte de la importacion
+    def get_report(self):
+        return {
+            'created': self.created,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors),
+            'file_error': self.file_error,
+        }
+
+    # Funcion que valida e inserta un bloque de filas
+    def import_chunk(self, chunk):
+        valid = []
+        for row_number, data in chunk:
+            serializer = ProductImportRowSerializer(data=data)
+            if serializer.is_valid():
+                valid.append((row_number, serializer.validated_data))
+            else:
+                self.add_error(row_number, serializer.errors)
+
+        # Validamos las categorias del bloque en una sola consulta
+        category_ids = {category_id for _, row in valid for category_id in row['category']}
+        existing = set(Category.objects.filter(id__in=category_ids).values_list('id', flat=True))
+        rows = []
+        for row_number, row in valid:
+            missing = [category_id for category_id in row['category'] if category_id not in existing]
+            if missing:
+                self.add_error(row_number, {'category': [f'Categorias no encontradas: {missing}']})
+            else:
+                rows.append(row)
+        if not rows:
+            return
+
+        with transaction.atomic():
+            products = []
+            for row in rows:
+                # bulk_create no llama a save, calculamos aqui el estado segun el stock
+                state, auto_sold_out = Products.state_for_stock(row['stock'], row['state'])
+                products.append(Products(
+                    name=row['name'], description=row['description'], price=row['price'], stock=row['stock'],
+                    unit_of_measure=row['unit_of_measure'], producer=self.producer,
+                    state=state, auto_sold_out=auto_sold_out,
+                ))
+            # En MySQL los ids se recuperan por la llave de importacion de cada producto
+            bulk_create_with_pks(Products, products, 'import_key')
+
+            ProductCategory.objects.bulk_create(
+                [
+                    ProductCategory(products_id=product.pk, category_id=category_id)
+                    for product, row in zip(products, rows)
+                    for category_id in dict.fromkeys(row['category'])
+                ],
+                batch_size=self.chunk_size,
+            )
+        self.created += len(products)
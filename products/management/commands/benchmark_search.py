@@ -0,0 +1,130 @@
+import itertools
+import random
+import time
+import uuid
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from products.models import Products
+from products.search import InvertedIndex, tokenize
+from products import search
+from users.models import CustomUser
+
+# Palabras del nombre y de la descripcion de cada producto sintetico
+NAME_WORDS = 3
+DESCRIPTION_WORDS = 15
+
+
+# Comando que mide la busqueda de productos a medida que crece el catalogo
+# El vocabulario es fijo y la frecuencia de las palabras sigue una distribucion de Zipf (como en textos reales),
+# asi las listas de cada palabra crecen con el catalogo y el resultado no depende de como se generan los datos
+# --backend memory: indice invertido en memoria contra un recorrido lineal, sin base de datos
+# --backend database: inserta los productos en la base configurada y mide la busqueda de la vista
+# (FULLTEXT en MySQL, indice en memoria en otras bases) contra un LIKE; al final elimina los datos creados
+class Command(BaseCommand):
+    help = 'Mide el tiempo de busqueda de productos a medida que crece el numero de productos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backend', choices=['memory', 'database', 'all'], default='all')
+        parser.add_argument('--sizes', nargs='+', type=int, default=[1000, 10000, 100000])
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--vocabulary', type=int, default=5000, help='Numero de palabras distintas')
+        parser.add_argument('--zipf', type=float, default=1.0, help='Exponente de la distribucion de Zipf')
+        parser.add_argument('--seed', type=int, default=7)
+        parser.add_argument('--keep', action='store_true', help='No elimina los productos creados en la base')
+
+    def handle(self, *args, **options):
+        # Palabras de ancho fijo para que ninguna sea prefijo de otra (el LIKE no cuenta coincidencias falsas)
+        self.vocabulary = [f'termino{rank:06d}' for rank in range(1, options['vocabulary'] + 1)]
+        self.cum_weights = list(itertools.accumulate(1 / rank ** options['zipf'] for rank in range(1, options['vocabulary'] + 1)))
+        sizes = sorted(options['sizes'])
+
+        if options['backend'] in ('memory', 'all'):
+            self.benchmark_memory(sizes, options)
+        if options['backend'] in ('database', 'all'):
+            self.benchmark_database(sizes, options)
+
+    # Funcion que retorna count palabras elegidas segun la distribucion de Zipf
+    def sample(self, rng, count):
+        return rng.choices(self.vocabulary, cum_weights=self.cum_weights, k=count)
+
+    # Funcion que genera los (nombre, descripcion) de count productos
+    def make_documents(self, rng, count):
+        for _ in range(count):
+            yield ' '.join(self.sample(rng, NAME_WORDS)), ' '.join(self.sample(rng, DESCRIPTION_WORDS))
+
+    # Funcion que mide una funcion de busqueda, retorna (ms por consulta, coincidencias promedio)
+    def measure(self, queries, run):
+        matches = 0
+        start = time.perf_counter()
+        for query in queries:
+            matches += len(run(query))
+        elapsed = (time.perf_counter() - start) * 1000 / len(queries)
+        return elapsed, matches / len(queries)
+
+    # Funcion que escribe el encabezado de una tabla de resultados
+    def write_header(self, title, indexed, linear):
+        self.stdout.write(title)
+        self.stdout.write(f"{'productos':>10} {'coincidencias':>14} {indexed:>14} {linear:>14}")
+
+    # Indice invertido en memoria contra un recorrido lineal de los productos
+    def benchmark_memory(self, sizes, options):
+        rng = random.Random(options['seed'])
+        index = InvertedIndex()
+        documents = []
+        self.write_header('Indice en memoria', 'indice (ms)', 'lineal (ms)')
+        for size in sizes:
+            # El catalogo crece sobre los productos ya agregados
+            for doc_id, (name, description) in enumerate(self.make_documents(rng, size - len(documents)), start=len(documents) + 1):
+                index.add(doc_id, name, description)
+                documents.append((doc_id, set(tokenize(name)) | set(tokenize(description))))
+
+            # Las consultas siguen la misma distribucion que el texto (las palabras comunes se buscan mas)
+            queries = self.sample(rng, options['queries'])
+            indexed, matches = self.measure(queries, index.search)
+            linear, _ = self.measure(queries, lambda query: [doc_id for doc_id, tokens in documents if query in tokens])
+            self.stdout.write(f'{size:>10} {matches:>14.1f} {indexed:>14.3f} {linear:>14.3f}')
+
+    # Busqueda de la vista sobre la base configurada contra un LIKE sobre el nombre y la descripcion
+    def benchmark_database(self, sizes, options):
+        rng = random.Random(options['seed'])
+        suffix = uuid.uuid4().hex[:8]
+        producer = CustomUser.objects.create_user(
+            username=f'search-bench-{suffix}', email=f'search-{suffix}@bench.local', user_type='group'
+        )
+        products = Products.objects.filter(producer=producer)
+        if search.uses_fulltext():
+            title, run = 'Base de datos (FULLTEXT)', lambda query: list(
+                search.search_fulltext(products, query).values_list('id', flat=True)
+            )
+        else:
+            title, run = 'Base de datos (indice en memoria)', lambda query: search.search_ids(products, query)
+
+        try:
+            self.write_header(title, 'indice (ms)', 'LIKE (ms)')
+            created = 0
+            for size in sizes:
+                # bulk_create no envia post_save, los productos se insertan por bloques y se confirman
+                # (MySQL actualiza el indice FULLTEXT al confirmar)
+                batch = [
+                    Products(name=name, description=description, price=Decimal('1000.00'), stock=1, producer=producer)
+                    for name, description in self.make_documents(rng, size - created)
+                ]
+                Products.objects.bulk_create(batch, batch_size=2000)
+                created = size
+                # El indice en memoria se reconstruye con los productos nuevos antes de medir
+                search.reset_index()
+                run(self.vocabulary[0])
+
+                queries = self.sample(rng, options['queries'])
+                indexed, matches = self.measure(queries, run)
+                linear, _ = self.measure(queries, lambda query: list(
+                    products.filter(Q(name__icontains=query) | Q(description__icontains=query)).values_list('id', flat=True)
+                ))
+                self.stdout.write(f'{size:>10} {matches:>14.1f} {indexed:>14.3f} {linear:>14.3f}')
+        finally:
+            if not options['keep']:
+                producer.delete()
+            search.reset_index()
@@ -0,0 +1,45 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from users.models import CustomUser
+from products.importer import ProductImporter, iter_rows, detect_format, FORMATS, IMPORT_CHUNK_SIZE
+
+
+# Comando que importa los productos de una agrupacion desde un archivo CSV o NDJSON
+# Ejemplo: python manage.py import_products productos.csv --producer cooperativa
+class Command(BaseCommand):
+    help = 'Importa productos desde un archivo CSV o NDJSON para un productor (agrupacion)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Ruta del archivo a importar')
+        parser.add_argument('--producer', required=True, help='Nombre de usuario o id del productor')
+        parser.add_argument('--file-type', choices=FORMATS, help='Formato del archivo (por defecto segun la extension)')
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        producer = options['producer']
+        lookup = {'pk': int(producer)} if producer.isdigit() else {'username': producer}
+        try:
+            user = CustomUser.objects.get(**lookup)
+        except CustomUser.DoesNotExist:
+            raise CommandError(f'El productor {producer} no existe')
+        if user.user_type != 'group':
+            raise CommandError(f'El usuario {user.username} no es una agrupacion')
+
+        file_format = options['file_type'] or detect_format(filename=options['path'])
+        if file_format not in FORMATS:
+            raise CommandError(f'No se pudo detectar el formato, use --file-type {"|".join(FORMATS)}')
+
+        with open(options['path'], 'rb') as stream:
+            report = ProductImporter(user, chunk_size=options['chunk_size']).run(iter_rows(stream, file_format))
+
+        for error in report['errors']:
+            self.stderr.write(f"Fila {error['row']}: {json.dumps(error['errors'], ensure_ascii=False, default=str)}")
+        if report['errors_truncated']:
+            self.stderr.write(f"... y {report['failed'] - len(report['errors'])} errores mas")
+        if report['file_error']:
+            self.stderr.write(report['file_error'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Se crearon {report['created']} productos, {report['failed']} filas con errores."
+        ))
@@ -0,0 +1,46 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from products.models import Grades, ProductRatingStats
+
+
+# Comando que recalcula los totales de calificacion de todos los productos a partir de Grades
+class Command(BaseCommand):
+    help = 'Reconstruye la tabla ProductRatingStats a partir de las calificaciones (Grades)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        # Una sola consulta agrupada por producto y estrella
+        rows = (
+            Grades.objects
+            .filter(rating__gte=1, rating__lte=5)
+            .values('product_id', 'rating')
+            .annotate(count=Count('id'))
+            .order_by()
+        )
+
+        stats_by_product = defaultdict(dict)
+        for row in rows:
+            stats_by_product[row['product_id']][row['rating']] = row['count']
+
+        stats_list = []
+        for product_id, stars in stats_by_product.items():
+            stats = ProductRatingStats(product_id=product_id)
+            for star, count in stars.items():
+                setattr(stats, f'star_{star}', count)
+            stats.count = sum(stars.values())
+            stats.total = sum(star * count for star, count in stars.items())
+            stats.update_average()
+            stats_list.append(stats)
+
+        # Reemplazamos los totales existentes dentro de la misma transaccion
+        ProductRatingStats.objects.all().delete()
+        ProductRatingStats.objects.bulk_create(stats_list, batch_size=options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(f'Se reconstruyeron los totales de {len(stats_list)} productos.'))
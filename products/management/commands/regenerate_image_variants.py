@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+
+from campeche_backend.image_variants import generate_variants, get_thread_pool
+from comments.models import CommentsImage
+from products.models import ProductImage
+from users.models import CustomUser
+
+# Modelos con imagenes: (modelo, campo de la imagen, campo de las versiones)
+IMAGE_MODELS = (
+    (ProductImage, 'image', 'variants'),
+    (CommentsImage, 'image', 'variants'),
+    (CustomUser, 'profile_image', 'profile_image_variants'),
+)
+
+
+# Comando que genera las versiones redimensionadas de las imagenes que aun no las tienen
+# (imagenes subidas antes del pipeline o cuyos trabajos fallaron)
+class Command(BaseCommand):
+    help = 'Genera las versiones (thumb, card, full en WebP/JPEG) de las imagenes de productos, comentarios y perfiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regenera tambien las imagenes que ya tienen versiones')
+
+    def handle(self, *args, **options):
+        for model, field_name, variants_field in IMAGE_MODELS:
+            pks = []
+            rows = model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+            for pk, name, variants in rows.values_list('pk', field_name, variants_field).iterator():
+                if name == model._meta.get_field(field_name).default:
+                    continue
+                if options['force'] or (variants or {}).get('source') != name:
+                    pks.append(pk)
+            if options['force'] and pks:
+                model.objects.filter(pk__in=pks).update(**{variants_field: {}})
+
+            # Los hilos leen y guardan los archivos mientras el pool de procesos redimensiona
+            results = get_thread_pool().map(lambda pk: self.generate(model, pk, field_name, variants_field), pks)
+            done = sum(1 for result in results if result)
+            self.stdout.write(self.style.SUCCESS(f'{model.__name__}: se generaron las versiones de {done} de {len(pks)} imagenes.'))
+
+    # Funcion que genera las versiones de un registro sin detener el comando si una imagen falla
+    def generate(self, model, pk, field_name, variants_field):
+        try:
+            return generate_variants(model, pk, field_name, variants_field)
+        except Exception as error:
+            self.stderr.write(f'{model.__name__} {pk}: {error}')
+            return None
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.5 on 2026-10-18 10:34
+
+import campeche_backend.storages
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0010_category_image'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='category',
+            name='image',
+            field=models.ImageField(default='categories_picture/default.jpeg', storage=campeche_backend.storages.PublicMediaStorage(), upload_to='categories_picture/'),
+        ),
+        migrations.AlterField(
+            model_name='productimage',
+            name='image',
+            field=models.ImageField(storage=campeche_backend.storages.PublicMediaStorage(), upload_to='products_pictures/'),
+        ),
+        migrations.AddIndex(
+            model_name='products',
+            index=models.Index(fields=['date_of_registration', 'id'], name='products_date_id_idx'),
+        ),
+    ]
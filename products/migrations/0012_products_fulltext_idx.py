@@ -0,0 +1,25 @@
+from django.db import migrations
+
+
+# El indice FULLTEXT solo existe en MySQL, en otras bases de datos (SQLite) se usa el indice en memoria
+def create_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute(
+            'CREATE FULLTEXT INDEX products_fulltext_idx ON products_products (name, description)'
+        )
+
+
+def drop_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute('DROP INDEX products_fulltext_idx ON products_products')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0011_products_date_id_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+    ]
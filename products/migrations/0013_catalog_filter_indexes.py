@@ -0,0 +1,43 @@
+# Generated by Django 5.1.5 on 2026-10-18 10:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Indice compuesto (categoria, producto) en la tabla intermedia creada por Django para Products.category,
+# la restriccion unica existente es (producto, categoria) y no sirve para filtrar o agrupar por categoria
+def create_category_products_index(apps, schema_editor):
+    schema_editor.execute(
+        'CREATE INDEX products_category_product_idx ON products_products_category (category_id, products_id)'
+    )
+
+
+def drop_category_products_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute('DROP INDEX products_category_product_idx ON products_products_category')
+    else:
+        schema_editor.execute('DROP INDEX products_category_product_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0012_products_fulltext_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='products',
+            index=models.Index(fields=['state', 'price'], name='products_state_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='products',
+            index=models.Index(fields=['state', 'unit_of_measure', 'price'], name='products_state_unit_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='products',
+            index=models.Index(fields=['producer', 'state', 'price'], name='products_producer_state_idx'),
+        ),
+        migrations.RunPython(create_category_products_index, drop_category_products_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-18 11:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0015_productimage_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='products',
+            name='auto_sold_out',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-18 11:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0016_products_auto_sold_out'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='products',
+            name='import_key',
+            field=models.UUIDField(blank=True, editable=False, null=True, unique=True),
+        ),
+    ]
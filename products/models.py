@@ -1,4 +1,6 @@
-from django.db import models
+from decimal import Decimal
+
+from django.db import models, transaction
 
 from campeche_backend.storages import PublicMediaStorage
 from users.models import CustomUser
@@ -59,16 +61,62 @@ class Products(models.Model):
      # los unicos valores permintido seran los mostrados en la lista de tupla
     state = models.CharField(max_length=20, choices=STATUS_CHOICES, default='disponible')
     
+    # llave unica de los productos creados por la importacion masiva (para recuperar sus ids en MySQL)
+    import_key = models.UUIDField(null=True, blank=True, unique=True, editable=False)
+    # verdadero si el estado agotado lo asigno el sistema al quedar sin stock (no el productor)
+    auto_sold_out = models.BooleanField(default=False, editable=False)
+
+    # Funcion que retorna (estado, agotado automatico) segun el stock: sin stock un producto disponible queda agotado
+    # y al reponer el stock solo vuelve a estar disponible si el agotado fue automatico
+    # (un producto que el productor marco como agotado o inactivo no cambia)
+    @staticmethod
+    def state_for_stock(stock, state, auto_sold_out=False):
+        if stock == 0 and state == 'disponible':
+            return 'agotado', True
+        if stock > 0 and state == 'agotado' and auto_sold_out:
+            return 'disponible', False
+        return state, auto_sold_out and state == 'agotado'
+
+    # Guardamos el estado leido de la base de datos para saber si el productor lo cambio
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_state = instance.__dict__.get('state')
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        if fields is None or 'state' in fields:
+            self._saved_state = self.state
+
     def save(self, *args, **kwargs):
         if self.price <= 0:
             raise ValueError("El precio debe ser mayor a 0")
         if self.stock < 0:
             raise ValueError("El stock no puede ser negativo")
+        # Si el estado se cambio a mano deja de ser automatico
+        auto_sold_out = self.auto_sold_out and self.state == getattr(self, '_saved_state', None)
+        state, auto_sold_out = self.state_for_stock(self.stock, self.state, auto_sold_out)
+        if (state, auto_sold_out) != (self.state, self.auto_sold_out):
+            self.state, self.auto_sold_out = state, auto_sold_out
+            # Si solo se guarda el stock o el estado tambien guardamos los dos campos del estado
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and {'stock', 'state'} & set(update_fields):
+                kwargs['update_fields'] = {*update_fields, 'state', 'auto_sold_out'}
         super().save(*args, **kwargs)
+        self._saved_state = self.state
     
     class Meta:
         verbose_name = "Product"
         verbose_name_plural = "Products"
+        indexes = [
+            # Indice para la paginacion por cursor del catalogo (fecha de registro, id)
+            models.Index(fields=['date_of_registration', 'id'], name='products_date_id_idx'),
+            # Indices compuestos para los filtros y conteos del catalogo
+            models.Index(fields=['state', 'price'], name='products_state_price_idx'),
+            models.Index(fields=['state', 'unit_of_measure', 'price'], name='products_state_unit_idx'),
+            models.Index(fields=['producer', 'state', 'price'], name='products_producer_state_idx'),
+        ]
         
     # retorna el nombre del producto
     def __str__(self):
@@ -81,6 +129,8 @@ class ProductImage(models.Model):
     product = models.ForeignKey(Products, on_delete=models.CASCADE, related_name="images")
     # imagen del producto
     image = models.ImageField(upload_to="products_pictures/", storage=PublicMediaStorage())
+    # versiones redimensionadas de la imagen (se generan en segundo plano)
+    variants = models.JSONField(default=dict, blank=True, editable=False)
     
     class Meta:
         verbose_name = "Image Product"
@@ -109,3 +159,59 @@ class Grades(models.Model):
     def __str__(self):
         return f"{self.user} - {self.product} ({self.rating})"
 
+
+
+# Modelo con los totales de calificacion de cada producto, se actualiza cuando se crea, cambia o elimina una calificacion
+# asi las estadisticas y el promedio no se recalculan sobre Grades en cada peticion
+class ProductRatingStats(models.Model):
+    # Producto al que pertenecen los totales
+    product = models.OneToOneField(Products, on_delete=models.CASCADE, primary_key=True, related_name='rating_stats')
+    # Numero de calificaciones y suma de las estrellas
+    count = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    # Promedio de las calificaciones
+    average = models.DecimalField(max_digits=3, decimal_places=2, default=Decimal('0.00'))
+    # Numero de calificaciones por estrella
+    star_1 = models.PositiveIntegerField(default=0)
+    star_2 = models.PositiveIntegerField(default=0)
+    star_3 = models.PositiveIntegerField(default=0)
+    star_4 = models.PositiveIntegerField(default=0)
+    star_5 = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Rating Stats'
+        verbose_name_plural = 'Rating Stats'
+
+    # Funcion que retorna un mensaje
+    def __str__(self):
+        return f"{self.product} ({self.average} - {self.count})"
+
+    # Funcion que retorna el numero de calificaciones de una estrella
+    def get_star_count(self, star):
+        return getattr(self, f'star_{star}')
+
+    # Funcion que recalcula el promedio a partir del numero y la suma de calificaciones
+    def update_average(self):
+        self.average = (Decimal(self.total) / self.count).quantize(Decimal('0.01')) if self.count else Decimal('0.00')
+
+    # Funcion que aplica el cambio de una calificacion (old_rating -> new_rating) a los totales del producto
+    # Se debe llamar dentro de la misma transaccion que crea, cambia o elimina la calificacion
+    @classmethod
+    @transaction.atomic
+    def apply_change(cls, product_id, old_rating=None, new_rating=None):
+        # Creamos la fila si no existe y la bloqueamos para que dos calificaciones simultaneas no se pisen
+        cls.objects.get_or_create(product_id=product_id)
+        stats = cls.objects.select_for_update().get(product_id=product_id)
+
+        if old_rating in range(1, 6):
+            stats.count -= 1
+            stats.total -= old_rating
+            setattr(stats, f'star_{old_rating}', stats.get_star_count(old_rating) - 1)
+        if new_rating in range(1, 6):
+            stats.count += 1
+            stats.total += new_rating
+            setattr(stats, f'star_{new_rating}', stats.get_star_count(new_rating) + 1)
+
+        stats.update_average()
+        stats.save()
+        return stats
@@ -0,0 +1,20 @@
+from django.conf import settings
+from rest_framework.pagination import PageNumberPagination
+
+from campeche_backend.pagination import KeysetPagination
+
+
+# Paginacion del catalogo de productos, del mas reciente al mas antiguo
+class ProductCursorPagination(KeysetPagination):
+    # Ordenamos por fecha de registro y por id para desempatar (indice products_date_id_idx)
+    ordering = ('-date_of_registration', '-id')
+    page_size = getattr(settings, 'CATALOG_PAGE_SIZE', 36)
+    max_page_size = getattr(settings, 'CATALOG_MAX_PAGE_SIZE', 100)
+    include_count = getattr(settings, 'CATALOG_INCLUDE_COUNT', True)
+
+
+# Paginacion por numero de pagina para los resultados de busqueda (ordenados por relevancia)
+class ProductSearchPagination(PageNumberPagination):
+    page_size = getattr(settings, 'CATALOG_PAGE_SIZE', 36)
+    max_page_size = getattr(settings, 'CATALOG_MAX_PAGE_SIZE', 100)
+    page_size_query_param = 'page_size'
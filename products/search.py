@@ -0,0 +1,141 @@
+import math
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from .models import Products
+
+# Palabras muy comunes que no aportan a la busqueda
+STOPWORDS = {
+    'de', 'la', 'el', 'los', 'las', 'y', 'en', 'un', 'una', 'con', 'por', 'para', 'del', 'al', 'que', 'es', 'se',
+}
+# Peso de una coincidencia en el nombre frente a una en la descripcion
+NAME_WEIGHT = 3
+DESCRIPTION_WEIGHT = 1
+
+
+# Funcion que convierte un texto en una lista de palabras normalizadas (sin tildes y en minusculas)
+def tokenize(text):
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char)).lower()
+    return [token for token in re.findall(r'\w+', text) if len(token) > 1 and token not in STOPWORDS]
+
+
+# Indice invertido en memoria: palabra -> {id_producto: peso}
+# Se utiliza cuando la base de datos no tiene indice FULLTEXT (SQLite en desarrollo y pruebas),
+# el costo de una busqueda depende del tamaño de las listas de las palabras buscadas y no del total de productos
+class InvertedIndex:
+    def __init__(self):
+        self.postings = defaultdict(dict)
+        self.documents = {}
+        self.lock = threading.RLock()
+
+    # Funcion que agrega o reemplaza un producto en el indice
+    def add(self, doc_id, name, description):
+        weights = defaultdict(int)
+        for token in tokenize(name):
+            weights[token] += NAME_WEIGHT
+        for token in tokenize(description):
+            weights[token] += DESCRIPTION_WEIGHT
+        with self.lock:
+            self.remove(doc_id)
+            for token, weight in weights.items():
+                self.postings[token][doc_id] = weight
+            self.documents[doc_id] = tuple(weights)
+
+    # Funcion que elimina un producto del indice
+    def remove(self, doc_id):
+        with self.lock:
+            for token in self.documents.pop(doc_id, ()):
+                posting = self.postings.get(token)
+                if posting is None:
+                    continue
+                posting.pop(doc_id, None)
+                if not posting:
+                    del self.postings[token]
+
+    # Funcion que retorna una lista [(id_producto, puntaje)] ordenada de mayor a menor puntaje
+    def search(self, query):
+        tokens = set(tokenize(query))
+        scores = defaultdict(float)
+        with self.lock:
+            total = len(self.documents) or 1
+            for token in tokens:
+                posting = self.postings.get(token)
+                if not posting:
+                    continue
+                # Las palabras poco frecuentes pesan mas (idf)
+                idf = math.log(1 + total / len(posting))
+                for doc_id, weight in posting.items():
+                    scores[doc_id] += weight * idf
+        return sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
+
+    def __len__(self):
+        return len(self.documents)
+
+
+# Indice del proceso, se construye en la primera busqueda y se mantiene con las señales de Products
+_index = None
+_index_lock = threading.Lock()
+
+
+# Funcion que retorna el indice en memoria construyendolo si es necesario
+def get_index():
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                index = InvertedIndex()
+                products = Products.objects.values_list('id', 'name', 'description')
+                for product_id, name, description in products.iterator(chunk_size=2000):
+                    index.add(product_id, name, description)
+                _index = index
+    return _index
+
+
+# Funcion que actualiza un producto en el indice (solo si ya fue construido)
+def update_product(product):
+    if _index is not None:
+        _index.add(product.id, product.name, product.description)
+
+
+# Funcion que elimina un producto del indice (solo si ya fue construido)
+def remove_product(product_id):
+    if _index is not None:
+        _index.remove(product_id)
+
+
+# Funcion que descarta el indice para que se reconstruya en la siguiente busqueda (cargas masivas)
+def reset_index():
+    global _index
+    with _index_lock:
+        _index = None
+
+
+# Funcion que indica si la base de datos tiene el indice FULLTEXT (MySQL)
+def uses_fulltext():
+    return connection.vendor == 'mysql'
+
+
+# Funcion que busca en el indice FULLTEXT de MySQL y retorna un queryset ordenado por relevancia
+def search_fulltext(queryset, query):
+    table = Products._meta.db_table
+    score = RawSQL(
+        f'MATCH({table}.name, {table}.description) AGAINST (%s IN NATURAL LANGUAGE MODE)',
+        (query,),
+    )
+    return queryset.annotate(score=score).filter(score__gt=0).order_by('-score', '-id')
+
+
+# Funcion que busca en el indice en memoria y retorna la lista de ids ordenados por relevancia
+def search_ids(queryset, query):
+    ranked = get_index().search(query)
+    if not ranked:
+        return []
+    # Aplicamos los filtros (categoria, estado) en la base de datos sobre los candidatos
+    allowed = set(queryset.filter(id__in=[doc_id for doc_id, _ in ranked]).values_list('id', flat=True))
+    return [doc_id for doc_id, _ in ranked if doc_id in allowed]
@@ -1,5 +1,9 @@
-from .models import Category, Products, ProductImage, Grades
+from .models import Category, Products, ProductImage, Grades, ProductRatingStats
 from rest_framework import serializers
+from django.db import transaction
+from django.db.models import Prefetch
+from offers_and_coupons.utils import get_active_offers, get_active_coupons, get_promotions_prefetch
+from campeche_backend.image_variants import ImageVariantsField
 
 # serializer para tener las categorias en archivo JSON(API)
 class SerializerCategories(serializers.ModelSerializer):
@@ -12,21 +16,38 @@ class SerializerCategories(serializers.ModelSerializer):
 
 # creacion del serializer de las imagenes de los productos    
 class ProductImageSerializer(serializers.ModelSerializer):
+    # urls de las versiones redimensionadas (None mientras se generan)
+    variants = ImageVariantsField()
+
     class Meta:
         # indicamo el modelo que deseamos utilizar
         model = ProductImage
         # indicamos los campos que serializaremos
-        fields = ['id', 'image'] 
+        fields = ['id', 'image', 'variants'] 
         
+# Funcion que precarga en un queryset de productos todo lo que utiliza SerializerProducts
+# (calificaciones, imagenes, categorias, ofertas y cupones activos), asi el numero de consultas no depende
+# del numero de productos
+def prefetch_products(queryset):
+    return queryset.select_related('rating_stats').prefetch_related(
+        Prefetch('images', queryset=ProductImage.objects.all()),
+        Prefetch('category', queryset=Category.objects.only('id')),
+        *get_promotions_prefetch(),
+    )
+
+
 # Serializador para productos
 class SerializerProducts(serializers.ModelSerializer):
     images = ProductImageSerializer(many=True, read_only=True)
     offers = serializers.SerializerMethodField()
     coupon = serializers.SerializerMethodField()
+    # Promedio y numero de calificaciones (de ProductRatingStats, usar select_related('rating_stats'))
+    average_rating = serializers.SerializerMethodField()
+    total_ratings = serializers.SerializerMethodField()
     # Indicamos el modelo y los campos a utilizar
     class Meta:
         model = Products
-        fields = '__all__'
+        exclude = ('import_key', 'auto_sold_out')
         read_only_fields = ('producer',)
 
     # validaciones
@@ -40,24 +61,55 @@ class SerializerProducts(serializers.ModelSerializer):
             raise serializers.ValidationError("El stock no puede ser negativo")
         return value
     
+    # Funcion que retorna los totales de calificacion del producto o None si no tiene calificaciones
+    def get_rating_stats(self, obj):
+        try:
+            return obj.rating_stats
+        except ProductRatingStats.DoesNotExist:
+            return None
+
+    # Funcion que retorna el promedio de calificacion del producto
+    def get_average_rating(self, obj):
+        stats = self.get_rating_stats(obj)
+        return stats.average if stats else 0
+
+    # Funcion que retorna el numero de calificaciones del producto
+    def get_total_ratings(self, obj):
+        stats = self.get_rating_stats(obj)
+        return stats.count if stats else 0
+
     # Funcion que permite obtener la oferta activa del producto si cuenta con esta
     def get_offers(self, obj):
-        offers = obj.offers.filter(active=True)
-        active_offers = [offer for offer in offers if offer.is_active()]
+        # Usamos las ofertas precargadas (prefetch_products), las resueltas por la vista (get_promotions_context)
+        # y si no existen las consultamos
+        if hasattr(obj, 'active_offer_list'):
+            offer = obj.active_offer_list[0] if obj.active_offer_list else None
+        else:
+            active_offers = self.context.get('active_offers')
+            if active_offers is None:
+                active_offers = get_active_offers([obj.id])
+            offer = active_offers.get(obj.id)
 
         from offers_and_coupons.serializer import OfferSerializer
-        if active_offers:
-            return OfferSerializer(active_offers[0], many=False).data
+        if offer:
+            return OfferSerializer(offer, many=False).data
         return None
     
     # Funcion que permite obtener el coupon activo del producto si cuenta con esta
     def get_coupon(self, obj):
-        coupons = obj.coupons.filter(active=True)
-        active_coupons = [c for c in coupons if c.is_active()]
+        # Usamos los cupones precargados (prefetch_products), los resueltos por la vista (get_promotions_context)
+        # y si no existen los consultamos
+        if hasattr(obj, 'active_coupon_list'):
+            coupon = obj.active_coupon_list[0] if obj.active_coupon_list else None
+        else:
+            active_coupons = self.context.get('active_coupons')
+            if active_coupons is None:
+                active_coupons = get_active_coupons([obj.id])
+            coupon = active_coupons.get(obj.id)
 
         from offers_and_coupons.serializer import CouponSerializer
-        if active_coupons:
-            return CouponSerializer(active_coupons[0], many=False).data
+        if coupon:
+            return CouponSerializer(coupon, many=False).data
         return None
 
 
@@ -146,10 +198,15 @@ class SerializerCategoriesProducs(serializers.ModelSerializer):
         # Método para obtener y serializar solo los productos que no sean 'inactivo'
     def get_products(self, obj):
         # Filtramos los productos de la categoría actual excluyendo los que tienen 'state' como 'inactivo'
-        products = obj.category_products.exclude(state='inactivo')
+        # y precargamos sus imagenes, categorias, ofertas y cupones
+        products = prefetch_products(obj.category_products.exclude(state='inactivo'))
+        # Si la vista envia un paginador solo serializamos (y precargamos) la pagina solicitada
+        paginator = self.context.get('paginator')
+        if paginator is not None:
+            products = paginator.paginate_queryset(products, self.context['request'])
         
         # Luego serializamos los productos filtrados
-        return SerializerProducts(products, many=True).data
+        return SerializerProducts(products, many=True, context=self.context).data
              
 
 # Serializador para rear un calificacion a un producto
@@ -180,17 +237,25 @@ class NewRatingProductSerializer(serializers.ModelSerializer):
         return data
 
     # Funcion que nos permite crear una nueva calificacion
+    @transaction.atomic
     def create(self, validated_data):
         user = self.context['request'].user
         product = validated_data['product']
         rating = validated_data['rating']
 
+        # Obtenemos la calificacion anterior del usuario (bloqueada) para poder actualizar los totales
+        grade = Grades.objects.select_for_update().filter(user=user, product=product).first()
+        old_rating = grade.rating if grade else None
+
         # Crear o actualizar calificación
-        grade, created = Grades.objects.update_or_create(
-            user=user,
-            product=product,
-            defaults={'rating': rating}
-        )
+        if grade:
+            grade.rating = rating
+            grade.save(update_fields=['rating'])
+        else:
+            grade = Grades.objects.create(user=user, product=product, rating=rating)
+
+        # Actualizamos los totales de calificacion del producto en la misma transaccion
+        ProductRatingStats.apply_change(product.id, old_rating, rating)
         return grade
 
         
\ No newline at end of file
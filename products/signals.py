@@ -0,0 +1,75 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from campeche_backend.image_variants import schedule_variants
+from offers_and_coupons.models import Offers, Coupon
+from .models import Products, ProductImage, Category, Grades
+from .cache import bump_versions
+from . import search
+
+
+# Funcion que invalida las versiones al confirmar la transaccion actual (de inmediato si no hay transaccion)
+# Si se invalida antes, una consulta concurrente guardaria los datos sin confirmar con la version nueva
+def bump_versions_on_commit(*scopes):
+    transaction.on_commit(lambda: bump_versions(*scopes))
+
+
+# Cuando se crea o edita un producto actualizamos el indice de busqueda en memoria
+@receiver(post_save, sender=Products)
+def update_search_index(sender, instance, **kwargs):
+    search.update_product(instance)
+
+
+# Cuando se elimina un producto lo quitamos del indice de busqueda en memoria
+@receiver(post_delete, sender=Products)
+def remove_from_search_index(sender, instance, **kwargs):
+    search.remove_product(instance.id)
+
+
+# Cuando cambia un producto invalidamos las respuestas guardadas del catalogo y de su detalle
+@receiver(post_save, sender=Products)
+@receiver(post_delete, sender=Products)
+def invalidate_product_cache(sender, instance, **kwargs):
+    bump_versions_on_commit('products', f'product:{instance.id}')
+
+
+# Las categorias de un producto se guardan despues del producto (category.set), tambien invalidamos en ese momento
+@receiver(m2m_changed, sender=Products.category.through)
+def invalidate_product_categories_cache(sender, instance, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        if isinstance(instance, Products):
+            bump_versions_on_commit('products', f'product:{instance.id}')
+        else:
+            bump_versions_on_commit('products')
+
+
+# Las imagenes, ofertas y cupones se muestran dentro del producto
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_save, sender=Offers)
+@receiver(post_delete, sender=Offers)
+@receiver(post_save, sender=Coupon)
+@receiver(post_delete, sender=Coupon)
+def invalidate_product_relations_cache(sender, instance, **kwargs):
+    bump_versions_on_commit('products', f'product:{instance.product_id}')
+
+
+# Las categorias se muestran en su propia lista y en los conteos del catalogo
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_cache(sender, instance, **kwargs):
+    bump_versions_on_commit('categories', 'products')
+
+
+# Las calificaciones afectan las estadisticas del producto calificado y su promedio en el catalogo
+@receiver(post_save, sender=Grades)
+@receiver(post_delete, sender=Grades)
+def invalidate_grades_cache(sender, instance, **kwargs):
+    bump_versions_on_commit(f'grades:{instance.product_id}', 'products', f'product:{instance.product_id}')
+
+
+# Cuando se sube una imagen generamos sus versiones redimensionadas en segundo plano
+@receiver(post_save, sender=ProductImage)
+def generate_image_variants(sender, instance, **kwargs):
+    schedule_variants(instance, 'image', 'variants')
@@ -1,3 +1,289 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+
+from campeche_backend.image_variants import generate_variants
+from offers_and_coupons.models import Offers, Coupon
+from users.models import CustomUser
+from .cache import get_timeout
+from .importer import ProductImporter, iter_rows
+from .models import Category, Products, ProductImage, Grades, ProductRatingStats
+
+
+# Pruebas de la cache de respuestas del catalogo (backend en memoria local, en produccion se usa Redis)
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'catalog-tests'}})
+class CatalogCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.seller = CustomUser.objects.create_user(username='vendedor', email='vendedor@test.com', password='x')
+        self.buyer = CustomUser.objects.create_user(username='comprador', email='comprador@test.com', password='x')
+        self.category = Category.objects.create(name='Frutas', description='d')
+        self.product = Products.objects.create(
+            name='Mango', description='d', price=Decimal('10.00'), stock=10, producer=self.seller
+        )
+        self.product.category.add(self.category)
+        self.client = APIClient()
+
+    # La segunda lectura anonima se responde desde la cache sin consultar la base de datos
+    # (el detalle y las calificaciones solo calculan su ETag con una consulta)
+    def test_anonymous_reads_are_cached(self):
+        urls = [
+            ('/api/products/list-products/', 0),
+            ('/api/products/categories/', 0),
+            (f'/api/products/detail/{self.product.id}/', 1),
+            (f'/api/products/stats_rating/{self.product.id}/', 1),
+        ]
+        for url, queries in urls:
+            first = self.client.get(url)
+            with self.assertNumQueries(queries):
+                second = self.client.get(url)
+            self.assertEqual(second.status_code, 200)
+            self.assertEqual(second.data, first.data)
+
+    # Los usuarios autenticados no usan la cache
+    def test_authenticated_reads_skip_cache(self):
+        url = f'/api/products/detail/{self.product.id}/'
+        self.client.get(url)
+        self.client.force_authenticate(self.buyer)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        # Ademas de la consulta del ETag se carga y serializa el producto
+        self.assertGreater(len(queries), 1)
+
+    # Editar el producto invalida su detalle y el catalogo al confirmar la transaccion
+    def test_product_change_invalidates(self):
+        detail_url = f'/api/products/detail/{self.product.id}/'
+        self.client.get(detail_url)
+        self.client.get('/api/products/list-products/')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.name = 'Mango maduro'
+            self.product.save()
+            # Antes de confirmar se sigue respondiendo la version anterior (no se guardan datos sin confirmar)
+            self.assertEqual(self.client.get(detail_url).data['name'], 'Mango')
+
+        self.assertEqual(self.client.get(detail_url).data['name'], 'Mango maduro')
+        names = [product['name'] for product in self.client.get('/api/products/list-products/').data['results']]
+        self.assertEqual(names, ['Mango maduro'])
+
+    # Crear una oferta o una calificacion invalida las respuestas que la muestran
+    def test_related_changes_invalidate(self):
+        detail_url = f'/api/products/detail/{self.product.id}/'
+        stats_url = f'/api/products/stats_rating/{self.product.id}/'
+        self.assertIsNone(self.client.get(detail_url).data['offers'])
+        self.assertEqual(self.client.get(stats_url).data['total_ratings'], 0)
+
+        now = timezone.now()
+        with self.captureOnCommitCallbacks(execute=True):
+            Offers.objects.create(
+                seller=self.seller, product=self.product, title='Oferta', percentage=Decimal('10'),
+                start_date=now - timedelta(days=1), end_date=now + timedelta(days=1),
+            )
+            with transaction.atomic():
+                Grades.objects.create(user=self.buyer, product=self.product, rating=4)
+                ProductRatingStats.apply_change(self.product.id, new_rating=4)
+
+        self.assertIsNotNone(self.client.get(detail_url).data['offers'])
+        self.assertEqual(self.client.get(stats_url).data['total_ratings'], 1)
+
+    # Una respuesta no se guarda mas alla del fin de una oferta activa
+    def test_timeout_ends_with_offer(self):
+        now = timezone.now()
+        Offers.objects.create(
+            seller=self.seller, product=self.product, title='Oferta', percentage=Decimal('10'),
+            start_date=now - timedelta(days=1), end_date=now + timedelta(seconds=30),
+        )
+        self.assertLessEqual(get_timeout(), 30)
+
+
+# Pruebas de las versiones redimensionadas de las imagenes de los productos (almacenamiento local)
+class ProductImageVariantsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.media = tempfile.mkdtemp()
+        field = ProductImage._meta.get_field('image')
+        self.original_storage = field.storage
+        field.storage = FileSystemStorage(location=self.media, base_url='/media/')
+        self.seller = CustomUser.objects.create_user(username='vendedor', email='vendedor@test.com', password='x')
+        self.category = Category.objects.create(name='Frutas', description='d')
+        self.client = APIClient()
+
+    def tearDown(self):
+        ProductImage._meta.get_field('image').storage = self.original_storage
+        shutil.rmtree(self.media, ignore_errors=True)
+
+    # Funcion que retorna una imagen JPEG del tamaño indicado
+    def make_image(self, width, height):
+        buffer = io.BytesIO()
+        Image.new('RGB', (width, height), (200, 10, 10)).save(buffer, 'JPEG')
+        return SimpleUploadedFile('foto.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+    # La subida responde sin esperar el procesamiento y las versiones se generan despues de confirmar
+    def test_upload_returns_before_variants(self):
+        self.client.force_authenticate(self.seller)
+        data = {
+            'name': 'Mango', 'description': 'd', 'price': '10.00', 'stock': 5,
+            'category': [self.category.id], 'images': [self.make_image(2000, 1000)],
+        }
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post('/api/products/new-product/', data, format='multipart')
+
+        self.assertEqual(response.status_code, 201)
+        image = ProductImage.objects.get()
+        self.assertEqual(image.variants, {})
+        self.assertTrue(callbacks)
+        self.client.force_authenticate(None)
+        detail = self.client.get(f'/api/products/detail/{image.product_id}/').data
+        self.assertIsNone(detail['images'][0]['variants'])
+
+    # El trabajo del pool de procesos guarda las versiones junto al original y el detalle las muestra como srcset
+    def test_variants_in_detail(self):
+        product = Products.objects.create(
+            name='Mango', description='d', price=Decimal('10.00'), stock=5, producer=self.seller
+        )
+        image = ProductImage.objects.create(product=product, image=self.make_image(2000, 1000))
+
+        # En el pool de procesos no hay transaccion abierta, la invalidacion se ejecuta al guardar
+        with self.captureOnCommitCallbacks(execute=True):
+            variants = generate_variants(ProductImage, image.pk, 'image', 'variants')
+
+        self.assertEqual(variants['source'], image.image.name)
+        self.assertEqual([variants[name]['width'] for name in ('thumb', 'card', 'full')], [160, 480, 1280])
+        storage = ProductImage._meta.get_field('image').storage
+        self.assertTrue(storage.exists(variants['card']['webp']))
+        self.assertTrue(variants['card']['webp'].startswith(image.image.name.rsplit('.', 1)[0]))
+
+        srcset = self.client.get(f'/api/products/detail/{product.id}/').data['images'][0]['variants']['srcset']
+        self.assertEqual(srcset['webp'].count('w, '), 2)
+        self.assertIn('_thumb.webp 160w', srcset['webp'])
+        self.assertIn('_full.jpeg 1280w', srcset['jpeg'])
+
+
+# Pruebas del listado de productos de una categoria
+class CategoryProductsViewTests(TestCase):
+    def setUp(self):
+        self.seller = CustomUser.objects.create_user(username='vendedor', email='vendedor@test.com', password='x')
+        self.category = Category.objects.create(name='Frutas', description='d')
+        self.other = Category.objects.create(name='Temporada', description='d')
+        self.client = APIClient()
+
+    # Funcion que crea productos de la categoria, la mitad con oferta y cupon activos
+    def make_products(self, total):
+        now = timezone.now()
+        for number in range(total):
+            product = Products.objects.create(
+                name=f'Producto {number}', description='d', price=Decimal('10.00'), stock=10, producer=self.seller
+            )
+            product.category.add(self.category, self.other)
+            if number % 2 == 0:
+                Offers.objects.create(
+                    seller=self.seller, product=product, title='Oferta', percentage=Decimal('10'),
+                    start_date=now - timedelta(days=1), end_date=now + timedelta(days=1),
+                )
+                Coupon.objects.create(
+                    seller=self.seller, product=product, percentage=Decimal('5'), min_purchase_amount=Decimal('1'),
+                    start_date=now - timedelta(days=1), end_date=now + timedelta(days=1),
+                )
+
+    # El numero de consultas no depende del numero de productos de la categoria:
+    # categoria, COUNT, productos y las precargas de imagenes, ofertas, cupones y categorias
+    def test_category_products_query_count(self):
+        url = f'/api/products/categories/{self.category.id}/'
+        self.make_products(3)
+        with self.assertNumQueries(7):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data['products']), 3)
+
+        self.make_products(30)
+        with self.assertNumQueries(7):
+            response = self.client.get(url, {'page_size': 20})
+        self.assertEqual(len(response.data['products']), 20)
+        self.assertEqual(response.data['count'], 33)
+        self.assertIsNotNone(response.data['next'])
+
+
+# Pruebas de la importacion masiva de productos
+class ProductImporterTests(TestCase):
+    def setUp(self):
+        self.producer = CustomUser.objects.create_user(
+            username='cooperativa', email='cooperativa@test.com', password='x', user_type='group'
+        )
+        self.fruits = Category.objects.create(name='Frutas', description='d')
+        self.vegetables = Category.objects.create(name='Verduras', description='d')
+
+    # Funcion que importa un CSV y retorna el reporte
+    def run_import(self, content):
+        return ProductImporter(self.producer).run(iter_rows(io.BytesIO(content.encode('utf-8')), 'csv'))
+
+    # Sin ids en bulk_create (como en MySQL) cada producto recibe su id aunque existan productos con el mismo nombre
+    def test_import_without_returned_ids(self):
+        Products.objects.create(name='Mango', description='d', price=Decimal('5.00'), stock=1, producer=self.producer)
+        content = (
+            'name,description,price,stock,category\n'
+            f'Mango,d,10,5,{self.fruits.id}\n'
+            f'Mango,d,12,0,{self.vegetables.id}\n'
+            f'Papa,d,3,7,{self.fruits.id}|{self.vegetables.id}\n'
+        )
+        with mock.patch.object(type(connection.features), 'can_return_rows_from_bulk_insert', False):
+            report = self.run_import(content)
+
+        self.assertEqual(report['created'], 3)
+        imported = Products.objects.filter(import_key__isnull=False).order_by('price')
+        self.assertEqual(
+            [(product.name, product.state, sorted(product.category.values_list('name', flat=True))) for product in imported],
+            [
+                ('Papa', 'disponible', ['Frutas', 'Verduras']),
+                ('Mango', 'disponible', ['Frutas']),
+                ('Mango', 'agotado', ['Verduras']),
+            ],
+        )
+
+    # Un error de lectura a mitad del archivo retorna el reporte parcial e invalida el catalogo de lo ya creado
+    def test_read_error_returns_partial_report(self):
+        content = (
+            'name,description,price,stock\n'
+            'Mango,d,10,5\n'
+            'Papa,d,3,7\n'
+            'Yuca,d,4,2\n'
+        ).encode('utf-8') + b'Pi\xf1a,d,6,1\n'
+        with mock.patch('products.importer.bump_versions') as bump_versions, \
+                mock.patch('products.importer.search.reset_index') as reset_index, \
+                self.captureOnCommitCallbacks(execute=True):
+            report = ProductImporter(self.producer, chunk_size=2).run(iter_rows(io.BytesIO(content), 'csv'))
+
+        self.assertEqual((report['created'], report['failed']), (3, 0))
+        self.assertIn('No se pudo leer el archivo', report['file_error'])
+        bump_versions.assert_called_once_with('products', 'categories')
+        reset_index.assert_called_once_with()
+
+        # La vista retorna el mismo reporte (201 porque se crearon productos)
+        client = APIClient()
+        client.force_authenticate(self.producer)
+        response = client.post('/api/products/import-products/', content, content_type='text/csv')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 3)
+        self.assertIsNotNone(response.data['file_error'])
+        self.assertEqual(Products.objects.filter(producer=self.producer).count(), 6)
+
+# Pruebas de los filtros del catalogo
+class ListProductsFiltersTests(TestCase):
+    # NaN e Infinity no son precios validos: se responde 400 en lugar de fallar en la consulta
+    def test_non_finite_price_is_rejected(self):
+        client = APIClient()
+        for params in ({'min_price': 'NaN'}, {'max_price': 'Infinity'}, {'min_price': '-inf'}):
+            response = client.get('/api/products/list-products/', params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertEqual(response.data[next(iter(params))], 'El precio debe ser un número.')
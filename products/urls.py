@@ -1,7 +1,7 @@
 from django.urls import path
 from .views import (
     CategoriesView, ProducsCategoriesView, 
-    ProducstView, DetailProductView, NewProductosView, EditProductView, DeleteProductView, UserProductsView,
+    ProducstView, ProductSearchView, DetailProductView, NewProductosView, ImportProductsView, EditProductView, DeleteProductView, UserProductsView,
     NewRatingView, DeleteRatingView, EstatsGradesView,
 )
 # url de la aplicacion (users)
@@ -11,9 +11,11 @@ urlpatterns = [
     path('categories/<int:category_id>/', ProducsCategoriesView.as_view(), name='products_categories'),
     
     path('list-products/', ProducstView.as_view(), name='Products'),
+    path('search/', ProductSearchView.as_view(), name='search_products'),
     path('my-products/', UserProductsView.as_view(), name="mis_productos" ),
     path('detail/<int:product_id>/', DetailProductView.as_view(), name='Detail_product'),
     path('new-product/', NewProductosView.as_view(), name='formulario_producto'),
+    path('import-products/', ImportProductsView.as_view(), name='import_products'),
     path('edit-product/<int:product_id>/', EditProductView.as_view(), name="edit_product"),
     path('delete-product/<int:product_id>/', DeleteProductView.as_view(), name="delete_product" ),
 
@@ -1,6 +1,6 @@
 from rest_framework.response import Response
 from rest_framework import status
-from django.db.models import Count
+from django.db import transaction
 from .serializer import (
     SerializerCategories, 
     SerializerProducts, SerializerCategoriesProducs,
@@ -8,9 +8,18 @@ from .serializer import (
 )
 
 from rest_framework.views import APIView
-from .models import Category, Products, Grades, ProductImage
+from .models import Category, Products, Grades, ProductImage, ProductRatingStats
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework_simplejwt.authentication import JWTAuthentication
+from offers_and_coupons.utils import get_promotions_context
+from .pagination import ProductCursorPagination, ProductSearchPagination
+from .cache import cache_response
+from . import conditional
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from .filters import parse_filters, apply_filters, get_facets
+from . import search
+from .importer import ProductImporter, iter_rows, detect_format, FORMATS
 
 # Create your views here.
 
@@ -18,7 +27,10 @@ from rest_framework_simplejwt.authentication import JWTAuthentication
 class CategoriesView(APIView):
     # indicamos los permisos que necesita la API
     permission_classes = [AllowAny]
-    # solicitud con el metodo get
+    # solicitud con el metodo get (guardada en cache para usuarios anonimos)
+    # Si el cliente ya tiene la version actual (If-None-Match / If-Modified-Since) respondemos 304
+    @method_decorator(condition(etag_func=conditional.categories_etag, last_modified_func=conditional.categories_last_modified))
+    @cache_response('categories')
     def get(self, request, *args, **kwargs):
         # nos devuel las instancias del todas las categorias
         categories = Category.objects.all()
@@ -51,17 +63,22 @@ class ProducsCategoriesView(APIView):
         if not category:
             return Response({'error': 'La categoria no a sido encontrada'}, status=status.HTTP_404_NOT_FOUND)
         
-        # Obtenemos los productos cuya categoria sea la buscada
-        products = Products.objects.filter(category=category.id)
+        # Paginador que utilizara el serializador para la lista de productos de la categoria
+        paginator = ProductCursorPagination()
+        # Obtenemnos la data 
+        serializer = SerializerCategoriesProducs(category, context={'request': request, 'paginator': paginator})
+        data = serializer.data
         
         # Verificamos que existan productos en esta categoria
-        if not products.exists():
+        if not data['products'] and paginator.cursor is None:
             return Response({'message': f'La categoria {category.name} no tiene productos asignados'})
         
-        # Obtenemnos la data 
-        serializer = SerializerCategoriesProducs(category)
+        # Agregamos la informacion de la paginacion
+        if paginator.count is not None:
+            data['count'] = paginator.count
+        data['next'] = paginator.get_next_link()
         # Retornamos la informacion 
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return Response(data, status=status.HTTP_200_OK)
         
 
 # creacion de la (API) para obtener todos los productos     
@@ -69,15 +86,76 @@ class ProducstView(APIView):
     # indicamos los permisos que necesita API
     permission_classes = [AllowAny]
     
-    # Si el metodo de solicitud es get
+    # Si el metodo de solicitud es get (guardada en cache para usuarios anonimos)
+    @cache_response('products', 'categories')
     def get(self, request, *args, **kwargs):
+        # Validamos los filtros enviados en la url (categoria, precio, unidad, productor y estado)
+        filters, errors = parse_filters(request.query_params)
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
         # obtenemos todos los objetos del modelo y lo almacenamos en una variable
         products = Products.objects.all().exclude(state="inactivo")
+        # Obtenemos solo la pagina solicitada (paginacion por cursor) junto con sus calificaciones
+        paginator = ProductCursorPagination()
+        page = paginator.paginate_queryset(apply_filters(products, filters).select_related('rating_stats'), request, view=self)
+        # Resolvemos las ofertas y cupones activos de la pagina en bloque
+        context = get_promotions_context([product.id for product in page])
         # llamamos al serializador indicando la variable en donde tenemos todos los objetos del modelo
         # many=True: indicamos que hay mas de un modelo
-        serializer = SerializerProducts(products, many=True)
-        # retornamos el serializador con toda la informacion
-        return Response(serializer.data) 
+        serializer = SerializerProducts(page, many=True, context=context)
+        data = paginator.get_paginated_data(serializer.data)
+        # Agregamos los conteos por categoria, unidad y precio (?facets=false los omite)
+        if request.query_params.get('facets', '').lower() not in ('false', '0', 'no'):
+            data['facets'] = get_facets(products, filters)
+        # retornamos el serializador con toda la informacion y el cursor de la siguiente pagina
+        return Response(data)
+
+
+# Vista que permite buscar productos por nombre y descripcion ordenados por relevancia
+class ProductSearchView(APIView):
+    # indicamos los permisos que necesita API
+    permission_classes = [AllowAny]
+
+    # Method GET
+    def get(self, request, *args, **kwargs):
+        # Obtenemos el texto a buscar
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({'q': 'Debe indicar un texto de búsqueda.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Nunca mostramos los productos eliminados (inactivos)
+        products = Products.objects.exclude(state="inactivo")
+
+        # Filtro por categoria
+        category = request.query_params.get('category')
+        if category:
+            if not category.isdigit():
+                return Response({'category': 'La categoria debe ser un id numérico.'}, status=status.HTTP_400_BAD_REQUEST)
+            products = products.filter(category=category)
+
+        # Filtro por estado
+        state = request.query_params.get('state')
+        if state:
+            if state not in ('disponible', 'agotado'):
+                return Response({'state': 'El estado debe ser disponible o agotado.'}, status=status.HTTP_400_BAD_REQUEST)
+            products = products.filter(state=state)
+
+        paginator = ProductSearchPagination()
+        if search.uses_fulltext():
+            # MySQL: el indice FULLTEXT ordena por relevancia y la paginacion se hace en la consulta
+            page = paginator.paginate_queryset(
+                search.search_fulltext(products, query).select_related('rating_stats'), request, view=self
+            )
+        else:
+            # Otras bases de datos: usamos el indice invertido en memoria y obtenemos solo los productos de la pagina
+            page_ids = paginator.paginate_queryset(search.search_ids(products, query), request, view=self)
+            products_by_id = Products.objects.select_related('rating_stats').in_bulk(page_ids)
+            page = [products_by_id[product_id] for product_id in page_ids if product_id in products_by_id]
+
+        # Resolvemos las ofertas y cupones activos de la pagina en bloque
+        context = get_promotions_context([product.id for product in page])
+        serializer = SerializerProducts(page, many=True, context=context)
+        return paginator.get_paginated_response(serializer.data)
 
 
 # Vista para obtener solo los productos del usuario logueado
@@ -94,23 +172,29 @@ class UserProductsView(APIView):
         user = request.user
         
         # Filtramos los productos por el usuario logueado (producer)
-        user_products = Products.objects.filter(producer=user).exclude(state="inactivo")
+        user_products = Products.objects.filter(producer=user).exclude(state="inactivo").select_related('rating_stats')
+        # Obtenemos solo la pagina solicitada (paginacion por cursor)
+        paginator = ProductCursorPagination()
+        page = paginator.paginate_queryset(user_products, request, view=self)
         
         # Verificamos si el usuario tiene productos
-        if not user_products.exists():
+        if not page and paginator.cursor is None:
             return Response(
                 {'message': 'No tienes productos registrados aún'}, 
                 status=status.HTTP_200_OK
             )
         
+        # Resolvemos las ofertas y cupones activos de los productos en bloque
+        context = get_promotions_context([product.id for product in page])
         # Serializamos los productos del usuario
-        serializer = SerializerProducts(user_products, many=True)
+        serializer = SerializerProducts(page, many=True, context=context)
         
         # Retornamos los productos con información adicional
         return Response({
             'user_id': user.id,
             'username': user.username,
-            'total_products': user_products.count(),
+            'total_products': paginator.count,
+            'next': paginator.get_next_link(),
             'products': serializer.data
         }, status=status.HTTP_200_OK)
         
@@ -124,24 +208,27 @@ class DetailProductView(APIView):
     def get_object(self, product_id):
         # capturacion de errores
         try:
-            # si el id existe retornamos el oibjeto con el id
-            return Products.objects.get(id = product_id)
+            # si el id existe retornamos el oibjeto con el id (junto con sus calificaciones)
+            return Products.objects.select_related('rating_stats').get(id = product_id)
         except Products.DoesNotExist:
             # si no existe retornamos none
             return None
     
-    # si el metodo es get
+    # si el metodo es get (guardada en cache para usuarios anonimos)
+    # si el cliente ya tiene la version actual respondemos 304 sin cargar el producto
+    @method_decorator(condition(etag_func=conditional.product_etag, last_modified_func=conditional.product_last_modified))
+    @cache_response('product:{product_id}')
     def get(self, request, product_id, *args, **kwargs):
         # almacenamos la funcion para obtener un producto en una variable
         product = self.get_object(product_id)
         
-        state = product.state
-        if state == "inactivo":
-            return Response({'state': "Producto eliminado"})
         # verificamos el valor obtenido por la funcion
         if not product:
             # en caso de que no exista retornamos un mensaje
             return Response({'rest': 'Producto no disponible'})
+        state = product.state
+        if state == "inactivo":
+            return Response({'state': "Producto eliminado"})
         # en casoi de que exista llamamos a serializer y le indicamos el objeto en concreto que serializara
         serializer = SerializerProducts(product)
         # retornamos la informacion del serializer y un mensdaje HTTP
@@ -213,6 +300,46 @@ class NewProductosView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+# API para que las agrupaciones carguen muchos productos a la vez desde un archivo CSV o NDJSON
+# El archivo se puede enviar como cuerpo de la peticion (Content-Type: text/csv o application/x-ndjson)
+# o como el campo "file" de un formulario, se lee por partes para no cargarlo completo en memoria
+class ImportProductsView(APIView):
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        user = request.user
+        # Solo las agrupaciones campesinas pueden importar productos
+        if user.user_type != 'group':
+            return Response({"detail": "Solo las agrupaciones pueden importar productos"}, status=status.HTTP_403_FORBIDDEN)
+
+        # Obtenemos el archivo y su formato (?file_type=csv|ndjson tiene prioridad)
+        if request.content_type.startswith('multipart/form-data'):
+            upload = request.FILES.get('file')
+            if upload is None:
+                return Response({"file": ["Debe enviar un archivo."]}, status=status.HTTP_400_BAD_REQUEST)
+            stream = upload
+            file_format = request.query_params.get('file_type') or detect_format(upload.content_type, upload.name)
+        else:
+            stream = request.stream
+            file_format = request.query_params.get('file_type') or detect_format(request.content_type)
+
+        if file_format not in FORMATS:
+            return Response(
+                {"file_type": [f"Formato no soportado. Opciones válidas: {list(FORMATS)}"]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if stream is None:
+            return Response({"file": ["El archivo esta vacio."]}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Los errores de lectura del archivo vienen en report['file_error']
+        report = ProductImporter(user).run(iter_rows(stream, file_format))
+
+        # 201 si se creo al menos un producto
+        response_status = status.HTTP_201_CREATED if report['created'] else status.HTTP_400_BAD_REQUEST
+        return Response(report, status=response_status)
+
+
 class EditProductView(APIView):
     # Indcamos el permisos para acceder a la View
     authentication_classes = [JWTAuthentication]
@@ -362,8 +489,10 @@ class DeleteRatingView(APIView):
         # En caso de no obtenerla mandamos mensaje de error
         if not grade:
             return Response({"error": "Calificacion no encontrado o no tienes permiso para eliminarla"}, status=status.HTTP_404_NOT_FOUND)
-        # Eliminamos el comentario
-        grade.delete()
+        # Eliminamos la calificacion y descontamos su valor de los totales del producto en la misma transaccion
+        with transaction.atomic():
+            grade.delete()
+            ProductRatingStats.apply_change(grade.product_id, old_rating=grade.rating)
         # Respuesta de exito
         return Response({'message':'La calificacion fue eliminado correctamente'},status=status.HTTP_200_OK)
 
@@ -371,34 +500,34 @@ class DeleteRatingView(APIView):
 # Vista que nos permite agregar una calificacion
 class EstatsGradesView(APIView):
     permission_classes = [AllowAny]
-    # Obtenemos el id del producto y retornamos el producto
+    # Obtenemos el id del producto y retornamos el producto junto con sus totales de calificacion
     def get_object(self, product_id):
         try:
-            return Products.objects.get(id=product_id)
+            return Products.objects.select_related('rating_stats').get(id=product_id)
         except Products.DoesNotExist:
             return None
-    # Method GET
+    # Method GET (guardada en cache para usuarios anonimos, 304 si el cliente ya tiene la version actual)
+    @method_decorator(condition(etag_func=conditional.rating_etag, last_modified_func=conditional.rating_last_modified))
+    @cache_response('grades:{product_id}')
     def get(self, request, product_id, *args, **kwargs):
         # Obtenemos el producto
         product = self.get_object(product_id)
         # En caso de no poderlo obtener enviamos mensaje de error
         if not product:
             return Response({"error": "El producto no ha sido encontrado"})
-        # Obtenemos las calificacion del producto
-        ratings_data = (
-            Grades.objects
-            .filter(product=product_id)
-            .values("rating")
-            .annotate(count=Count("rating"))
-        )
+        # Obtenemos los totales de calificacion del producto (se mantienen al calificar)
+        try:
+            rating_stats = product.rating_stats
+        except ProductRatingStats.DoesNotExist:
+            rating_stats = ProductRatingStats(product=product)
 
         # Calcular total
-        total_ratings = sum(item["count"] for item in ratings_data)
+        total_ratings = rating_stats.count
 
         # Construir respuesta con 1 a 5 estrellas
         stats = []
         for star in range(1, 6):
-            count = next((item["count"] for item in ratings_data if item["rating"] == star), 0)
+            count = rating_stats.get_star_count(star)
             percentage = (count / total_ratings * 100) if total_ratings > 0 else 0
             stats.append({
                 "star": star,
@@ -409,6 +538,7 @@ class EstatsGradesView(APIView):
         return Response({
             "product_id": product_id,
             "total_ratings": total_ratings,
+            "average": rating_stats.average,
             "stars": stats
         }, status=status.HTTP_200_OK)
         
@@ -12,5 +12,6 @@ class UsersConfig(AppConfig):
     # Función que se ejecuta al cargar la aplicación para registrar señales
     def ready(self):
         # Importamos el módulo de señales para que los receptores se activen
-        from cart import signals
+        import cart.signals  # noqa: F401
+        import users.signals  # noqa: F401
 
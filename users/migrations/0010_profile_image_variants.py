@@ -0,0 +1,34 @@
+# Generated by Django 5.1.5 on 2026-10-18 10:44
+
+import campeche_backend.storages
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0009_alter_customuser_profile_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='profile_image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='customuser',
+            name='profile_image',
+            field=models.ImageField(blank=True, default='/profile_pictures/perfil.jpeg', null=True, storage=campeche_backend.storages.PublicMediaStorage(), upload_to='profile_pictures/'),
+        ),
+        migrations.AlterField(
+            model_name='groupprofile',
+            name='image_cedula',
+            field=models.ImageField(blank=True, null=True, storage=campeche_backend.storages.PublicMediaStorage(), upload_to='documents/cedula/'),
+        ),
+        migrations.AlterField(
+            model_name='groupprofile',
+            name='rut_document',
+            field=models.FileField(blank=True, null=True, storage=campeche_backend.storages.PublicMediaStorage(), upload_to='documents/rut/'),
+        ),
+    ]
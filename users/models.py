@@ -18,6 +18,8 @@ class CustomUser(AbstractUser):
     address = models.TextField(max_length=500, null=True, blank=True)
     # Imagen de perfil
     profile_image = models.ImageField(upload_to="profile_pictures/",storage=PublicMediaStorage(), blank=True, null=True, default='/profile_pictures/perfil.jpeg')
+    # Versiones redimensionadas de la imagen de perfil (se generan en segundo plano)
+    profile_image_variants = models.JSONField(default=dict, blank=True, editable=False)
     
     USER_TYPE_CHOICES = [
         ('common', 'Usuario común'),
@@ -2,6 +2,7 @@ from rest_framework import serializers
 from .models import CustomUser, GroupProfile, EmailVerificationToken
 from .utils.email_service import EmailService
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from campeche_backend.image_variants import ImageVariantsField
 import re 
 
 
@@ -108,6 +109,8 @@ class RegisterGroupSerializer(serializers.ModelSerializer):
     password2 = serializers.CharField(write_only=True, required=True)
     # Obtenemos los campos del serializer de las agrupaciones
     group_profile = GroupProfileSerializer()
+    # Urls de las versiones redimensionadas de la imagen de perfil (solo lectura)
+    profile_image_variants = ImageVariantsField('profile_image', 'profile_image_variants')
 
     # Indicamos el modelo que utilizaremos
     class Meta:
@@ -122,6 +125,7 @@ class RegisterGroupSerializer(serializers.ModelSerializer):
             'phone_number',
             'address',
             'profile_image',
+            'profile_image_variants',
             'group_profile',
         ]
         # Indicamso que la contraseña solo sera de lectura
@@ -198,6 +202,7 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         # Añadimos información adicional del usuario a la respuesta
         data.update({
             'userImage': user.profile_image.url,
+            'userImageVariants': ImageVariantsField('profile_image', 'profile_image_variants').to_representation(user),
             'userName': user.username,
             'userEmail': user.email,
             'isSeller': user.is_seller,
@@ -211,6 +216,8 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
 class UserUpdateSerializer(serializers.ModelSerializer):
     # Obtenemos el serializador de las Grupaciones y le indicamos que no es requerido
     group_profile = GroupProfileSerializer(required=False)
+    # Urls de las versiones redimensionadas de la imagen de perfil (solo lectura)
+    profile_image_variants = ImageVariantsField('profile_image', 'profile_image_variants')
     
     class Meta:
         # Indicamos el modelo a utilizar
@@ -223,6 +230,7 @@ class UserUpdateSerializer(serializers.ModelSerializer):
             'phone_number',
             'address',
             'profile_image',
+            'profile_image_variants',
             'is_seller',
             'user_type',
             'two_factor_enabled',
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from campeche_backend.image_variants import schedule_variants
+from .models import CustomUser
+
+
+# Cuando el usuario cambia su imagen de perfil generamos sus versiones redimensionadas en segundo plano
+@receiver(post_save, sender=CustomUser)
+def generate_profile_image_variants(sender, instance, **kwargs):
+    schedule_variants(instance, 'profile_image', 'profile_image_variants')
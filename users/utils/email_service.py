@@ -1,15 +1,9 @@
 # Nos permite uenviar email
-from django.core.mail import send_mail
-from django.conf import settings
+from notifications.outbox import enqueue_email
 
 class EmailService:
     # Nos permite llamar a la funcion si necesidad el self, para llamarla de manera mas facil
+    # El correo se guarda en la bandeja de salida y se envia al confirmar la transaccion (con reintentos si el SMTP falla)
     @staticmethod
     def send_email(subject, message, recipient_list):
-        send_mail(
-            subject,
-            message,
-            settings.DEFAULT_FROM_EMAIL,
-            recipient_list,
-            fail_silently=False,
-        )
\ No newline at end of file
+        enqueue_email(subject, message, recipient_list)
\ No newline at end of file